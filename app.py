@@ -1,14 +1,42 @@
-from module.extract_profile_pdf import extract_profile_pdf
-from module.data_processing import (
-    split_profile_data,
-    create_vector_index,
-    verify_embedding_model,
+from module.data_processing import create_vector_index
+from module.ingestion_pipeline import aingest_resume, IngestionError, StageCallback
+from module.session_store import get_session_store
+from module.resume_cache import (
+    compute_file_hash,
+    compute_resume_key,
+    get_resume_cache,
 )
-from fastapi import FastAPI
-from module.query_engine import generate_facts_candidate, answer_user_question
-from config import settings as config
-import gradio as gr
+from module.candidate_index import get_candidate_index, index_candidate
+from module.candidate_bundle import (
+    get_candidate_bundle_store,
+    save_candidate_bundle,
+)
+from module.candidate_ranking import arank_candidates
+from module.llm_interface import get_model_embedding
+from module.embedding_cache import get_embedding_cache_store
+from module.answer_cache import get_answer_cache, get_context_cache
+from module.singleflight import get_singleflight, singleflight_stats
+from module.context_budget import get_context_budgeter
+from module.batch_ingestion import (
+    arun_batch,
+    collect_resume_paths,
+    get_batch_progress,
+    resolve_input_path,
+)
+from module.metrics import get_metrics, get_trace_buffer
+from module.pdf_sections import shutdown_pdf_process_pool
+from module.job_queue import Job, QueueFullError, get_job_queue
+from module.warmup import warm_up, warmup_timings
+from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from module.query_engine import astream_user_question
+from config import get_startup_settings, settings as config
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import uuid
+import json
 import logging
 import os
 
@@ -18,100 +46,275 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()],
 )
 
-active_session = {}
-
 logger = logging.getLogger(__name__)
 
 
-def process_resume(file):
-    temp_file_path = None
+def resolve_upload_path(file) -> Optional[str]:
+    # Handle different Gradio file upload formats
+    if hasattr(file, "name"):
+        # Gradio >= 4.0 returns a file object with .name attribute
+        return file.name
+    if isinstance(file, str):
+        # Sometimes Gradio returns a file path string
+        return file
+    return None
+
+
+async def aprocess_document(
+    document_path: str, on_stage: Optional[StageCallback] = None
+) -> AsyncIterator[Tuple[str, Optional[str], Optional[str]]]:
+    # Yields (facts so far, session_id, candidate_id); the session and
+    # candidate IDs are only set on the last update
+    logger.info(f"Processing resume at path: {document_path}")
+
+    file_hash = await asyncio.to_thread(compute_file_hash, document_path)
+    resume_key = compute_resume_key(file_hash)
+
+    cache_key = None
+    if config.RESUME_CACHE_ENABLED:
+        cache_key = resume_key
+        cached = await asyncio.to_thread(get_resume_cache().get, cache_key)
+        if cached:
+            if on_stage:
+                on_stage("resume_cache", "done")
+            index = create_vector_index(cached["nodes"])
+            if not index:
+                raise IngestionError("Failed to create vector index from cache")
+
+            session_id = str(uuid.uuid4())
+            await asyncio.to_thread(
+                get_session_store().put, session_id, index, cached["nodes"]
+            )
+
+            yield cached["initial_facts"], session_id, file_hash
+
+            if not get_candidate_bundle_store().resolve(file_hash):
+                await asyncio.to_thread(save_candidate_bundle, file_hash, cached)
+            await asyncio.to_thread(
+                index_candidate,
+                file_hash,
+                cached["profile_data"],
+                cached["nodes"],
+            )
+            return
+
+    # Facts tokens and stage progress are forwarded from the ingestion
+    # pipeline while the embedding and index stages are still running.
+    # Uploads of the same PDF that overlap share one pipeline run.
+    events = asyncio.Queue()
+    finished = object()
+    ingestion = asyncio.create_task(
+        get_singleflight("ingest").do_with_events(
+            resume_key,
+            lambda publish: aingest_resume(
+                document_path,
+                on_facts_token=publish,
+                on_stage=lambda stage, status: publish((stage, status)),
+            ),
+            events.put_nowait,
+        )
+    )
+    # Events are queued as they are published, so the marker comes last
+    ingestion.add_done_callback(lambda _: events.put_nowait(finished))
+
+    initial_facts = ""
+    try:
+        while (event := await events.get()) is not finished:
+            if isinstance(event, tuple):
+                if on_stage:
+                    on_stage(*event)
+                continue
+            initial_facts += event
+            yield initial_facts, None, None
+    finally:
+        # Only this caller's wait is cancelled; the shared run is shielded
+        if not ingestion.done():
+            ingestion.cancel()
+
+    result = ingestion.result()
+    session_id = str(uuid.uuid4())
+
+    await asyncio.to_thread(
+        get_session_store().put, session_id, result["index"], result["nodes"]
+    )
+
+    yield result["initial_facts"], session_id, file_hash
+
+    await asyncio.to_thread(save_candidate_bundle, file_hash, result)
+    if cache_key:
+        await asyncio.to_thread(
+            get_resume_cache().put,
+            cache_key,
+            result["profile_data"],
+            result["nodes"],
+            result["initial_facts"],
+        )
+
+    await asyncio.to_thread(
+        index_candidate, file_hash, result["profile_data"], result["nodes"]
+    )
+
+
+async def run_ingestion_job(job: Job) -> dict:
+    # Runs on a job queue worker; partial facts and the session become visible
+    # to pollers as soon as they exist
+    async for facts, session_id, candidate_id in aprocess_document(
+        job.payload["document_path"], on_stage=job.set_stage
+    ):
+        job.result["initial_facts"] = facts
+        if session_id:
+            job.result["session_id"] = session_id
+            job.result["candidate_id"] = candidate_id
+    return job.result
+
+
+def cleanup_ingestion_job(job: Job) -> None:
+    # API uploads are deleted once their job succeeded, failed or was dropped
+    # at shutdown; Gradio manages its own upload files
+    if job.payload.get("delete_after"):
+        _remove_upload(job.payload["document_path"])
+
+
+def _remove_upload(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to clean up uploaded file {path}: {e}")
+
+
+async def submit_resume(file):
+    # Returns at once: the pipeline runs on the job queue and the UI polls
+    import gradio as gr
+
+    document_path = resolve_upload_path(file) if file is not None else None
+    if document_path is None:
+        return None, None, None, None, "No file uploaded", gr.Timer(active=False)
 
     try:
-        if file is None:
-            return "No file uploaded", None
+        job = await get_job_queue().submit(
+            "ingest", {"document_path": document_path}, config.JOB_UI_PRIORITY
+        )
+    except QueueFullError:
+        status = "Too many resumes are being processed, please try again shortly."
+        return None, None, None, None, status, gr.Timer(active=False)
 
-        # Handle different Gradio file upload formats
-        if hasattr(file, "name"):
-            # Gradio >= 4.0 returns a file object with .name attribute
-            document_path = file.name
-            logger.info(f"Using uploaded file path: {document_path}")
-        elif isinstance(file, str):
-            # Sometimes Gradio returns a file path string
-            document_path = file
-            logger.info(f"Using file path string: {document_path}")
+    return None, None, None, job.job_id, "Queued", gr.Timer(active=True)
 
-        logger.info(f"Processing resume at path: {document_path}")
 
-        profile_data = extract_profile_pdf(document_path)
+STAGE_MARKS = {"running": "…", "done": "✓", "failed": "✗"}
 
-        if not profile_data:
-            logger.error("No profile data extracted from PDF")
-            return "No profile data extracted from PDF", None
 
-        nodes = split_profile_data(profile_data)
-        if not nodes:
-            logger.error("No data chunks created from profile data")
-            return "No data chunks created from profile data", None
+def format_job_status(job: dict) -> str:
+    if job["status"] == "queued":
+        return f"Queued, {job.get('position', 0)} job(s) ahead"
+    if job["status"] == "failed":
+        return f"Failed: {job['error']}"
 
-        index = create_vector_index(nodes)
-        if not index:
-            logger.error("Failed to create vector index")
-            return "Failed to create vector index", None
+    stages = [
+        f"{stage} {STAGE_MARKS.get(status, status)}"
+        for stage, status in job["stages"].items()
+    ]
+    title = "Done" if job["status"] == "succeeded" else "Processing"
+    return f"{title}: {', '.join(stages)}" if stages else title
 
-        if not verify_embedding_model(index):
-            logger.error("Embedding model verification failed")
-            return "Embedding model verification failed", None
 
-        initial_facts = generate_facts_candidate(index)
+async def poll_resume_job(job_id):
+    import gradio as gr
 
-        session_id = str(uuid.uuid4())
+    job = await asyncio.to_thread(get_job_queue().get, job_id) if job_id else None
+    if job is None:
+        return None, None, None, "Job not found", gr.Timer(active=False)
 
-        active_session[session_id] = index
+    # Facts stream in while the remaining stages run; chatting can start as
+    # soon as the session exists
+    result = job["result"]
+    finished = job["status"] in ("succeeded", "failed")
+    return (
+        result.get("initial_facts"),
+        result.get("session_id"),
+        result.get("candidate_id"),
+        format_job_status(job),
+        gr.Timer(active=not finished),
+    )
 
-        return initial_facts, session_id
 
+async def open_candidate(candidate_id: str) -> Optional[dict]:
+    # Reopens a saved candidate without extraction or embedding calls
+    bundle = await asyncio.to_thread(get_candidate_bundle_store().load, candidate_id)
+    if bundle is None:
+        return None
+
+    index = create_vector_index(bundle["nodes"])
+    if not index:
+        return None
+
+    session_id = str(uuid.uuid4())
+    await asyncio.to_thread(get_session_store().put, session_id, index, bundle["nodes"])
+    return {
+        "candidate_id": bundle["candidate_id"],
+        "session_id": session_id,
+        "initial_facts": bundle["initial_facts"],
+        "profile_data": bundle["profile_data"],
+    }
+
+
+async def handle_open_candidate(candidate_id):
+    if not candidate_id or not candidate_id.strip():
+        return "Enter a candidate ID.", None, candidate_id
+
+    try:
+        opened = await open_candidate(candidate_id)
     except Exception as e:
-        logger.error(f"Error processing resume: {e}")
-        return f"Error processing resume: {str(e)}", [], []
+        logger.error(f"Error opening candidate: {e}")
+        return f"Error opening candidate: {str(e)}", None, candidate_id
 
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.info(f"Cleaned up temporary file: {temp_file_path}")
-            except Exception as cleanup_error:
-                logger.warning(
-                    f"Failed to clean up temporary file {temp_file_path}: {cleanup_error}"
-                )
+    if opened is None:
+        return "No saved candidate found for this ID.", None, candidate_id
+    return opened["initial_facts"], opened["session_id"], opened["candidate_id"]
 
 
-def handle_chat(message, chat_history, session_id=None):
+async def handle_chat(message, chat_history, session_id=None):
     try:
         if not message.strip():
-            return chat_history, ""
+            yield chat_history, ""
+            return
 
-        if session_id is None:
+        if not session_id:
             error_msg = "Please upload and process a resume first."
             chat_history.append((message, error_msg))
-            return chat_history, ""
+            yield chat_history, ""
+            return
 
-        # Get the most recent index (in a real app, you'd want to track sessions properly)
-        index = active_session[session_id]
-
-        # Generate response using the query engine
-        response = answer_user_question(index, message)
+        index = await asyncio.to_thread(get_session_store().get, session_id)
+        if index is None:
+            error_msg = "Session expired. Please process the resume again."
+            chat_history.append((message, error_msg))
+            yield chat_history, ""
+            return
 
+        # Stream the response token by token into the last chat message
+        response = ""
         chat_history.append((message, response))
-        return chat_history, ""
+        async for token in astream_user_question(index, message, session_id):
+            response += token
+            chat_history[-1] = (message, response)
+            yield chat_history, ""
 
     except Exception as e:
         logger.error(f"Error in chat handler: {e}")
         error_msg = f"Error processing your question: {str(e)}"
-        chat_history.append((message, error_msg))
-        return chat_history, ""
+        if chat_history and chat_history[-1][0] == message:
+            chat_history[-1] = (message, error_msg)
+        else:
+            chat_history.append((message, error_msg))
+        yield chat_history, ""
 
 
 def create_gradio_interface():
+    import gradio as gr
+
     with gr.Blocks() as demo:
         gr.Markdown("# Resume Chatbot")
         gr.Markdown("Upload a resume PDF and ask questions about the candidate.")
@@ -122,7 +325,17 @@ def create_gradio_interface():
                     label="Initial Facts about the Candidate", lines=10
                 )
                 upload_button = gr.Button("Process Resume")
+                job_status = gr.Markdown()
+                with gr.Row():
+                    candidate_id = gr.Textbox(
+                        label="Candidate ID",
+                        placeholder="Paste a saved candidate ID to reopen it",
+                        scale=4,
+                    )
+                    open_button = gr.Button("Open", scale=1)
                 session_id = gr.Textbox(label="Session ID", visible=False)
+                job_id = gr.Textbox(label="Job ID", visible=False)
+                job_timer = gr.Timer(0.5, active=False)
             with gr.Column():
                 chat_output = gr.Chatbot(height=500)
                 user_input = gr.Textbox(
@@ -130,11 +343,35 @@ def create_gradio_interface():
                     placeholder="Ask a question about the candidate...",
                 )
                 send_button = gr.Button("Send")
+                gr.Examples(
+                    examples=get_startup_settings().CANNED_QUESTIONS,
+                    inputs=[user_input],
+                    label="Common questions",
+                )
 
         upload_button.click(
-            fn=process_resume,
+            fn=submit_resume,
             inputs=[pdf_input],
-            outputs=[facts_result, session_id],
+            outputs=[
+                facts_result,
+                session_id,
+                candidate_id,
+                job_id,
+                job_status,
+                job_timer,
+            ],
+        )
+
+        job_timer.tick(
+            fn=poll_resume_job,
+            inputs=[job_id],
+            outputs=[facts_result, session_id, candidate_id, job_status, job_timer],
+        )
+
+        open_button.click(
+            fn=handle_open_candidate,
+            inputs=[candidate_id],
+            outputs=[facts_result, session_id, candidate_id],
         )
 
         send_button.click(
@@ -146,15 +383,264 @@ def create_gradio_interface():
         # Also allow pressing Enter in the text input to send message
         user_input.submit(
             fn=handle_chat,
-            inputs=[user_input, chat_output],
+            inputs=[user_input, chat_output, session_id],
             outputs=[chat_output, user_input],
         )
 
         return demo
 
 
-app = FastAPI(title="Resume Chatbot")
+async def run_warm_up():
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_job_queue().register("ingest", run_ingestion_job, cleanup_ingestion_job)
+    # Warm up in the background, so the server accepts requests right away
+    if config.WARMUP_ON_STARTUP:
+        app.state.warmup_task = asyncio.create_task(run_warm_up())
+    yield
+    await get_job_queue().stop()
+    await asyncio.to_thread(shutdown_pdf_process_pool)
+
+
+app = FastAPI(title="Resume Chatbot", lifespan=lifespan)
+
+
+@app.get("/api/chat/stream")
+async def chat_stream(session_id: str, question: str):
+    index = await asyncio.to_thread(get_session_store().get, session_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    async def event_stream():
+        try:
+            async for token in astream_user_question(index, question, session_id):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/api/candidates/search")
+async def search_candidates(
+    q: Optional[str] = None,
+    skills: Optional[str] = None,
+    location: Optional[str] = None,
+    top_k: int = 10,
+):
+    filters = {
+        "skills": [skill for skill in (skills or "").split(",") if skill.strip()],
+        "location": location,
+    }
+
+    # Without a query this is a pure metadata lookup, no embedding call
+    if not q:
+        candidates = await asyncio.to_thread(
+            get_candidate_index().list_candidates, limit=top_k, **filters
+        )
+        return {"candidates": candidates}
 
-app = gr.mount_gradio_app(
-    app=app, blocks=create_gradio_interface(), path="/", server_port=config.PORT
-)
+    query_embedding = await get_model_embedding().aget_query_embedding(q)
+    candidates = await asyncio.to_thread(
+        get_candidate_index().search_candidates,
+        query_embedding,
+        top_k=top_k,
+        **filters,
+    )
+    return {"candidates": candidates}
+
+
+@app.post("/api/candidates/{candidate_id}/open")
+async def open_candidate_endpoint(candidate_id: str):
+    opened = await open_candidate(candidate_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return opened
+
+
+class RankRequest(BaseModel):
+    job_description: str
+    top_n: Optional[int] = None
+    skills: List[str] = []
+    location: Optional[str] = None
+
+
+@app.post("/api/rank")
+async def rank_candidates(request: RankRequest):
+    if not request.job_description.strip():
+        raise HTTPException(status_code=400, detail="Job description is empty")
+
+    return await arank_candidates(
+        request.job_description,
+        top_n=request.top_n,
+        skills=request.skills,
+        location=request.location,
+    )
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "warmed_up": bool(warmup_timings)}
+
+
+@app.get("/api/stats")
+async def get_stats():
+    stats = {"sessions": get_session_store().stats()}
+    if config.EMBEDDING_CACHE_ENABLED:
+        stats["embedding_cache"] = get_embedding_cache_store().stats()
+    if config.ANSWER_CACHE_ENABLED:
+        stats["answer_cache"] = get_answer_cache().stats()
+    stats["context_cache"] = get_context_cache().stats()
+    stats["singleflight"] = singleflight_stats()
+    stats["context_budget"] = get_context_budgeter().stats()
+    stats["warmup"] = warmup_timings
+    stats["jobs"] = get_job_queue().stats()
+    return stats
+
+
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    return PlainTextResponse(
+        get_metrics().render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/api/traces")
+async def list_traces(limit: int = 20):
+    return {"traces": get_trace_buffer().recent(limit)}
+
+
+@app.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = get_trace_buffer().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def _save_upload(upload: UploadFile, path: str) -> None:
+    # Copied in chunks so an oversized upload is refused after at most
+    # JOB_MAX_UPLOAD_BYTES, and anything that is not a PDF before it is queued
+    if not upload.file.read(4).startswith(b"%PDF"):
+        raise HTTPException(status_code=400, detail="Upload is not a PDF file")
+    upload.file.seek(0)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            while chunk := upload.file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if config.JOB_MAX_UPLOAD_BYTES and size > config.JOB_MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds {config.JOB_MAX_UPLOAD_BYTES} bytes",
+                    )
+                f.write(chunk)
+    except BaseException:
+        _remove_upload(path)
+        raise
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), priority: int = Form(0)):
+    # The upload is stored and queued; poll GET /api/jobs/{job_id} for progress
+    document_path = os.path.join(config.JOB_UPLOAD_DIR, f"{uuid.uuid4()}.pdf")
+    await asyncio.to_thread(_save_upload, file, document_path)
+
+    try:
+        job = await get_job_queue().submit(
+            "ingest",
+            {"document_path": document_path, "delete_after": True},
+            priority,
+        )
+    except QueueFullError as e:
+        await asyncio.to_thread(_remove_upload, document_path)
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "10"}
+        )
+
+    return await asyncio.to_thread(get_job_queue().get, job.job_id)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+class BatchRequest(BaseModel):
+    # Paths are relative to BATCH_INPUT_DIR; results always go to BATCH_OUTPUT_DIR.
+    # Unset workers / retries use the configured values.
+    paths: List[str]
+    workers: Optional[int] = Field(None, ge=1)
+    max_retries: Optional[int] = Field(None, ge=0)
+
+
+@app.post("/api/batch")
+async def start_batch(request: BatchRequest, background_tasks: BackgroundTasks):
+    try:
+        inputs = [
+            resolve_input_path(path, config.BATCH_INPUT_DIR) for path in request.paths
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    paths = await asyncio.to_thread(collect_resume_paths, inputs)
+    if not paths:
+        raise HTTPException(status_code=400, detail="No PDF files found")
+
+    batch_id = str(uuid.uuid4())
+    output_path = os.path.join(config.BATCH_OUTPUT_DIR, f"{batch_id}.jsonl")
+
+    # Callers may ask for less than the configured concurrency, never more
+    workers = config.BATCH_WORKERS
+    if request.workers is not None:
+        workers = min(request.workers, workers)
+    max_retries = config.BATCH_MAX_RETRIES
+    if request.max_retries is not None:
+        max_retries = min(request.max_retries, max_retries)
+
+    background_tasks.add_task(
+        arun_batch,
+        paths,
+        output_path,
+        workers=workers,
+        max_retries=max_retries,
+        batch_id=batch_id,
+    )
+
+    return {"batch_id": batch_id, "total": len(paths), "output_path": output_path}
+
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    progress = get_batch_progress(batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+
+if get_startup_settings().UI_ENABLED:
+    # Gradio alone takes seconds to import; API-only deployments skip it
+    import gradio as gr
+
+    app = gr.mount_gradio_app(
+        app=app,
+        blocks=create_gradio_interface(),
+        path="/",
+        server_port=get_startup_settings().PORT,
+    )
@@ -0,0 +1,321 @@
+"""End-to-end ingestion and chat benchmark against local stand-in servers.
+
+Starts benchmarks/stub_servers.py in a subprocess, points the app at it via
+OPENROUTER_BASE_URL and the `openai` embedding backend, and runs scenarios
+over a synthetic resume corpus. The stubs have fixed latency, so changes in
+the numbers come from the pipeline code itself. Caches are off unless
+--with-caches is given.
+
+    python benchmarks/bench_pipeline.py --scenarios single concurrent chat cold
+    python benchmarks/bench_pipeline.py --scenarios chat --ttft-ms 50
+"""
+
+from typing import Any, Dict, List
+import argparse
+import importlib.util
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from resume_corpus import build_corpus  # noqa: E402
+import numpy as np  # noqa: E402
+
+SCENARIOS = ("single", "concurrent", "chat", "cold")
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def add(self, name: str, milliseconds: float) -> None:
+        self.samples.setdefault(name, []).append(milliseconds)
+
+    def add_timings(self, timings: Dict[str, float]) -> None:
+        for name, seconds in timings.items():
+            self.add(name, seconds * 1000)
+
+    def report(self, title: str, items: int, elapsed: float, unit: str) -> None:
+        print(
+            f"\n{title}: {items} {unit} in {elapsed:.2f}s, "
+            f"{items / elapsed * 60:.1f} {unit}/min, peak RSS {peak_rss_mb():.0f} MB"
+        )
+        self.print_percentiles()
+
+    def print_percentiles(self) -> None:
+        print(f"  {'stage':<18}{'n':>5}{'p50':>11}{'p95':>11}{'p99':>11}")
+        for name, values in self.samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(
+                f"  {name:<18}{len(values):>5}"
+                f"{p50:>9.1f}ms{p95:>9.1f}ms{p99:>9.1f}ms"
+            )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_servers(args) -> subprocess.Popen:
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BENCH_DIR, "stub_servers.py"),
+            "--port", str(port),
+            "--ttft-ms", str(args.ttft_ms),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--completion-tokens", str(args.completion_tokens),
+            "--embed-latency-ms", str(args.embed_latency_ms),
+        ]
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        process.kill()
+        raise RuntimeError("Stub servers did not start")
+
+    process.url = url
+    return process
+
+
+def configure_environment(stub_url: str, work_dir: str, with_caches: bool) -> None:
+    # Must run before any app module is imported: settings are read once
+    os.environ.update(
+        {
+            "OPENROUTER_BASE_URL": f"{stub_url}/v1",
+            "OPENROUTER_API_KEY": "bench",
+            "EMBEDDING_BACKEND": "openai",
+            "EMBEDDING_BASE_URL": f"{stub_url}/v1",
+            "HUGGINGFACE_MODEL_LLM": "bench",
+            "HUGGINGFACE_TOKEN": "bench",
+            "LLM_FALLBACK_ENABLED": "false",
+            "OPENROUTER_REQUESTS_PER_MINUTE": "0",
+            "HUGGINGFACE_REQUESTS_PER_MINUTE": "0",
+            "SESSION_DB_PATH": os.path.join(work_dir, "sessions.db"),
+            "EMBEDDING_CACHE_DB_PATH": os.path.join(work_dir, "embedding_cache.db"),
+            "RESUME_CACHE_DIR": os.path.join(work_dir, "resume_cache"),
+            "CANDIDATE_INDEX_DIR": os.path.join(work_dir, "candidate_index"),
+            "CANDIDATE_BUNDLE_DIR": os.path.join(work_dir, "candidates"),
+        }
+    )
+    if not with_caches:
+        for name in (
+            "EMBEDDING_CACHE_ENABLED",
+            "RESUME_CACHE_ENABLED",
+            "ANSWER_CACHE_ENABLED",
+        ):
+            os.environ[name] = "false"
+
+
+async def run_single(corpus: Dict[str, List[str]], repeat: int) -> None:
+    from module.ingestion_pipeline import aingest_resume
+
+    for size, paths in corpus.items():
+        recorder = Recorder()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                upload_start = time.perf_counter()
+                result = await aingest_resume(path)
+                recorder.add("wall_clock", (time.perf_counter() - upload_start) * 1000)
+                recorder.add_timings(result["timings"])
+        recorder.report(
+            f"single upload ({size})",
+            repeat * len(paths),
+            time.perf_counter() - start,
+            "uploads",
+        )
+
+
+async def run_concurrent(paths: List[str], concurrency: int) -> None:
+    from module.ingestion_pipeline import aingest_resume
+
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(path: str) -> None:
+        async with semaphore:
+            upload_start = time.perf_counter()
+            result = await aingest_resume(path)
+            recorder.add("wall_clock", (time.perf_counter() - upload_start) * 1000)
+            recorder.add_timings(result["timings"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(path) for path in paths))
+    recorder.report(
+        f"concurrent uploads (concurrency {concurrency})",
+        len(paths),
+        time.perf_counter() - start,
+        "uploads",
+    )
+
+
+async def run_chat(path: str, questions: int, concurrency: int) -> None:
+    from module.ingestion_pipeline import aingest_resume
+    from module.query_engine import astream_user_question
+
+    index = (await aingest_resume(path))["index"]
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(number: int) -> None:
+        # Distinct questions, so neither the answer cache nor coalescing hides work
+        question = f"What did the candidate do in role number {number}?"
+        async with semaphore:
+            ask_start = time.perf_counter()
+            first_token = None
+            async for _ in astream_user_question(index, question):
+                if first_token is None:
+                    first_token = time.perf_counter() - ask_start
+            recorder.add("first_token", (first_token or 0.0) * 1000)
+            recorder.add("answer", (time.perf_counter() - ask_start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(number) for number in range(questions)))
+    recorder.report(
+        f"chat burst (concurrency {concurrency})",
+        questions,
+        time.perf_counter() - start,
+        "answers",
+    )
+
+
+def run_cold_start(path: str, runs: int) -> None:
+    # Fresh interpreter each run: imports, client set-up and first requests
+    recorder = Recorder()
+    peak = 0.0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-start-child", path],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=os.environ,
+        ).stdout
+        measurements = json.loads(output.strip().splitlines()[-1])
+        peak = max(peak, measurements.pop("peak_rss_mb"))
+        for name, milliseconds in measurements.items():
+            recorder.add(name, milliseconds)
+
+    print(f"\ncold start: {runs} runs, child peak RSS {peak:.0f} MB")
+    recorder.print_percentiles()
+
+
+async def run_scenarios(
+    args, corpus: Dict[str, List[str]], all_paths: List[str]
+) -> None:
+    if "single" in args.scenarios:
+        await run_single(
+            {size: paths[: args.corpus_count] for size, paths in corpus.items()},
+            args.repeat,
+        )
+    if "concurrent" in args.scenarios:
+        await run_concurrent(all_paths[: args.concurrent_uploads], args.concurrency)
+    if "chat" in args.scenarios:
+        await run_chat(corpus["medium"][0], args.chat_questions, args.chat_concurrency)
+
+
+def cold_start_child(path: str) -> None:
+    measurements: Dict[str, Any] = {}
+
+    start = time.perf_counter()
+    import app  # noqa: F401
+
+    measurements["import_app"] = (time.perf_counter() - start) * 1000
+
+    from module.ingestion_pipeline import aingest_resume
+    from module.query_engine import aanswer_user_question
+
+    async def first_requests():
+        upload_start = time.perf_counter()
+        index = (await aingest_resume(path))["index"]
+        measurements["first_upload"] = (time.perf_counter() - upload_start) * 1000
+
+        answer_start = time.perf_counter()
+        await aanswer_user_question(index, "What is the most recent role?")
+        measurements["first_answer"] = (time.perf_counter() - answer_start) * 1000
+
+    asyncio.run(first_requests())
+    measurements["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(measurements))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--corpus-count", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--concurrent-uploads", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chat-questions", type=int, default=40)
+    parser.add_argument("--chat-concurrency", type=int, default=8)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--embed-latency-ms", type=float, default=40.0)
+    parser.add_argument("--with-caches", action="store_true")
+    parser.add_argument("--cold-start-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_child:
+        cold_start_child(args.cold_start_child)
+        return
+
+    # The stubs are reached through the optional `openai` embedding backend
+    if importlib.util.find_spec("llama_index.embeddings.openai") is None:
+        sys.exit(
+            "bench_pipeline.py needs the llama-index-embeddings-openai package: "
+            "pip install llama-index-embeddings-openai"
+        )
+
+    work_dir = tempfile.mkdtemp(prefix="resume_bench_")
+    stubs = start_stub_servers(args)
+    try:
+        configure_environment(stubs.url, work_dir, args.with_caches)
+        # Enough distinct resumes for the concurrent scenario
+        count = max(args.corpus_count, -(-args.concurrent_uploads // 3))
+        corpus = build_corpus(os.path.join(work_dir, "corpus"), count)
+        all_paths = [path for paths in corpus.values() for path in paths]
+        print(
+            f"Stub servers at {stubs.url} (ttft {args.ttft_ms:.0f}ms, "
+            f"{args.tokens_per_second:.0f} tok/s), {len(all_paths)} synthetic resumes"
+        )
+
+        asyncio.run(run_scenarios(args, corpus, all_paths))
+        if "cold" in args.scenarios:
+            run_cold_start(corpus["short"][0], args.cold_runs)
+    finally:
+        stubs.terminate()
+        stubs.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
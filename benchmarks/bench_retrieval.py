@@ -0,0 +1,107 @@
+"""Compare per-session retrieval: LlamaIndex `index.as_retriever` vs DenseRetriever.
+
+Embeddings come from a deterministic local hash model, so the numbers only
+measure retrieval overhead, not network time.
+
+    python benchmarks/bench_retrieval.py --nodes 10 50 200 --queries 200
+"""
+
+from typing import List
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core import VectorStoreIndex  # noqa: E402
+from llama_index.core.base.embeddings.base import BaseEmbedding  # noqa: E402
+from llama_index.core.schema import TextNode  # noqa: E402
+from module.vector_search import DenseRetriever  # noqa: E402
+import numpy as np  # noqa: E402
+
+
+class HashEmbedding(BaseEmbedding):
+    embed_dim: int = 384
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        return np.random.default_rng(seed).standard_normal(self.embed_dim).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def time_calls(fn, queries: List[str]) -> List[float]:
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(label: str, durations: List[float]) -> None:
+    print(
+        f"  {label:<30} mean={statistics.mean(durations):7.3f}ms "
+        f"p50={percentile(durations, 50):7.3f}ms p95={percentile(durations, 95):7.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=7)
+    args = parser.parse_args()
+
+    embed_model = HashEmbedding()
+    queries = [f"question {i} about python experience" for i in range(args.queries)]
+
+    for node_count in args.nodes:
+        nodes = [
+            TextNode(
+                text=f"resume chunk {i}", embedding=embed_model._embed(f"chunk {i}")
+            )
+            for i in range(node_count)
+        ]
+        index = VectorStoreIndex(nodes=nodes, embed_model=embed_model)
+        baseline = index.as_retriever(similarity_top_k=args.top_k)
+        dense = DenseRetriever(nodes, embed_model, similarity_top_k=args.top_k)
+
+        # Same top-k on both paths
+        for query in queries[:10]:
+            expected = [n.node.node_id for n in baseline.retrieve(query)]
+            actual = [n.node.node_id for n in dense.retrieve(query)]
+            assert expected == actual, "retrievers disagree"
+
+        # One scoring pass for many queries returns the same per-query top-k
+        sample = queries[:10]
+        batch = [[n.node.node_id for n in r] for r in dense.retrieve_batch(sample)]
+        single = [[n.node.node_id for n in dense.retrieve(q)] for q in sample]
+        assert batch == single, "batched retrieval disagrees"
+
+        print(f"{node_count} nodes, top_k={args.top_k}, {len(queries)} queries")
+        report("index.as_retriever", time_calls(baseline.retrieve, queries))
+        report("DenseRetriever.retrieve", time_calls(dense.retrieve, queries))
+
+        # Per query, for batches of 10 (the shape of the facts aspects)
+        batches = [queries[i : i + 10] for i in range(0, len(queries), 10)]
+        durations = time_calls(dense.retrieve_batch, batches)
+        report("DenseRetriever.retrieve_batch", [d / 10 for d in durations])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Import-time report for the server and CLI entry points.
+
+Imports each target in a fresh interpreter with `python -X importtime` and
+prints the total import time plus the packages it was spent in, so a heavy
+dependency creeping back into the startup path shows up at once. With
+--warm-up, it also times the warm-up phase that runs after server start.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --targets app --no-ui --warm-up
+"""
+
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+WARM_UP_CODE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+from module.warmup import warm_up
+print(json.dumps({"import_app": imported, **warm_up()}))
+"""
+
+
+def child_env(ui: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["UI_ENABLED"] = "true" if ui else "false"
+    # The report runs warm-up itself; keep the hook from doing it twice
+    env["WARMUP_ON_STARTUP"] = "false"
+    return env
+
+
+def import_times(target: str, env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    # (module, self us, cumulative us)
+    return [
+        (match.group(4), int(match.group(1)), int(match.group(2)))
+        for match in map(IMPORT_LINE.match, result.stderr.splitlines())
+        if match
+    ]
+
+
+def report_imports(target: str, env: Dict[str, str], top: int) -> None:
+    entries = import_times(target, env)
+    total = next(cumulative for name, _, cumulative in entries if name == target)
+
+    by_package: Dict[str, int] = {}
+    for name, self_time, _ in entries:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_time
+
+    print(
+        f"\nimport {target} (UI_ENABLED={env['UI_ENABLED']}): "
+        f"{total / 1000:.0f}ms, {len(entries)} modules"
+    )
+    print(f"  {'package':<28}{'ms':>9}{'share':>8}")
+    ranked = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    for package, self_time in ranked:
+        print(
+            f"  {package:<28}{self_time / 1000:>9.0f}{self_time / total * 100:>7.1f}%"
+        )
+
+
+def report_warm_up(env: Dict[str, str]) -> None:
+    output = subprocess.run(
+        [sys.executable, "-c", WARM_UP_CODE],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\nwarm-up after import app (UI_ENABLED={env['UI_ENABLED']})")
+    for name, seconds in timings.items():
+        print(f"  {name:<28}{seconds * 1000:>9.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--targets", nargs="+", default=["app", "main"])
+    parser.add_argument("--no-ui", action="store_true", help="Set UI_ENABLED=false")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--warm-up", action="store_true")
+    args = parser.parse_args()
+
+    env = child_env(ui=not args.no_ui)
+    for target in args.targets:
+        report_imports(target, env, args.top)
+    if args.warm_up:
+        report_warm_up(env)
+
+
+if __name__ == "__main__":
+    main()
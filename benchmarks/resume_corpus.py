@@ -0,0 +1,163 @@
+"""Synthetic resume PDFs of varying length for the pipeline benchmarks.
+
+Text-only PDFs are written directly, so no PDF library is needed and every
+run gets the same corpus for the same seed.
+
+    python benchmarks/resume_corpus.py --output temp/bench_corpus --count 3
+"""
+
+from typing import Dict, List
+import argparse
+import os
+import random
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Robin", "Kim", "Noor"]
+LAST_NAMES = ["Example", "Meyer", "Santos", "Okafor", "Nguyen", "Kowalski", "Haddad"]
+TITLES = [
+    "Software Engineer",
+    "Senior Software Engineer",
+    "Data Engineer",
+    "Backend Developer",
+    "Engineering Manager",
+    "Machine Learning Engineer",
+]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+SKILLS = [
+    "Python", "Go", "Java", "TypeScript", "FastAPI", "Django", "PostgreSQL",
+    "Redis", "Kafka", "Kubernetes", "Docker", "AWS", "GCP", "Terraform",
+    "PyTorch", "Spark", "Airflow", "React",
+]
+DUTIES = [
+    "Designed and operated services handling millions of requests per day",
+    "Led a team of engineers through a migration to event-driven architecture",
+    "Reduced infrastructure costs by tuning autoscaling and caching layers",
+    "Built data pipelines feeding dashboards used across the company",
+    "Mentored junior engineers and ran the hiring loop for the backend team",
+    "Introduced contract testing and cut production incidents by half",
+    "Shipped a recommendation feature that improved retention",
+]
+
+# Experience entries per size; "long" spans enough pages for parallel parsing
+SIZES: Dict[str, int] = {"short": 2, "medium": 6, "long": 60}
+
+LINES_PER_PAGE = 45
+
+
+def synthetic_resume(seed: int, experiences: int) -> List[str]:
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{rng.choice(TITLES)} - {rng.choice(['Berlin', 'Lisbon', 'Remote'])}",
+        f"{name.lower().replace(' ', '.')}@example.com",
+        "",
+        "Summary",
+        "Engineer focused on reliable backend systems and pragmatic delivery.",
+        "",
+        "Experience",
+    ]
+
+    year = 2025
+    for _ in range(experiences):
+        start = year - rng.randint(1, 3)
+        end = "present" if year == 2025 else str(year)
+        title, company = rng.choice(TITLES), rng.choice(COMPANIES)
+        lines.append(f"{title} at {company} ({start} - {end})")
+        lines.extend(f"- {duty}" for duty in rng.sample(DUTIES, 3))
+        lines.append("")
+        year = start
+
+    lines += [
+        "Education",
+        f"BSc Computer Science, Technical University ({year - 4} - {year})",
+        "",
+        "Skills",
+        ", ".join(rng.sample(SKILLS, 8)),
+        "",
+        "Certifications",
+        "AWS Solutions Architect Associate",
+        "",
+        "Languages",
+        "English, German",
+    ]
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, lines: List[str]) -> None:
+    pages = [
+        lines[i : i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)
+    ] or [[]]
+
+    # 1 catalog, 2 page tree, 3 font, then a page and a content stream per page
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page_lines in pages:
+        text = " ".join(f"({_escape(line)}) Tj T*" for line in page_lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 800 Td {text} ET".encode("latin-1", "replace")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % ref for ref in page_refs),
+        len(page_refs),
+    )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def build_corpus(
+    output_dir: str, count: int = 3, seed: int = 0
+) -> Dict[str, List[str]]:
+    # count resumes per size; contents differ so no cache or coalescing kicks in
+    os.makedirs(output_dir, exist_ok=True)
+    corpus: Dict[str, List[str]] = {}
+    for size_number, (size, experiences) in enumerate(SIZES.items()):
+        corpus[size] = []
+        for i in range(count):
+            path = os.path.join(output_dir, f"{size}_{i}.pdf")
+            resume_seed = seed * 10000 + size_number * 1000 + i
+            write_pdf(path, synthetic_resume(resume_seed, experiences))
+            corpus[size].append(path)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="temp/bench_corpus")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size, paths in build_corpus(args.output, args.count, args.seed).items():
+        print(f"{size}: {len(paths)} resumes in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
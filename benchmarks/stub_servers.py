@@ -0,0 +1,232 @@
+"""Local stand-in for the OpenAI-compatible chat and embedding APIs.
+
+Serves `/v1/chat/completions` (plain and streamed) and `/v1/embeddings` with
+configurable latency and token rate, so the app can be benchmarked without
+OpenRouter or HuggingFace and without their network jitter.
+
+    python benchmarks/stub_servers.py --port 8900 --ttft-ms 300 --tokens-per-second 80
+"""
+
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import numpy as np
+import uvicorn
+
+
+class StubSettings:
+    def __init__(
+        self,
+        ttft_ms: float = 300.0,
+        tokens_per_second: float = 80.0,
+        completion_tokens: int = 200,
+        embed_latency_ms: float = 40.0,
+        embed_ms_per_input: float = 1.0,
+        embed_dim: int = 384,
+        jitter: float = 0.1,
+    ):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.embed_latency_ms = embed_latency_ms
+        self.embed_ms_per_input = embed_ms_per_input
+        self.embed_dim = embed_dim
+        self.jitter = jitter
+
+    def delay(self, milliseconds: float) -> float:
+        spread = milliseconds * self.jitter
+        return max(0.0, milliseconds + random.uniform(-spread, spread)) / 1000
+
+
+WORDS = (
+    "the candidate has strong experience delivering backend services with python "
+    "and cloud infrastructure leading teams shipping reliable products on time"
+).split()
+
+
+def _profile_response(prompt: str) -> str:
+    # Roughly as many entries as the resume has, so longer resumes cost more
+    # output tokens, like with a real model
+    roles = re.findall(r"^(.+) at (.+) \((\d{4}) - (\d{4}|present)\)$", prompt, re.M)
+    profile = {
+        "name": "Alex Example",
+        "current_position": "Senior Software Engineer",
+        "location": "Berlin, Germany",
+        "summary": " ".join(WORDS),
+        "experiences": [
+            {"title": title, "company": company, "start": start, "end": end}
+            for title, company, start, end in roles
+        ],
+        "education": [{"degree": "BSc Computer Science", "school": "TU Berlin"}],
+        "skills": ["Python", "FastAPI", "PostgreSQL", "Kubernetes", "AWS"],
+        "certifications": ["AWS Solutions Architect"],
+        "languages": ["English", "German"],
+        "interests": ["Climbing"],
+    }
+    return json.dumps(profile)
+
+
+def _completion_text(body: Dict[str, Any], settings: StubSettings) -> str:
+    prompt = "\n".join(
+        str(message.get("content", "")) for message in body.get("messages", [])
+    )
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return _profile_response(prompt)
+
+    limit = body.get("max_completion_tokens") or body.get("max_tokens")
+    count = min(settings.completion_tokens, limit or settings.completion_tokens)
+    return " ".join(WORDS[i % len(WORDS)] for i in range(count))
+
+
+def _tokens(text: str) -> List[str]:
+    # One "token" per word is close enough to pace the stream
+    return re.findall(r"\S+\s*", text)
+
+
+def _embed(text: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+
+
+def create_app(settings: StubSettings) -> FastAPI:
+    app = FastAPI(title="Benchmark stub servers")
+    stats = {"chat_requests": 0, "embedding_requests": 0, "embedded_inputs": 0}
+
+    @app.get("/health")
+    async def health():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["chat_requests"] += 1
+
+        created = int(time.time())
+        model = body.get("model", "stub")
+        text = _completion_text(body, settings)
+        tokens = _tokens(text)
+        token_delay = 1000 / settings.tokens_per_second
+
+        if not body.get("stream"):
+            duration = settings.ttft_ms + len(tokens) * token_delay
+            await asyncio.sleep(settings.delay(duration))
+            return JSONResponse(
+                {
+                    "id": f"chatcmpl-{created}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(tokens),
+                    },
+                }
+            )
+
+        def chunk(delta: Dict[str, Any], finish_reason=None) -> str:
+            payload = {
+                "id": f"chatcmpl-{created}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(settings.delay(settings.ttft_ms))
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                yield chunk({"content": token})
+                await asyncio.sleep(settings.delay(token_delay))
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        stats["embedding_requests"] += 1
+        stats["embedded_inputs"] += len(inputs)
+
+        await asyncio.sleep(
+            settings.delay(
+                settings.embed_latency_ms + len(inputs) * settings.embed_ms_per_input
+            )
+        )
+
+        data = []
+        for position, text in enumerate(inputs):
+            vector = _embed(str(text), settings.embed_dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append(
+                {"object": "embedding", "index": position, "embedding": embedding}
+            )
+
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--embed-latency-ms", type=float, default=40.0)
+    parser.add_argument("--embed-ms-per-input", type=float, default=1.0)
+    parser.add_argument("--embed-dim", type=int, default=384)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        embed_latency_ms=args.embed_latency_ms,
+        embed_ms_per_input=args.embed_ms_per_input,
+        embed_dim=args.embed_dim,
+        jitter=args.jitter,
+    )
+    uvicorn.run(
+        create_app(settings), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
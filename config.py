@@ -1,18 +1,55 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pydantic import Field
+from typing import List
 
 
-class Settings(BaseSettings):
+class StartupSettings(BaseSettings):
+    # Read while app.py is imported, to mount and build the UI; kept apart so
+    # that import does not need the API keys
     PORT: int = Field(7860, env="PORT")
+    UI_ENABLED: bool = Field(True, env="UI_ENABLED")
+    CANNED_QUESTIONS: List[str] = Field(
+        [
+            "How many years of experience does the candidate have?",
+            "What is the candidate's most recent role?",
+            "What are the candidate's strongest technical skills?",
+            "What is the candidate's educational background?",
+        ],
+        env="CANNED_QUESTIONS",
+    )
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class Settings(StartupSettings):
     HUGGINGFACE_MODEL_EMBEDDING: str = Field(
         "sentence-transformers/all-MiniLM-L6-v2", env="HUGGINGFACE_MODEL_EMBEDDING"
     )
+    EMBEDDING_BACKEND: str = Field("huggingface_api", env="EMBEDDING_BACKEND")
+    EMBEDDING_BASE_URL: str = Field("", env="EMBEDDING_BASE_URL")
+    EMBEDDING_API_KEY: str = Field("", env="EMBEDDING_API_KEY")
+    LOCAL_EMBEDDING_BATCH_SIZE: int = Field(32, env="LOCAL_EMBEDDING_BATCH_SIZE")
+    LOCAL_EMBEDDING_THREADS: int = Field(0, env="LOCAL_EMBEDDING_THREADS")
+    LOCAL_EMBEDDING_RUNTIME: str = Field("torch", env="LOCAL_EMBEDDING_RUNTIME")
+    LOCAL_EMBEDDING_MODEL_FILE: str = Field("", env="LOCAL_EMBEDDING_MODEL_FILE")
+    EMBEDDING_CACHE_ENABLED: bool = Field(True, env="EMBEDDING_CACHE_ENABLED")
+    EMBEDDING_CACHE_DB_PATH: str = Field(
+        "data/embedding_cache.db", env="EMBEDDING_CACHE_DB_PATH"
+    )
+    EMBEDDING_CACHE_MAX_ITEMS: int = Field(50000, env="EMBEDDING_CACHE_MAX_ITEMS")
+    EMBEDDING_CACHE_MAX_ROWS: int = Field(100000, env="EMBEDDING_CACHE_MAX_ROWS")
     HUGGINGFACE_MODEL_LLM: str = Field(..., env="HUGGINGFACE_MODEL_LLM")
     HUGGINGFACE_TOKEN: str = Field(..., env="HUGGINGFACE_TOKEN")
 
     OPENROUTER_API_KEY: str = Field(..., env="OPENROUTER_API_KEY")
     OPENROUTER_MODEL: str = Field("deepseek/deepseek-chat-v3.1", env="OPENROUTER_MODEL")
+    OPENROUTER_BASE_URL: str = Field(
+        "https://openrouter.ai/api/v1", env="OPENROUTER_BASE_URL"
+    )
 
     TOP_K: int = Field(5, env="TOP_K")
     TOP_P: float = Field(0.95, env="TOP_P")
@@ -22,11 +59,99 @@ class Settings(BaseSettings):
     TEMPERATURE: float = Field(0.1, env="TEMPERATURE")
 
     CHUNK_SIZE: int = Field(400, env="CHUNK_SIZE")
-    SIMILARITY_TOP_K: int = Field(7, env="SIMILARITY_TOP_K")
+    SIMILARITY_TOP_K: int = Field(4, env="SIMILARITY_TOP_K")
+    INDEX_PDF_TEXT: bool = Field(True, env="INDEX_PDF_TEXT")
+    VERIFY_INDEX: bool = Field(False, env="VERIFY_INDEX")
+    RETRIEVAL_ENGINE: str = Field("hybrid", env="RETRIEVAL_ENGINE")
+    HYBRID_RRF_K: int = Field(60, env="HYBRID_RRF_K")
+    HYBRID_KEYWORD_MAX_TERMS: int = Field(3, env="HYBRID_KEYWORD_MAX_TERMS")
+    CONTEXT_TOKEN_BUDGET: int = Field(1200, env="CONTEXT_TOKEN_BUDGET")
+    CONTEXT_SCORE_CUTOFF: float = Field(0.2, env="CONTEXT_SCORE_CUTOFF")
+    CONTEXT_DEDUP_THRESHOLD: float = Field(0.8, env="CONTEXT_DEDUP_THRESHOLD")
+
+    SECTION_EXTRACTION_ENABLED: bool = Field(True, env="SECTION_EXTRACTION_ENABLED")
+    EXTRACTION_CHUNK_CHARS: int = Field(6000, env="EXTRACTION_CHUNK_CHARS")
+    EXTRACTION_MAX_NEW_TOKENS: int = Field(1000, env="EXTRACTION_MAX_NEW_TOKENS")
+    PDF_EXTRACTION_WORKERS: int = Field(0, env="PDF_EXTRACTION_WORKERS")
+    PDF_PARALLEL_MIN_PAGES: int = Field(6, env="PDF_PARALLEL_MIN_PAGES")
+
+    OPENROUTER_REQUESTS_PER_MINUTE: int = Field(0, env="OPENROUTER_REQUESTS_PER_MINUTE")
+    HUGGINGFACE_REQUESTS_PER_MINUTE: int = Field(
+        0, env="HUGGINGFACE_REQUESTS_PER_MINUTE"
+    )
+
+    OPENROUTER_MAX_CONCURRENCY: int = Field(8, env="OPENROUTER_MAX_CONCURRENCY")
+    HUGGINGFACE_MAX_CONCURRENCY: int = Field(4, env="HUGGINGFACE_MAX_CONCURRENCY")
+    LLM_TIMEOUT_SECONDS: float = Field(60.0, env="LLM_TIMEOUT_SECONDS")
+    LLM_CONNECT_TIMEOUT_SECONDS: float = Field(10.0, env="LLM_CONNECT_TIMEOUT_SECONDS")
+    LLM_MAX_RETRIES: int = Field(3, env="LLM_MAX_RETRIES")
+    LLM_FALLBACK_ENABLED: bool = Field(False, env="LLM_FALLBACK_ENABLED")
+    LLM_FALLBACK_AFTER_SECONDS: float = Field(20.0, env="LLM_FALLBACK_AFTER_SECONDS")
+    HTTP_MAX_CONNECTIONS: int = Field(20, env="HTTP_MAX_CONNECTIONS")
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        10, env="HTTP_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    HTTP_KEEPALIVE_SECONDS: float = Field(60.0, env="HTTP_KEEPALIVE_SECONDS")
+
+    BATCH_WORKERS: int = Field(4, env="BATCH_WORKERS")
+    BATCH_MAX_RETRIES: int = Field(3, env="BATCH_MAX_RETRIES")
+    BATCH_RETRY_BASE_DELAY: float = Field(2.0, env="BATCH_RETRY_BASE_DELAY")
+    BATCH_OUTPUT_DIR: str = Field("data/batches", env="BATCH_OUTPUT_DIR")
+    BATCH_INPUT_DIR: str = Field("data/batch_inputs", env="BATCH_INPUT_DIR")
+    BATCH_PROGRESS_TTL_SECONDS: int = Field(
+        24 * 60 * 60, env="BATCH_PROGRESS_TTL_SECONDS"
+    )
+
+    CANDIDATE_INDEX_ENABLED: bool = Field(True, env="CANDIDATE_INDEX_ENABLED")
+    CANDIDATE_INDEX_DIR: str = Field("data/candidate_index", env="CANDIDATE_INDEX_DIR")
+
+    RANK_SHORTLIST_SIZE: int = Field(20, env="RANK_SHORTLIST_SIZE")
+    RANK_BATCH_SIZE: int = Field(10, env="RANK_BATCH_SIZE")
+    RANK_CHUNKS_PER_CANDIDATE: int = Field(3, env="RANK_CHUNKS_PER_CANDIDATE")
+    RANK_MAX_NEW_TOKENS: int = Field(1500, env="RANK_MAX_NEW_TOKENS")
+
+    RESUME_CACHE_ENABLED: bool = Field(True, env="RESUME_CACHE_ENABLED")
+    RESUME_CACHE_DIR: str = Field("data/resume_cache", env="RESUME_CACHE_DIR")
+    RESUME_CACHE_MAX_BYTES: int = Field(256 * 1024 * 1024, env="RESUME_CACHE_MAX_BYTES")
+
+    CANDIDATE_BUNDLE_ENABLED: bool = Field(True, env="CANDIDATE_BUNDLE_ENABLED")
+    CANDIDATE_BUNDLE_DIR: str = Field("data/candidates", env="CANDIDATE_BUNDLE_DIR")
+    CANDIDATE_BUNDLE_DTYPE: str = Field("float16", env="CANDIDATE_BUNDLE_DTYPE")
+
+    SESSION_DB_PATH: str = Field("data/sessions.db", env="SESSION_DB_PATH")
+    SESSION_TTL_SECONDS: int = Field(6 * 60 * 60, env="SESSION_TTL_SECONDS")
+    SESSION_MAX_ITEMS: int = Field(100, env="SESSION_MAX_ITEMS")
+    SESSION_MAX_BYTES: int = Field(256 * 1024 * 1024, env="SESSION_MAX_BYTES")
+
+    ANSWER_CACHE_ENABLED: bool = Field(True, env="ANSWER_CACHE_ENABLED")
+    ANSWER_CACHE_SIMILARITY: float = Field(0.92, env="ANSWER_CACHE_SIMILARITY")
+    ANSWER_CACHE_TTL_SECONDS: int = Field(60 * 60, env="ANSWER_CACHE_TTL_SECONDS")
+    ANSWER_CACHE_MAX_ENTRIES: int = Field(100, env="ANSWER_CACHE_MAX_ENTRIES")
+    ANSWER_CACHE_MAX_SESSIONS: int = Field(1000, env="ANSWER_CACHE_MAX_SESSIONS")
+    CONTEXT_CACHE_MAX_ITEMS: int = Field(1000, env="CONTEXT_CACHE_MAX_ITEMS")
+
+    JOB_DB_PATH: str = Field("data/jobs.db", env="JOB_DB_PATH")
+    JOB_UPLOAD_DIR: str = Field("temp/uploads", env="JOB_UPLOAD_DIR")
+    JOB_MAX_UPLOAD_BYTES: int = Field(10 * 1024 * 1024, env="JOB_MAX_UPLOAD_BYTES")
+    JOB_MAX_CONCURRENCY: int = Field(4, env="JOB_MAX_CONCURRENCY")
+    JOB_MAX_PENDING: int = Field(100, env="JOB_MAX_PENDING")
+    JOB_UI_PRIORITY: int = Field(10, env="JOB_UI_PRIORITY")
+    JOB_TTL_SECONDS: int = Field(24 * 60 * 60, env="JOB_TTL_SECONDS")
+
+    WARMUP_ON_STARTUP: bool = Field(True, env="WARMUP_ON_STARTUP")
+
+    METRICS_ENABLED: bool = Field(True, env="METRICS_ENABLED")
+    TRACE_SAMPLE_RATE: float = Field(0.0, env="TRACE_SAMPLE_RATE")
+    TRACE_BUFFER_SIZE: int = Field(100, env="TRACE_BUFFER_SIZE")
+    LLM_PROMPT_COST_PER_MTOKENS: float = Field(0.0, env="LLM_PROMPT_COST_PER_MTOKENS")
+    LLM_COMPLETION_COST_PER_MTOKENS: float = Field(
+        0.0, env="LLM_COMPLETION_COST_PER_MTOKENS"
+    )
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+        extra = "forbid"
 
 
 @lru_cache()
@@ -34,4 +159,16 @@ def get_settings():
     return Settings()
 
 
-settings = get_settings()
+@lru_cache()
+def get_startup_settings():
+    return StartupSettings()
+
+
+class _LazySettings:
+    # Reads the environment on first attribute access instead of at import,
+    # so modules (and `main.py --help`) load without a complete .env
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
@@ -1,11 +1,9 @@
-from module.extract_profile_pdf import extract_profile_pdf
-from module.data_processing import (
-    split_profile_data,
-    create_vector_index,
-    verify_embedding_model,
-)
-from module.query_engine import generate_facts_candidate, answer_user_question
+from config import settings as config
+import argparse
+import asyncio
 import logging
+import os
+import time
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,14 +13,29 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOCUMENT_PATH = "cv_dyaksa_jauharddin_nour_02-06-2025.pdf"
+
 
+# Pipeline modules are imported by the subcommand that needs them, so
+# `--help` and argument errors return without loading LlamaIndex
 def process_resume(document_path: str):
+    from module.extract_profile_pdf import extract_profile_pdf
+    from module.data_processing import (
+        split_profile_data,
+        create_vector_index,
+        export_index_nodes,
+        verify_index_integrity,
+    )
+    from module.query_engine import generate_facts_candidate
+    from module.candidate_bundle import get_candidate_bundle_store
+    from module.resume_cache import compute_file_hash
+
     try:
         logger.info(f"Processing resume at path: {document_path}")
 
         profile_data = extract_profile_pdf(document_path)
 
-        if not profile_data:
+        if profile_data.is_empty():
             logger.error("No profile data extracted from PDF")
             return
 
@@ -36,13 +49,25 @@ def process_resume(document_path: str):
             logger.error("Failed to create vector index")
             return
 
-        if not verify_embedding_model(index):
-            logger.error("Embedding model verification failed")
+        if config.VERIFY_INDEX and not verify_index_integrity(index):
+            logger.error("Index integrity check failed")
             return
 
         initial_facts = generate_facts_candidate(index)
         logger.info(f"Initial facts about candidate: {initial_facts}")
 
+        if config.CANDIDATE_BUNDLE_ENABLED:
+            # The index embedded copies of the split nodes; the bundle needs
+            # the copies, which carry the vectors
+            candidate_id = compute_file_hash(document_path)
+            if get_candidate_bundle_store().save(
+                candidate_id,
+                profile_data.model_dump(),
+                export_index_nodes(index),
+                initial_facts,
+            ):
+                print(f"Candidate ID: {candidate_id}")
+
         chatbot_interface(index)
 
     except Exception as e:
@@ -50,7 +75,33 @@ def process_resume(document_path: str):
         return
 
 
+def open_candidate(candidate_id: str):
+    # Saved candidates reopen from disk without any extraction or embedding call
+    from module.data_processing import create_vector_index
+    from module.candidate_bundle import get_candidate_bundle_store
+
+    start = time.perf_counter()
+    bundle = get_candidate_bundle_store().load(candidate_id)
+    if bundle is None:
+        logger.error(f"No saved candidate found for ID: {candidate_id}")
+        return
+
+    index = create_vector_index(bundle["nodes"])
+    if not index:
+        logger.error("Failed to create vector index")
+        return
+
+    logger.info(
+        f"Opened candidate {bundle['candidate_id'][:12]} "
+        f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    print(bundle["initial_facts"])
+    chatbot_interface(index)
+
+
 def chatbot_interface(index):
+    from module.query_engine import answer_user_question
+
     print("Welcome to the Resume Chatbot! Type 'exit' to quit.")
 
     while True:
@@ -63,11 +114,117 @@ def chatbot_interface(index):
         print(f"Bot: {answer}")
 
 
+def batch_process(args):
+    from module.batch_ingestion import arun_batch, collect_resume_paths
+    from module.llm_interface import get_rate_limiter
+
+    paths = collect_resume_paths(args.inputs)
+    if not paths:
+        logger.error("No PDF files found to process")
+        return
+
+    if args.openrouter_rpm is not None:
+        get_rate_limiter("openrouter").requests_per_minute = args.openrouter_rpm
+    if args.huggingface_rpm is not None:
+        get_rate_limiter("huggingface").requests_per_minute = args.huggingface_rpm
+
+    output_path = args.output or os.path.join(
+        config.BATCH_OUTPUT_DIR, f"batch_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+    )
+
+    logger.info(f"Processing {len(paths)} resumes into {output_path}")
+    summary = asyncio.run(
+        arun_batch(
+            paths,
+            output_path,
+            workers=args.workers,
+            max_retries=args.max_retries,
+        )
+    )
+    print(
+        f"Processed {summary['completed']} resumes ({summary['failed']} failed) "
+        f"in {summary['elapsed_seconds']:.1f}s, {summary['cvs_per_minute']:.1f} CVs/min"
+    )
+
+
+def rank_candidates(args):
+    from module.candidate_ranking import arank_candidates
+
+    with open(args.job_description, encoding="utf-8") as f:
+        job_description = f.read()
+
+    ranking = asyncio.run(
+        arank_candidates(job_description, top_n=args.top_n, skills=args.skills)
+    )
+    for position, candidate in enumerate(ranking["candidates"], start=1):
+        score = "-" if candidate["score"] is None else f"{candidate['score']:.0f}"
+        print(
+            f"{position:>3}. {score:>3}  {candidate['name'] or 'Unknown'} "
+            f"({candidate['candidate_id'][:12]}) {candidate['reason']}"
+        )
+    print(
+        f"{ranking['shortlisted']} candidates shortlisted, "
+        f"{ranking['llm_calls']} LLM calls"
+    )
+
+
 def main():
-    document_path = "cv_dyaksa_jauharddin_nour_02-06-2025.pdf"
-    index = process_resume(document_path)
-    if index:
-        chatbot_interface(index)
+    parser = argparse.ArgumentParser(description="Resume Chatbot CLI")
+    subparsers = parser.add_subparsers(dest="command")
+
+    chat_parser = subparsers.add_parser("chat", help="Chat about a single resume")
+    chat_parser.add_argument(
+        "document_path",
+        nargs="?",
+        default=DEFAULT_DOCUMENT_PATH,
+    )
+
+    open_parser = subparsers.add_parser(
+        "open", help="Chat about a previously processed candidate by ID"
+    )
+    open_parser.add_argument("candidate_id")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Ingest a folder or list of resumes into JSONL"
+    )
+    batch_parser.add_argument("inputs", nargs="+", help="PDF files or directories")
+    batch_parser.add_argument("--output", help="JSONL file to append results to")
+    batch_parser.add_argument(
+        "--workers", type=int, help="Concurrent resumes (default: BATCH_WORKERS)"
+    )
+    batch_parser.add_argument(
+        "--max-retries",
+        type=int,
+        help="Retries per resume (default: BATCH_MAX_RETRIES)",
+    )
+    batch_parser.add_argument("--openrouter-rpm", type=int)
+    batch_parser.add_argument("--huggingface-rpm", type=int)
+
+    rank_parser = subparsers.add_parser(
+        "rank", help="Rank indexed candidates against a job description"
+    )
+    rank_parser.add_argument(
+        "job_description", help="Text file with the job description"
+    )
+    rank_parser.add_argument(
+        "--top-n",
+        type=int,
+        help="Candidates to shortlist (default: RANK_SHORTLIST_SIZE)",
+    )
+    rank_parser.add_argument(
+        "--skills", nargs="*", default=[], help="Skills every candidate must have"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        batch_process(args)
+    elif args.command == "rank":
+        rank_candidates(args)
+    elif args.command == "open":
+        open_candidate(args.candidate_id)
+    else:
+        process_resume(getattr(args, "document_path", DEFAULT_DOCUMENT_PATH))
 
 
 if __name__ == "__main__":
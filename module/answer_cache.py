@@ -0,0 +1,231 @@
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import MetadataMode, NodeWithScore
+from module.data_processing import export_index_nodes
+from module.metrics import record_cache
+from config import settings as config
+from functools import lru_cache
+import numpy as np
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", re.sub(r"\s+", " ", question.lower())).strip()
+
+
+class _CachedAnswer:
+    def __init__(
+        self,
+        question: str,
+        embedding: Optional[np.ndarray],
+        answer: str,
+        compute_seconds: float,
+    ):
+        self.question = question
+        self.embedding = embedding
+        self.answer = answer
+        self.compute_seconds = compute_seconds
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        similarity_threshold: float,
+        ttl_seconds: int,
+        max_entries_per_session: int,
+        max_sessions: int,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_session = max_entries_per_session
+        self.max_sessions = max_sessions
+
+        self._sessions: "OrderedDict[str, List[_CachedAnswer]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "seconds_saved": 0.0}
+
+    def lookup(
+        self,
+        session_id: str,
+        question: str,
+        question_embedding: Optional[List[float]] = None,
+    ) -> Optional[str]:
+        normalized = normalize_question(question)
+        now = time.time()
+
+        with self._lock:
+            entries = [
+                entry
+                for entry in self._sessions.get(session_id, [])
+                if now - entry.created_at <= self.ttl_seconds
+            ]
+            if session_id in self._sessions:
+                self._sessions[session_id] = entries
+                self._sessions.move_to_end(session_id)
+
+            # Exact repeats match without an embedding (keyword queries are
+            # retrieved lexically and never embedded)
+            match, similarity = None, 1.0
+            for entry in entries:
+                if normalize_question(entry.question) == normalized:
+                    match = entry
+                    break
+
+            embedded = [entry for entry in entries if entry.embedding is not None]
+            if match is None and question_embedding is not None and embedded:
+                query = np.asarray(question_embedding, dtype=np.float32)
+                query /= max(float(np.linalg.norm(query)), 1e-12)
+                scores = np.stack([entry.embedding for entry in embedded]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    match, similarity = embedded[best], float(scores[best])
+
+            if match is None:
+                self._stats["misses"] += 1
+                record_cache("answer", False)
+                return None
+
+            self._stats["hits"] += 1
+            self._stats["seconds_saved"] += match.compute_seconds
+            record_cache("answer", True)
+            logger.info(
+                f"Answer cache hit for session {session_id} "
+                f"(similarity={similarity:.3f}, "
+                f"saved {match.compute_seconds:.2f}s)"
+            )
+            return match.answer
+
+    def store(
+        self,
+        session_id: str,
+        question: str,
+        question_embedding: Optional[List[float]],
+        answer: str,
+        compute_seconds: float,
+    ) -> None:
+        embedding = None
+        if question_embedding is not None:
+            embedding = np.asarray(question_embedding, dtype=np.float32)
+            embedding /= max(float(np.linalg.norm(embedding)), 1e-12)
+
+        with self._lock:
+            entries = self._sessions.setdefault(session_id, [])
+            entries.append(_CachedAnswer(question, embedding, answer, compute_seconds))
+            del entries[: -self.max_entries_per_session]
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._sessions)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class ContextCache:
+    # Retrieved nodes for canned questions, shared by every session that
+    # looks at the same candidate content
+    def __init__(self, canned_questions: List[str], max_items: int):
+        self.canned_questions = {normalize_question(q) for q in canned_questions}
+        self.max_items = max_items
+
+        self._items: "OrderedDict[tuple, List[NodeWithScore]]" = OrderedDict()
+        self._fingerprints: "weakref.WeakKeyDictionary[VectorStoreIndex, str]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def _key(self, index: VectorStoreIndex, question: str) -> Optional[tuple]:
+        normalized = normalize_question(question)
+        if normalized not in self.canned_questions:
+            return None
+
+        with self._lock:
+            fingerprint = self._fingerprints.get(index)
+        if fingerprint is None:
+            hasher = hashlib.sha256()
+            texts = [
+                node.get_content(MetadataMode.NONE)
+                for node in export_index_nodes(index)
+            ]
+            for text in sorted(texts):
+                hasher.update(text.encode("utf-8"))
+            fingerprint = hasher.hexdigest()
+            with self._lock:
+                self._fingerprints[index] = fingerprint
+
+        return fingerprint, normalized
+
+    def get(
+        self, index: VectorStoreIndex, question: str
+    ) -> Optional[List[NodeWithScore]]:
+        key = self._key(index, question)
+        if key is None:
+            return None
+
+        with self._lock:
+            nodes = self._items.get(key)
+            if nodes is None:
+                self._stats["misses"] += 1
+                record_cache("context", False)
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            record_cache("context", True)
+            return nodes
+
+    def put(
+        self, index: VectorStoreIndex, question: str, nodes: List[NodeWithScore]
+    ) -> None:
+        key = self._key(index, question)
+        if key is None:
+            return
+
+        with self._lock:
+            self._items[key] = nodes
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["items"] = len(self._items)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+@lru_cache()
+def get_answer_cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache(
+        similarity_threshold=config.ANSWER_CACHE_SIMILARITY,
+        ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+        max_entries_per_session=config.ANSWER_CACHE_MAX_ENTRIES,
+        max_sessions=config.ANSWER_CACHE_MAX_SESSIONS,
+    )
+
+
+@lru_cache()
+def get_context_cache() -> ContextCache:
+    return ContextCache(
+        canned_questions=config.CANNED_QUESTIONS,
+        max_items=config.CONTEXT_CACHE_MAX_ITEMS,
+    )
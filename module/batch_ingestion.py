@@ -0,0 +1,213 @@
+from typing import Any, Dict, List, Optional
+from module.ingestion_pipeline import aingest_resume, IngestionError
+from module.candidate_index import index_candidate
+from module.candidate_bundle import get_candidate_bundle_store, save_candidate_bundle
+from module.singleflight import get_singleflight
+from module.resume_cache import (
+    compute_file_hash,
+    compute_resume_key,
+    get_resume_cache,
+)
+from config import settings as config
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+# batch_id -> progress of batches started from this process; finished ones are
+# kept for BATCH_PROGRESS_TTL_SECONDS
+batch_progress: Dict[str, Dict[str, Any]] = {}
+
+
+def _evict_finished_batches() -> None:
+    cutoff = time.time() - config.BATCH_PROGRESS_TTL_SECONDS
+    expired = [
+        batch_id
+        for batch_id, progress in batch_progress.items()
+        if progress.get("finished_at", float("inf")) < cutoff
+    ]
+    for batch_id in expired:
+        del batch_progress[batch_id]
+
+
+def get_batch_progress(batch_id: str) -> Optional[Dict[str, Any]]:
+    _evict_finished_batches()
+    return batch_progress.get(batch_id)
+
+
+def resolve_input_path(path: str, root: str) -> str:
+    # HTTP callers name inputs relative to the batch input directory; anything
+    # resolving outside it (absolute paths, "..", symlinks) is refused
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path is outside the batch input directory: {path}")
+    return resolved
+
+
+def collect_resume_paths(inputs: List[str]) -> List[str]:
+    paths = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for file_name in sorted(os.listdir(input_path)):
+                if file_name.lower().endswith(".pdf"):
+                    paths.append(os.path.join(input_path, file_name))
+        elif os.path.isfile(input_path):
+            paths.append(input_path)
+        else:
+            logger.warning(f"Skipping missing resume path: {input_path}")
+
+    return paths
+
+
+async def _aingest_with_retries(document_path: str, max_retries: int) -> Dict[str, Any]:
+    file_hash = await asyncio.to_thread(compute_file_hash, document_path)
+    cache_key = compute_resume_key(file_hash)
+
+    if config.RESUME_CACHE_ENABLED:
+        cached = await asyncio.to_thread(get_resume_cache().get, cache_key)
+        if cached:
+            if not get_candidate_bundle_store().resolve(file_hash):
+                await asyncio.to_thread(save_candidate_bundle, file_hash, cached)
+            await asyncio.to_thread(
+                index_candidate, file_hash, cached["profile_data"], cached["nodes"]
+            )
+            return {
+                "candidate_id": file_hash,
+                "profile_data": cached["profile_data"],
+                "initial_facts": cached["initial_facts"],
+                "num_chunks": len(cached["nodes"]),
+                "attempts": 0,
+                "cached": True,
+            }
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            # The same PDF listed twice, or uploaded in the UI meanwhile, is
+            # only ingested once
+            result = await get_singleflight("ingest").do_with_events(
+                cache_key,
+                lambda publish: aingest_resume(document_path, on_facts_token=publish),
+            )
+            break
+        except IngestionError:
+            # Deterministic failures (empty PDF, nothing extracted) won't
+            # succeed on a retry
+            raise
+        except Exception as e:
+            if attempt > max_retries:
+                raise
+            delay = config.BATCH_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            delay += random.uniform(0, delay)
+            logger.warning(
+                f"Attempt {attempt} failed for {document_path}: {e}; "
+                f"retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    # The candidate_id written to the output reopens the resume by ID
+    await asyncio.to_thread(save_candidate_bundle, file_hash, result)
+    if config.RESUME_CACHE_ENABLED:
+        await asyncio.to_thread(
+            get_resume_cache().put,
+            cache_key,
+            result["profile_data"],
+            result["nodes"],
+            result["initial_facts"],
+        )
+
+    await asyncio.to_thread(
+        index_candidate, file_hash, result["profile_data"], result["nodes"]
+    )
+
+    return {
+        "candidate_id": file_hash,
+        "profile_data": result["profile_data"],
+        "initial_facts": result["initial_facts"],
+        "num_chunks": len(result["nodes"]),
+        "attempts": attempt,
+        "cached": False,
+    }
+
+
+async def arun_batch(
+    paths: List[str],
+    output_path: str,
+    workers: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    batch_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    workers = workers or config.BATCH_WORKERS
+    if max_retries is None:
+        max_retries = config.BATCH_MAX_RETRIES
+    batch_id = batch_id or str(uuid.uuid4())
+    _evict_finished_batches()
+    progress = {
+        "batch_id": batch_id,
+        "status": "running",
+        "output_path": output_path,
+        "total": len(paths),
+        "completed": 0,
+        "failed": 0,
+        "cvs_per_minute": 0.0,
+    }
+    batch_progress[batch_id] = progress
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    semaphore = asyncio.Semaphore(workers)
+    write_lock = asyncio.Lock()
+    start_time = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as output_file:
+
+        async def process(document_path: str):
+            async with semaphore:
+                file_start = time.monotonic()
+                record = {"file": document_path}
+                try:
+                    record.update(
+                        await _aingest_with_retries(document_path, max_retries)
+                    )
+                    record["status"] = "ok"
+                except Exception as e:
+                    logger.error(f"Failed to ingest {document_path}: {e}")
+                    record["status"] = "error"
+                    record["error"] = str(e)
+                record["duration_seconds"] = round(time.monotonic() - file_start, 3)
+
+            async with write_lock:
+                output_file.write(json.dumps(record) + "\n")
+                output_file.flush()
+
+                progress["completed"] += 1
+                if record["status"] == "error":
+                    progress["failed"] += 1
+                elapsed_minutes = (time.monotonic() - start_time) / 60
+                progress["cvs_per_minute"] = round(
+                    progress["completed"] / max(elapsed_minutes, 1e-9), 2
+                )
+                logger.info(
+                    f"Batch {batch_id[:8]}: "
+                    f"{progress['completed']}/{progress['total']} done, "
+                    f"{progress['failed']} failed, "
+                    f"{progress['cvs_per_minute']:.1f} CVs/min"
+                )
+
+        await asyncio.gather(*(process(path) for path in paths))
+
+    progress["status"] = "finished"
+    progress["finished_at"] = time.time()
+    progress["elapsed_seconds"] = round(time.monotonic() - start_time, 3)
+    logger.info(f"Batch {batch_id[:8]} finished: {progress}")
+    return progress
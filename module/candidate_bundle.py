@@ -0,0 +1,248 @@
+from typing import Any, Dict, List, Optional, Tuple
+from llama_index.core.schema import TextNode
+from config import settings as config
+from functools import lru_cache
+import numpy as np
+import glob
+import json
+import logging
+import os
+import re
+import struct
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   preamble   magic, format version, embedding dtype code, header length
+#   header     UTF-8 JSON: profile, facts, node dicts without embeddings
+#   scales     float32 per row (int8 only), 64-byte aligned
+#   embeddings row-major (nodes, dimension) float16 or int8, 64-byte aligned
+BUNDLE_MAGIC = b"RCBUNDLE"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".rcb"
+BUNDLE_ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sHBxI")
+_DTYPE_CODES = {"float16": 0, "int8": 1}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+
+_CANDIDATE_ID_PATTERN = re.compile(r"[0-9a-f]{8,64}")
+
+
+class BundleFormatError(Exception):
+    pass
+
+
+def _align(offset: int) -> int:
+    return -(-offset // BUNDLE_ALIGNMENT) * BUNDLE_ALIGNMENT
+
+
+def _layout(header_length: int, num_nodes: int, dtype: str) -> Tuple[int, int]:
+    # (scales offset, embeddings offset); both derivable from the preamble
+    scales_offset = _align(_PREAMBLE.size + header_length)
+    if dtype != "int8":
+        return scales_offset, scales_offset
+    return scales_offset, _align(scales_offset + num_nodes * 4)
+
+
+def quantize_embeddings(
+    matrix: np.ndarray, dtype: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+
+    # Symmetric per-row scale keeps each row's direction; cosine similarity
+    # is unaffected by the scale itself
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127)
+    return quantized.astype(np.int8), scales.astype(np.float32)
+
+
+def write_bundle(
+    path: str,
+    profile_data: Any,
+    nodes: List[TextNode],
+    initial_facts: str,
+    dtype: str = "float16",
+) -> int:
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported bundle dtype: {dtype}")
+
+    node_dicts = []
+    embeddings = []
+    for node in nodes:
+        node_dict = node.to_dict()
+        embeddings.append(node_dict.pop("embedding", None) or [])
+        node_dicts.append(node_dict)
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[1] == 0:
+        raise ValueError("Every node needs an embedding of the same dimension")
+    quantized, scales = quantize_embeddings(matrix, dtype)
+
+    header = json.dumps(
+        {
+            "profile_data": profile_data,
+            "initial_facts": initial_facts,
+            "nodes": node_dicts,
+            "shape": list(matrix.shape),
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "embedding_model": config.HUGGINGFACE_MODEL_EMBEDDING,
+        }
+    ).encode("utf-8")
+    scales_offset, embeddings_offset = _layout(len(header), len(nodes), dtype)
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(
+            _PREAMBLE.pack(
+                BUNDLE_MAGIC, BUNDLE_VERSION, _DTYPE_CODES[dtype], len(header)
+            )
+        )
+        f.write(header)
+        if scales is not None:
+            f.seek(scales_offset)
+            f.write(scales.tobytes())
+        f.seek(embeddings_offset)
+        f.write(np.ascontiguousarray(quantized).tobytes())
+        size = f.tell()
+    os.replace(temp_path, path)
+    return size
+
+
+def read_bundle(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise BundleFormatError("Truncated bundle")
+        magic, version, dtype_code, header_length = _PREAMBLE.unpack(preamble)
+        if magic != BUNDLE_MAGIC:
+            raise BundleFormatError("Not a candidate bundle")
+        if version != BUNDLE_VERSION or dtype_code not in _CODE_DTYPES:
+            raise BundleFormatError(f"Unsupported bundle version {version}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    dtype = _CODE_DTYPES[dtype_code]
+    num_nodes, dimension = header["shape"]
+    scales_offset, embeddings_offset = _layout(header_length, num_nodes, dtype)
+
+    matrix = np.empty((0, dimension), dtype=np.float32)
+    if num_nodes:
+        # Every vector becomes a node embedding list below, so the whole block
+        # is needed: one read of exactly that block, no per-row parsing
+        with open(path, "rb") as f:
+            f.seek(embeddings_offset)
+            embeddings = np.fromfile(
+                f, dtype=np.dtype(dtype), count=num_nodes * dimension
+            )
+            if embeddings.size != num_nodes * dimension:
+                raise BundleFormatError("Truncated bundle")
+            matrix = embeddings.reshape(num_nodes, dimension).astype(np.float32)
+
+            if dtype == "int8":
+                f.seek(scales_offset)
+                scales = np.fromfile(f, dtype=np.float32, count=num_nodes)
+                if scales.size != num_nodes:
+                    raise BundleFormatError("Truncated bundle")
+                matrix *= scales[:, None]
+
+    nodes = []
+    for node_dict, embedding in zip(header["nodes"], matrix):
+        node = TextNode.from_dict(node_dict)
+        node.embedding = embedding.tolist()
+        nodes.append(node)
+
+    header["nodes"] = nodes
+    header["dtype"] = dtype
+    return header
+
+
+class CandidateBundleStore:
+    def __init__(self, bundle_dir: str, dtype: str):
+        self.bundle_dir = bundle_dir
+        self.dtype = dtype
+
+    def _bundle_path(self, candidate_id: str) -> str:
+        return os.path.join(self.bundle_dir, f"{candidate_id}{BUNDLE_SUFFIX}")
+
+    def resolve(self, candidate_id: str) -> Optional[str]:
+        # Full IDs are file hashes; any unique prefix of 8+ characters works
+        candidate_id = candidate_id.strip().lower()
+        if not _CANDIDATE_ID_PATTERN.fullmatch(candidate_id):
+            return None
+
+        path = self._bundle_path(candidate_id)
+        if os.path.exists(path):
+            return path
+
+        matches = glob.glob(self._bundle_path(f"{candidate_id}*"))
+        return matches[0] if len(matches) == 1 else None
+
+    def save(
+        self,
+        candidate_id: str,
+        profile_data: Any,
+        nodes: List[TextNode],
+        initial_facts: str,
+    ) -> Optional[str]:
+        try:
+            os.makedirs(self.bundle_dir, exist_ok=True)
+            path = self._bundle_path(candidate_id)
+            size = write_bundle(path, profile_data, nodes, initial_facts, self.dtype)
+            logger.info(
+                f"Saved candidate bundle {candidate_id[:12]} "
+                f"({len(nodes)} nodes, {self.dtype}, {size} bytes)"
+            )
+            return path
+        except Exception as e:
+            logger.warning(f"Failed to save candidate bundle {candidate_id[:12]}: {e}")
+            return None
+
+    def load(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        path = self.resolve(candidate_id)
+        if path is None:
+            logger.info(f"No candidate bundle for ID: {candidate_id[:12]}")
+            return None
+
+        try:
+            bundle = read_bundle(path)
+        except Exception as e:
+            logger.warning(f"Unreadable candidate bundle {candidate_id[:12]}: {e}")
+            return None
+
+        # Vectors from another embedding model cannot be queried with this one
+        if (
+            bundle.get("embedding_backend") != config.EMBEDDING_BACKEND
+            or bundle.get("embedding_model") != config.HUGGINGFACE_MODEL_EMBEDDING
+        ):
+            logger.warning(
+                f"Candidate bundle {candidate_id[:12]} was embedded with "
+                f"{bundle.get('embedding_model')}, re-upload the resume"
+            )
+            return None
+
+        bundle["candidate_id"] = os.path.basename(path)[: -len(BUNDLE_SUFFIX)]
+        logger.info(f"Loaded candidate bundle {bundle['candidate_id'][:12]}")
+        return bundle
+
+
+@lru_cache()
+def get_candidate_bundle_store() -> CandidateBundleStore:
+    return CandidateBundleStore(
+        bundle_dir=config.CANDIDATE_BUNDLE_DIR,
+        dtype=config.CANDIDATE_BUNDLE_DTYPE,
+    )
+
+
+def save_candidate_bundle(candidate_id: str, result: Dict[str, Any]) -> None:
+    # `result` is an ingestion result or a resume cache entry
+    if config.CANDIDATE_BUNDLE_ENABLED:
+        get_candidate_bundle_store().save(
+            candidate_id,
+            result["profile_data"],
+            result["nodes"],
+            result["initial_facts"],
+        )
@@ -0,0 +1,503 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from llama_index.core.schema import MetadataMode, TextNode
+from module.extract_profile_pdf import ProfileData, parse_profile_data
+from module.vector_search import top_k_indices
+from config import settings as config
+from functools import lru_cache
+import numpy as np
+import fcntl
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPE = np.float16
+SEARCH_BLOCK_ROWS = 65536
+
+
+def normalize_skills(skills: List[Any]) -> List[str]:
+    # Skills come back from the LLM as plain strings, "Category: a, b" strings
+    # or small dicts, so flatten everything into lowercase tokens.
+    normalized = set()
+    for skill in skills:
+        if isinstance(skill, dict):
+            normalized.update(normalize_skills(list(skill.values())))
+            continue
+        if isinstance(skill, list):
+            normalized.update(normalize_skills(skill))
+            continue
+
+        text = str(skill)
+        if ":" in text:
+            text = text.split(":", 1)[1]
+        for token in re.split(r"[,;/|()]", text):
+            token = token.strip().lower()
+            if token:
+                normalized.add(token)
+
+    return sorted(normalized)
+
+
+class CandidateIndex:
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.embeddings_path = os.path.join(index_dir, "embeddings.f16")
+        self.db_path = os.path.join(index_dir, "candidates.db")
+        self.lock_path = os.path.join(index_dir, ".lock")
+
+        self._matrix: Optional[np.memmap] = None
+        self._matrix_bytes = 0
+        self._matrix_lock = threading.Lock()
+
+        os.makedirs(index_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS candidates (
+                    candidate_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    skills TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    added_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS candidate_skills (
+                    candidate_id TEXT NOT NULL,
+                    skill TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS candidate_skills_skill
+                    ON candidate_skills (skill, candidate_id);
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    candidate_id TEXT NOT NULL,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chunks_candidate
+                    ON chunks (candidate_id);
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        # Appends touch both the embedding file and SQLite, so writers in
+        # other processes are serialized with an advisory file lock.
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _dimension(self, conn: sqlite3.Connection) -> Optional[int]:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'dimension'").fetchone()
+        return int(row[0]) if row else None
+
+    def add_candidate(
+        self,
+        candidate_id: str,
+        profile_data: Dict[str, Any] | str | ProfileData,
+        nodes: List[TextNode],
+    ) -> bool:
+        profile = parse_profile_data(profile_data)
+        nodes = [node for node in nodes if node.embedding is not None]
+        if not nodes:
+            raise ValueError("Candidate nodes have no embeddings")
+
+        embeddings = np.asarray([node.embedding for node in nodes], dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = (embeddings / np.maximum(norms, 1e-12)).astype(EMBEDDING_DTYPE)
+        skills = normalize_skills(profile.skills)
+
+        with self._write_lock(), self._connect() as conn:
+            if conn.execute(
+                "SELECT 1 FROM candidates WHERE candidate_id = ?", (candidate_id,)
+            ).fetchone():
+                return False
+
+            dimension = self._dimension(conn)
+            if dimension is None:
+                dimension = embeddings.shape[1]
+                conn.execute(
+                    "INSERT INTO meta VALUES ('dimension', ?)", (str(dimension),)
+                )
+            elif dimension != embeddings.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {embeddings.shape[1]} does not match "
+                    f"index dimension {dimension}"
+                )
+
+            # Rows are appended to the end of the matrix file; the row number
+            # of each chunk is its position in that file.
+            with open(self.embeddings_path, "ab") as f:
+                first_row = f.tell() // (dimension * embeddings.itemsize)
+                f.write(embeddings.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            conn.execute(
+                "INSERT INTO candidates VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    candidate_id,
+                    profile.name,
+                    profile.location,
+                    json.dumps(skills),
+                    profile.model_dump_json(),
+                    time.time(),
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO candidate_skills VALUES (?, ?)",
+                [(candidate_id, skill) for skill in skills],
+            )
+            conn.executemany(
+                "INSERT INTO chunks VALUES (?, ?, ?)",
+                [
+                    (
+                        first_row + offset,
+                        candidate_id,
+                        node.get_content(MetadataMode.NONE),
+                    )
+                    for offset, node in enumerate(nodes)
+                ],
+            )
+
+        logger.info(
+            f"Added candidate {candidate_id[:12]} ({profile.name or 'unknown'}) "
+            f"with {len(nodes)} chunks to the shared index"
+        )
+        return True
+
+    def _load_matrix(self, dimension: int) -> Optional[np.memmap]:
+        # Reopen the memory map when another worker appended rows
+        with self._matrix_lock:
+            try:
+                size = os.path.getsize(self.embeddings_path)
+            except FileNotFoundError:
+                return None
+
+            if self._matrix is None or size != self._matrix_bytes:
+                row_bytes = dimension * np.dtype(EMBEDDING_DTYPE).itemsize
+                rows = size // row_bytes
+                if rows == 0:
+                    return None
+                self._matrix = np.memmap(
+                    self.embeddings_path,
+                    dtype=EMBEDDING_DTYPE,
+                    mode="r",
+                    shape=(rows, dimension),
+                )
+                self._matrix_bytes = size
+            return self._matrix
+
+    @staticmethod
+    def _filter_clause(
+        skills: Optional[List[str]] = None,
+        location: Optional[str] = None,
+        name: Optional[str] = None,
+        candidate_ids: Optional[List[str]] = None,
+    ) -> Tuple[Optional[str], List[Any]]:
+        # Builds the WHERE clause on the candidates table for the metadata
+        # pre-filter, or None when nothing is filtered
+        clauses, params = [], []
+
+        for skill in normalize_skills(skills or []):
+            clauses.append(
+                "candidate_id IN "
+                "(SELECT candidate_id FROM candidate_skills WHERE skill = ?)"
+            )
+            params.append(skill)
+        if location:
+            clauses.append("location LIKE ?")
+            params.append(f"%{location}%")
+        if name:
+            clauses.append("name LIKE ?")
+            params.append(f"%{name}%")
+        if candidate_ids is not None:
+            clauses.append(
+                f"candidate_id IN ({','.join('?' for _ in candidate_ids)})"
+            )
+            params.extend(candidate_ids)
+
+        if not clauses:
+            return None, []
+        return " AND ".join(clauses), params
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        skills: Optional[List[str]] = None,
+        location: Optional[str] = None,
+        name: Optional[str] = None,
+        candidate_ids: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            dimension = self._dimension(conn)
+            if dimension is None:
+                return []
+
+            where, params = self._filter_clause(skills, location, name, candidate_ids)
+
+            rows = None
+            if where is not None:
+                rows = np.asarray(
+                    [
+                        row[0]
+                        for row in conn.execute(
+                            "SELECT row FROM chunks WHERE candidate_id IN "
+                            f"(SELECT candidate_id FROM candidates WHERE {where})",
+                            params,
+                        )
+                    ],
+                    dtype=np.int64,
+                )
+                if rows.size == 0:
+                    return []
+
+        matrix = self._load_matrix(dimension)
+        if matrix is None:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        if rows is not None:
+            rows = rows[rows < matrix.shape[0]]
+            scores = matrix[rows].astype(np.float32) @ query
+        else:
+            # Score the memory map block by block to bound the float32 copy
+            rows = np.arange(matrix.shape[0])
+            scores = np.concatenate(
+                [
+                    matrix[start : start + SEARCH_BLOCK_ROWS].astype(np.float32) @ query
+                    for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS)
+                ]
+            )
+
+        if scores.size == 0:
+            return []
+
+        best = top_k_indices(scores, top_k)
+
+        return self._describe_rows(
+            [int(rows[i]) for i in best], [float(scores[i]) for i in best]
+        )
+
+    def _describe_rows(
+        self, rows: List[int], scores: List[float]
+    ) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+
+        with self._connect() as conn:
+            details = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    "SELECT chunks.row, chunks.candidate_id, chunks.text, "
+                    "candidates.name, candidates.location, candidates.skills "
+                    "FROM chunks JOIN candidates USING (candidate_id) "
+                    f"WHERE chunks.row IN ({','.join('?' for _ in rows)})",
+                    rows,
+                )
+            }
+
+        results = []
+        for row, score in zip(rows, scores):
+            if row not in details:
+                continue
+            candidate_id, text, name, location, skills = details[row]
+            results.append(
+                {
+                    "candidate_id": candidate_id,
+                    "name": name,
+                    "location": location,
+                    "skills": json.loads(skills),
+                    "score": score,
+                    "text": text,
+                }
+            )
+        return results
+
+    def search_candidates(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        chunks_per_candidate: int = 50,
+        **filters: Any,
+    ) -> List[Dict[str, Any]]:
+        # Rank candidates by their best matching chunk
+        chunks = self.search(
+            query_embedding, top_k=top_k * chunks_per_candidate, **filters
+        )
+
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for chunk in chunks:
+            if chunk["candidate_id"] not in candidates:
+                candidates[chunk["candidate_id"]] = chunk
+        return list(candidates.values())[:top_k]
+
+    def shortlist(
+        self,
+        query_embedding: List[float],
+        top_k: int = 20,
+        chunks_per_candidate: int = 3,
+        **filters: Any,
+    ) -> List[Dict[str, Any]]:
+        # Scores every chunk of every matching candidate in one pass and ranks
+        # candidates by their best chunk. Unlike search_candidates, a candidate
+        # is never missed because other candidates own all the top chunks.
+        where, params = self._filter_clause(**filters)
+
+        with self._connect() as conn:
+            dimension = self._dimension(conn)
+            if dimension is None:
+                return []
+
+            query = "SELECT row, candidate_id FROM chunks"
+            if where is not None:
+                query += (
+                    " WHERE candidate_id IN "
+                    f"(SELECT candidate_id FROM candidates WHERE {where})"
+                )
+            pairs = conn.execute(query + " ORDER BY row", params).fetchall()
+
+        matrix = self._load_matrix(dimension)
+        if matrix is None or not pairs:
+            return []
+
+        rows = np.fromiter((row for row, _ in pairs), dtype=np.int64, count=len(pairs))
+        candidate_ids, owners = np.unique(
+            [candidate_id for _, candidate_id in pairs], return_inverse=True
+        )
+        visible = rows < matrix.shape[0]
+        rows, owners = rows[visible], owners[visible]
+        if rows.size == 0:
+            return []
+
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        scores = np.concatenate(
+            [
+                matrix[rows[start : start + SEARCH_BLOCK_ROWS]].astype(np.float32)
+                @ query_vector
+                for start in range(0, rows.size, SEARCH_BLOCK_ROWS)
+            ]
+        )
+
+        best_scores = np.full(len(candidate_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(best_scores, owners, scores)
+        best = top_k_indices(best_scores, top_k)
+
+        # Chunks grouped by candidate, best first within each group
+        order = np.lexsort((-scores, owners))
+        group_starts = np.searchsorted(owners[order], best)
+        group_ends = np.searchsorted(owners[order], best, side="right")
+
+        evidence: Dict[str, List[Tuple[int, float]]] = {}
+        for position, start, end in zip(best, group_starts, group_ends):
+            picked = order[start : min(end, start + chunks_per_candidate)]
+            evidence[str(candidate_ids[position])] = [
+                (int(rows[i]), float(scores[i])) for i in picked
+            ]
+
+        with self._connect() as conn:
+            shortlisted = list(evidence)
+            profiles = {
+                candidate_id: (name, location, json.loads(skills), profile)
+                for candidate_id, name, location, skills, profile in conn.execute(
+                    "SELECT candidate_id, name, location, skills, profile "
+                    "FROM candidates WHERE candidate_id IN "
+                    f"({','.join('?' for _ in shortlisted)})",
+                    shortlisted,
+                )
+            }
+            evidence_rows = [row for chunks in evidence.values() for row, _ in chunks]
+            texts = dict(
+                conn.execute(
+                    "SELECT row, text FROM chunks WHERE row IN "
+                    f"({','.join('?' for _ in evidence_rows)})",
+                    evidence_rows,
+                )
+            )
+
+        results = []
+        for position in best:
+            candidate_id = str(candidate_ids[position])
+            if candidate_id not in profiles:
+                continue
+            name, location, skills, profile = profiles[candidate_id]
+            results.append(
+                {
+                    "candidate_id": candidate_id,
+                    "name": name,
+                    "location": location,
+                    "skills": skills,
+                    "score": float(best_scores[position]),
+                    "profile": parse_profile_data(profile),
+                    "chunks": [
+                        {"text": texts.get(row, ""), "score": score}
+                        for row, score in evidence[candidate_id]
+                    ],
+                }
+            )
+        return results
+
+    def list_candidates(self, limit: int = 50, **filters: Any) -> List[Dict[str, Any]]:
+        where, params = self._filter_clause(**filters)
+
+        with self._connect() as conn:
+            query = "SELECT candidate_id, name, location, skills FROM candidates"
+            if where is not None:
+                query += f" WHERE {where}"
+            query += " ORDER BY added_at DESC LIMIT ?"
+            params.append(limit)
+
+            return [
+                {
+                    "candidate_id": candidate_id,
+                    "name": name,
+                    "location": location,
+                    "skills": json.loads(skills),
+                }
+                for candidate_id, name, location, skills in conn.execute(query, params)
+            ]
+
+
+@lru_cache()
+def get_candidate_index() -> CandidateIndex:
+    return CandidateIndex(config.CANDIDATE_INDEX_DIR)
+
+
+def index_candidate(
+    candidate_id: str,
+    profile_data: Dict[str, Any] | str | ProfileData,
+    nodes: List[TextNode],
+) -> None:
+    if not config.CANDIDATE_INDEX_ENABLED:
+        return
+
+    try:
+        get_candidate_index().add_candidate(candidate_id, profile_data, nodes)
+    except Exception as e:
+        logger.warning(f"Failed to add candidate {candidate_id[:12]} to index: {e}")
@@ -0,0 +1,191 @@
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from module.candidate_index import get_candidate_index
+from module.extract_profile_pdf import ProfileData, repair_json
+from module.llm_interface import ainvoke_llm, get_model_embedding
+from module.metrics import trace_payload
+from module.timing import StageTimer
+from config import settings as config
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Characters of profile summary and of each excerpt shown to the ranking LLM
+SUMMARY_CHARS = 400
+EXCERPT_CHARS = 600
+
+
+def _candidate_block(label: str, candidate: Dict[str, Any]) -> str:
+    profile: ProfileData = candidate["profile"]
+    lines = [
+        f"[{label}] {profile.name or candidate['name'] or 'Unknown'}",
+        f"Current position: {profile.current_position or 'unknown'}",
+        f"Location: {profile.location or candidate['location'] or 'unknown'}",
+        f"Skills: {', '.join(candidate['skills']) or 'none listed'}",
+    ]
+    if profile.summary:
+        lines.append(f"Summary: {profile.summary[:SUMMARY_CHARS]}")
+    lines.append("Most relevant resume excerpts:")
+    lines.extend(
+        f"- {' '.join(chunk['text'].split())[:EXCERPT_CHARS]}"
+        for chunk in candidate["chunks"]
+    )
+    return "\n".join(lines)
+
+
+def _build_ranking_messages(
+    job_description: str, blocks: List[str]
+) -> List[BaseMessage]:
+    system_message = SystemMessage(
+        content="""
+        You are an expert in talent recruitment. Score how well each candidate fits the job description, using only the information provided.
+        Respond with a single JSON object: {"rankings": [{"id": "C1", "score": 0-100, "matched_skills": [...], "missing_skills": [...], "reason": "one sentence"}]}.
+        Include every candidate id exactly once. Score 80-100 for a strong fit, 50-79 for a partial fit and below 50 for a weak fit.
+        """
+    )
+
+    user_message = HumanMessage(
+        content=f"""
+        Job description:
+        {job_description}
+
+        Candidates:
+        {chr(10).join(blocks)}
+        """
+    )
+
+    return [system_message, user_message]
+
+
+def _parse_rankings(response: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        rankings = json.loads(repair_json(response)).get("rankings", [])
+    except Exception as e:
+        logger.warning(f"Could not parse ranking response: {e}")
+        return {}
+
+    parsed = {}
+    for ranking in rankings:
+        if not isinstance(ranking, dict) or "id" not in ranking:
+            continue
+        try:
+            score = min(max(float(ranking.get("score", 0)), 0.0), 100.0)
+        except (TypeError, ValueError):
+            continue
+        parsed[str(ranking["id"])] = {
+            "score": score,
+            "matched_skills": list(ranking.get("matched_skills") or []),
+            "missing_skills": list(ranking.get("missing_skills") or []),
+            "reason": str(ranking.get("reason") or ""),
+        }
+    return parsed
+
+
+async def _ascore_batch(
+    job_description: str, batch: List[Dict[str, Any]], offset: int
+) -> Dict[str, Dict[str, Any]]:
+    # Short labels instead of 64-character candidate IDs keep the prompt and
+    # the answer small; they are mapped back here
+    labels = {f"C{offset + i + 1}": c["candidate_id"] for i, c in enumerate(batch)}
+    blocks = [
+        _candidate_block(label, candidate)
+        for label, candidate in zip(labels, batch)
+    ]
+    response = await ainvoke_llm(
+        _build_ranking_messages(job_description, blocks),
+        temperature=0.0,
+        max_new_tokens=config.RANK_MAX_NEW_TOKENS,
+        json_mode=True,
+    )
+    return {
+        labels[label]: ranking
+        for label, ranking in _parse_rankings(response).items()
+        if label in labels
+    }
+
+
+async def arank_candidates(
+    job_description: str,
+    top_n: Optional[int] = None,
+    **filters: Any,
+) -> Dict[str, Any]:
+    # One embedding call for the job description, one vector pass over the
+    # shared index, then a few batched LLM calls for the shortlist only
+    job_description = job_description.strip()
+    if not job_description:
+        raise ValueError("Job description is empty")
+
+    top_n = top_n or config.RANK_SHORTLIST_SIZE
+    with StageTimer("rank") as timer:
+        with timer.stage("embed"):
+            query_embedding = await get_model_embedding().aget_query_embedding(
+                job_description
+            )
+
+        with timer.stage("shortlist"):
+            shortlist = await asyncio.to_thread(
+                get_candidate_index().shortlist,
+                query_embedding,
+                top_k=top_n,
+                chunks_per_candidate=config.RANK_CHUNKS_PER_CANDIDATE,
+                **filters,
+            )
+
+        batch_size = max(1, config.RANK_BATCH_SIZE)
+        batches = [
+            shortlist[start : start + batch_size]
+            for start in range(0, len(shortlist), batch_size)
+        ]
+
+        scores: Dict[str, Dict[str, Any]] = {}
+        with timer.stage("llm"):
+            responses = await asyncio.gather(
+                *(
+                    _ascore_batch(job_description, batch, number * batch_size)
+                    for number, batch in enumerate(batches)
+                ),
+                return_exceptions=True,
+            )
+        for response in responses:
+            # A failed batch keeps its candidates, ordered by similarity only
+            if isinstance(response, Exception):
+                logger.warning(f"Ranking batch failed: {response}")
+                continue
+            scores.update(response)
+
+        candidates = []
+        for candidate in shortlist:
+            ranking = scores.get(candidate["candidate_id"], {})
+            candidates.append(
+                {
+                    "candidate_id": candidate["candidate_id"],
+                    "name": candidate["name"],
+                    "location": candidate["location"],
+                    "similarity": candidate["score"],
+                    "score": ranking.get("score"),
+                    "matched_skills": ranking.get("matched_skills", []),
+                    "missing_skills": ranking.get("missing_skills", []),
+                    "reason": ranking.get("reason", ""),
+                }
+            )
+        candidates.sort(
+            key=lambda c: (c["score"] is not None, c["score"] or 0, c["similarity"]),
+            reverse=True,
+        )
+        trace_payload("rankings", candidates)
+
+    logger.info(
+        f"Ranked {len(candidates)} shortlisted candidates with "
+        f"{len(batches)} LLM calls: {timer.summary()}"
+    )
+    return {
+        "candidates": candidates,
+        "shortlisted": len(shortlist),
+        "llm_calls": len(batches),
+        "timings_ms": {
+            name: round(seconds * 1000, 1) for name, seconds in timer.timings.items()
+        },
+    }
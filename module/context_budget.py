@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional, Set, Tuple
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.utils import get_tokenizer
+from config import settings as config
+from functools import lru_cache
+import logging
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SEPARATOR = "\n\n"
+
+
+class RankedNode(NodeWithScore):
+    # Ranked by a fused score that says nothing about relevance on its own
+    # (reciprocal rank fusion); the score cutoff applies to the raw cosine
+    # similarity instead
+    similarity: Optional[float] = None
+
+
+def relevance_score(node: NodeWithScore) -> Optional[float]:
+    if isinstance(node, RankedNode):
+        return node.similarity
+    return node.score
+
+
+def count_tokens(text: str) -> int:
+    # Same tiktoken encoding LlamaIndex uses for its own prompt budgeting
+    return len(get_tokenizer()(text))
+
+
+def _shingles(text: str, size: int = 5) -> Set[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextBudgeter:
+    def __init__(
+        self, token_budget: int, score_cutoff: float, dedup_threshold: float
+    ):
+        self.token_budget = token_budget
+        self.score_cutoff = score_cutoff
+        self.dedup_threshold = dedup_threshold
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _above_cutoff(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        kept = []
+        for node in nodes:
+            score = relevance_score(node)
+            if score is None or score >= self.score_cutoff:
+                kept.append(node)
+        # Never answer from an empty context when something was retrieved
+        return kept or nodes[:1]
+
+    def _deduplicate(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        # Chunk overlap and profile chunks repeating raw PDF text make
+        # neighbours largely identical; keep the better scored copy
+        kept: List[NodeWithScore] = []
+        seen: Set[Tuple[str, ...]] = set()
+        for node in nodes:
+            shingles = _shingles(node.node.get_text())
+            overlap = len(shingles & seen) / len(shingles) if shingles else 0.0
+            if overlap >= self.dedup_threshold:
+                continue
+            kept.append(node)
+            seen |= shingles
+        return kept
+
+    def _pack(self, texts: List[str]) -> List[str]:
+        if self.token_budget <= 0:
+            return texts
+
+        separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+        packed: List[str] = []
+        used = 0
+        for text in texts:
+            tokens = count_tokens(text) + (separator_tokens if packed else 0)
+            if used + tokens <= self.token_budget:
+                packed.append(text)
+                used += tokens
+            elif not packed:
+                # The best chunk alone is over budget: keep its beginning
+                ratio = self.token_budget / tokens
+                packed.append(text[: int(len(text) * ratio)])
+                used = self.token_budget
+            # Smaller, lower ranked chunks may still fit, keep going
+        return packed
+
+    def assemble(self, nodes: List[NodeWithScore]) -> Tuple[str, Dict[str, int]]:
+        texts_before = [node.node.get_text() for node in nodes]
+        tokens_before = count_tokens(CONTEXT_SEPARATOR.join(texts_before))
+
+        ranked = sorted(
+            nodes,
+            key=lambda node: node.score if node.score is not None else float("-inf"),
+            reverse=True,
+        )
+        selected = self._deduplicate(self._above_cutoff(ranked))
+        texts = self._pack([node.node.get_text() for node in selected])
+
+        context_str = CONTEXT_SEPARATOR.join(texts)
+        tokens_after = count_tokens(context_str)
+        usage = {
+            "nodes_before": len(nodes),
+            "nodes_after": len(texts),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        }
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["tokens_before"] += tokens_before
+            self._stats["tokens_after"] += tokens_after
+
+        logger.info(
+            f"Context tokens {tokens_before} -> {tokens_after} "
+            f"(saved {usage['tokens_saved']}), "
+            f"nodes {usage['nodes_before']} -> {usage['nodes_after']}"
+        )
+        return context_str, usage
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        stats["saved_ratio"] = (
+            stats["tokens_saved"] / stats["tokens_before"]
+            if stats["tokens_before"]
+            else 0.0
+        )
+        return stats
+
+
+@lru_cache()
+def get_context_budgeter() -> ContextBudgeter:
+    return ContextBudgeter(
+        token_budget=config.CONTEXT_TOKEN_BUDGET,
+        score_cutoff=config.CONTEXT_SCORE_CUTOFF,
+        dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+    )
@@ -1,27 +1,95 @@
 from typing import Dict, Any, List
 from llama_index.core import Document, VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
-from module.llm_interface import create_model_embedding
+from llama_index.core.schema import MetadataMode, TextNode
+from module.extract_profile_pdf import ProfileData, parse_profile_data
+from module.metrics import trace_payload
+from module.llm_interface import (
+    get_concurrency_limiter,
+    get_model_embedding,
+    get_rate_limiter,
+)
 from config import settings as config
-import json
+from functools import lru_cache
+import numpy as np
 import logging
 
 
 logger = logging.getLogger(__name__)
 
 
-def split_profile_data(profile_data: Dict[str, Any] | str) -> List:
-    try:
-        if isinstance(profile_data, dict):
-            profile_data = json.dumps(profile_data)
+def _format_value(value: Any) -> str:
+    if isinstance(value, dict):
+        return "\n".join(
+            f"{key}: {_format_value(item)}"
+            for key, item in value.items()
+            if item not in ("", None, [], {})
+        )
+    if isinstance(value, list):
+        return ", ".join(_format_value(item) for item in value)
+    return str(value)
+
+
+def profile_documents(profile: ProfileData) -> List[Document]:
+    # One document per field, and one per experience / education entry, so
+    # every chunk is about a single thing and carries its section
+    documents = []
+
+    def add(section: str, title: str, text: str, entry: int | None = None):
+        if not text.strip():
+            return
+        metadata = {"section": section, "candidate": profile.name}
+        if entry is not None:
+            metadata["entry"] = entry
+        documents.append(
+            Document(
+                text=f"{title}:\n{text}",
+                metadata=metadata,
+                excluded_embed_metadata_keys=["entry"],
+                excluded_llm_metadata_keys=["entry"],
+            )
+        )
+
+    overview = [
+        ("Name", profile.name),
+        ("Current position", profile.current_position),
+        ("Location", profile.location),
+    ]
+    add("overview", "Overview", "\n".join(f"{k}: {v}" for k, v in overview if v))
+    add("summary", "Summary", profile.summary)
+    for i, experience in enumerate(profile.experiences):
+        add("experience", "Experience", _format_value(experience), entry=i)
+    for i, education in enumerate(profile.education):
+        add("education", "Education", _format_value(education), entry=i)
+    add("skills", "Skills", _format_value(profile.skills))
+    add("certifications", "Certifications", _format_value(profile.certifications))
+    add("languages", "Languages", _format_value(profile.languages))
+    add("interests", "Interests", _format_value(profile.interests))
+
+    return documents
+
+
+@lru_cache()
+def get_splitter() -> SentenceSplitter:
+    # Built once per process: loading the tokenizer is the slow part
+    return SentenceSplitter(chunk_size=config.CHUNK_SIZE)
 
-        logger.info(f"Profile JSON: {profile_data}")
 
-        document = Document(text=profile_data)
+def split_profile_data(profile_data: Dict[str, Any] | str | ProfileData) -> List:
+    try:
+        profile = parse_profile_data(profile_data)
+
+        trace_payload("profile_json", profile.model_dump())
 
-        splitter = SentenceSplitter(chunk_size=config.CHUNK_SIZE)
+        if profile.is_empty() and isinstance(profile_data, str):
+            # Not a profile at all: fall back to splitting the raw text
+            documents = [Document(text=profile_data)]
+        else:
+            documents = profile_documents(profile)
 
-        nodes = splitter.get_nodes_from_documents([document])
+        # Entries longer than a chunk are still split, everything else is
+        # kept whole
+        nodes = get_splitter().get_nodes_from_documents(documents)
 
         logger.info(f"Split profile data into {len(nodes)} chunks")
 
@@ -31,14 +99,26 @@ def split_profile_data(profile_data: Dict[str, Any] | str) -> List:
         return []
 
 
+def split_document_text(document_text: str) -> List:
+    try:
+        document = Document(text=document_text, metadata={"section": "resume_text"})
+
+        nodes = get_splitter().get_nodes_from_documents([document])
+
+        logger.info(f"Split document text into {len(nodes)} chunks")
+
+        return nodes
+    except Exception as e:
+        logger.error(f"Error splitting document text: {e}")
+        return []
+
+
 def create_vector_index(nodes: List) -> VectorStoreIndex:
     try:
         # Get the embedding model
-        embedding_model = create_model_embedding()
+        embedding_model = get_model_embedding()
         # Create a VectorStoreIndex from the nodes
-        index = VectorStoreIndex(
-            nodes=nodes, embed_model=embedding_model, show_progress=True
-        )
+        index = VectorStoreIndex(nodes=nodes, embed_model=embedding_model)
 
         return index
     except Exception as e:
@@ -46,24 +126,71 @@ def create_vector_index(nodes: List) -> VectorStoreIndex:
         return None
 
 
-def verify_embedding_model(index: VectorStoreIndex) -> bool:
-    try:
-        vector_store = index._storage_context.vector_store
+async def aembed_nodes(nodes: List) -> List:
+    embedding_model = get_model_embedding()
 
-        node_ids = list(index.index_struct.nodes_dict.keys())
+    pending = [node for node in nodes if node.embedding is None]
+    if not pending:
+        return nodes
 
-        missing_embedding = False
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in pending]
+    if config.EMBEDDING_BACKEND != "local":
+        await get_rate_limiter("huggingface").acquire()
+        async with get_concurrency_limiter("huggingface").limit():
+            embeddings = await embedding_model.aget_text_embedding_batch(texts)
+    else:
+        embeddings = await embedding_model.aget_text_embedding_batch(texts)
+    embedded = {node.node_id: embedding for node, embedding in zip(pending, embeddings)}
+
+    return [
+        node.model_copy(update={"embedding": embedded[node.node_id]})
+        if node.node_id in embedded
+        else node
+        for node in nodes
+    ]
+
+
+def verify_index_integrity(index: VectorStoreIndex) -> bool:
+    # Debug check at build time: vector count against node count, then one
+    # vectorized pass over the embedding matrix for dimension and NaN/inf
+    try:
+        node_count = len(index.index_struct.nodes_dict)
+        embeddings = index.vector_store.data.embedding_dict
+        if len(embeddings) != node_count:
+            logger.warning(
+                f"Index has {len(embeddings)} vectors for {node_count} nodes"
+            )
+            return False
+        if not embeddings:
+            return True
+
+        dimensions = {len(embedding) for embedding in embeddings.values()}
+        if len(dimensions) != 1 or 0 in dimensions:
+            logger.warning(f"Inconsistent embedding dimensions: {sorted(dimensions)}")
+            return False
+
+        matrix = np.asarray(list(embeddings.values()), dtype=np.float32)
+        invalid_rows = int((~np.isfinite(matrix).all(axis=1)).sum())
+        if invalid_rows:
+            logger.warning(f"{invalid_rows} embeddings contain NaN or inf values")
+            return False
+
+        return True
+    except Exception as e:
+        logger.error(f"Error verifying index integrity: {e}")
+        return False
 
-        for node_id in node_ids:
-            embedding = vector_store.get(node_id)
 
-            if embedding is None:
-                missing_embedding = True
-                logger.warning(f"Missing embedding for node ID: {node_id}")
-            else:
-                logger.info(f"Embedding exists for node ID: {node_id}")
+def export_index_nodes(index: VectorStoreIndex) -> List[TextNode]:
+    # Return the indexed nodes with their embeddings attached, so they can be
+    # stored and fed back into create_vector_index without re-embedding.
+    vector_store = index.vector_store
+    node_ids = list(index.index_struct.nodes_dict.values())
 
-        return not missing_embedding
-    except Exception as e:
-        logger.error(f"Error verifying embedding model: {e}")
-        return False
+    nodes = []
+    for node in index.docstore.get_nodes(node_ids):
+        node = node.model_copy()
+        node.embedding = vector_store.get(node.node_id)
+        nodes.append(node)
+
+    return nodes
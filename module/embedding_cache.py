@@ -0,0 +1,266 @@
+from typing import Dict, Iterator, List, Optional
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from module.metrics import record_cache
+from config import settings as config
+from functools import lru_cache
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model_name: str, kind: str, text: str) -> str:
+    # Whitespace differences between otherwise identical chunks should not
+    # cause a second embedding call
+    normalized = re.sub(r"\s+", " ", text).strip()
+    key = f"{model_name}\0{kind}\0{normalized}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStore:
+    def __init__(self, db_path: str, max_memory_items: int, max_rows: int):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.max_rows = max_rows
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Tables created before the row cap have no access time yet; their
+            # rows count as the oldest
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+            if "last_access" not in columns:
+                conn.execute(
+                    "ALTER TABLE embeddings "
+                    "ADD COLUMN last_access REAL NOT NULL DEFAULT 0"
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access "
+                "ON embeddings (last_access)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, vector: bytes) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        found: Dict[str, bytes] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self._stats["memory_hits"] += len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            placeholders = ",".join("?" for _ in missing)
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    missing,
+                ).fetchall()
+                # Only disk reads refresh the access time, so memory hits
+                # cost no write
+                if rows:
+                    conn.execute(
+                        "UPDATE embeddings SET last_access = ? "
+                        f"WHERE key IN ({placeholders})",
+                        [time.time(), *missing],
+                    )
+
+            with self._lock:
+                for key, vector in rows:
+                    found[key] = vector
+                    self._remember(key, vector)
+                self._stats["disk_hits"] += len(rows)
+                self._stats["misses"] += len(missing) - len(rows)
+
+        record_cache("embedding", True, sum(key in found for key in keys))
+        record_cache("embedding", False, sum(key not in found for key in keys))
+
+        results = []
+        for key in keys:
+            vector = found.get(key)
+            if vector is None:
+                results.append(None)
+            else:
+                values = array("f")
+                values.frombytes(vector)
+                results.append(values.tolist())
+        return results
+
+    def put_many(self, keys: List[str], embeddings: List[List[float]]) -> None:
+        if not keys:
+            return
+
+        now = time.time()
+        rows = [
+            (key, array("f", embedding).tobytes(), now)
+            for key, embedding in zip(keys, embeddings)
+        ]
+
+        with self._lock:
+            for key, vector, _ in rows:
+                self._remember(key, vector)
+
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            # Least recently used rows beyond the cap are dropped
+            pruned = conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings "
+                "ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            ).rowcount
+        if pruned:
+            logger.info(f"Pruned {pruned} embeddings from the cache")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+class CachedEmbedding(BaseEmbedding):
+    _inner: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingCacheStore = PrivateAttr()
+    _cache_namespace: str = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        store: EmbeddingCacheStore,
+        cache_namespace: str,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+        )
+        self._inner = inner
+        self._store = store
+        self._cache_namespace = cache_namespace
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _split_misses(self, kind: str, texts: List[str]):
+        keys = [
+            embedding_cache_key(self._cache_namespace, kind, text) for text in texts
+        ]
+        embeddings = self._store.get_many(keys)
+
+        # Identical texts inside one batch are only sent once
+        misses: Dict[str, str] = {}
+        for key, text, embedding in zip(keys, texts, embeddings):
+            if embedding is None and key not in misses:
+                misses[key] = text
+        return keys, embeddings, misses
+
+    def _merge(self, keys, embeddings, misses, computed) -> List[List[float]]:
+        self._store.put_many(list(misses), computed)
+        by_key = dict(zip(misses, computed))
+        return [
+            embedding if embedding is not None else by_key[key]
+            for key, embedding in zip(keys, embeddings)
+        ]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, embeddings, misses = self._split_misses("text", texts)
+        computed = (
+            self._inner.get_text_embedding_batch(list(misses.values()))
+            if misses
+            else []
+        )
+        return self._merge(keys, embeddings, misses, computed)
+
+    # The async variants run the SQLite reads and writes in a worker thread,
+    # off the event loop
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, embeddings, misses = await asyncio.to_thread(
+            self._split_misses, "text", texts
+        )
+        computed = (
+            await self._inner.aget_text_embedding_batch(list(misses.values()))
+            if misses
+            else []
+        )
+        return await asyncio.to_thread(
+            self._merge, keys, embeddings, misses, computed
+        )
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        keys, embeddings, misses = self._split_misses("query", [query])
+        computed = [self._inner.get_query_embedding(query)] if misses else []
+        return self._merge(keys, embeddings, misses, computed)[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        keys, embeddings, misses = await asyncio.to_thread(
+            self._split_misses, "query", [query]
+        )
+        computed = [await self._inner.aget_query_embedding(query)] if misses else []
+        merged = await asyncio.to_thread(
+            self._merge, keys, embeddings, misses, computed
+        )
+        return merged[0]
+
+
+@lru_cache()
+def get_embedding_cache_store() -> EmbeddingCacheStore:
+    return EmbeddingCacheStore(
+        db_path=config.EMBEDDING_CACHE_DB_PATH,
+        max_memory_items=config.EMBEDDING_CACHE_MAX_ITEMS,
+        max_rows=config.EMBEDDING_CACHE_MAX_ROWS,
+    )
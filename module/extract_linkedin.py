@@ -1,5 +1,7 @@
 from typing import Optional, Dict, Any
-import requests
+from module.llm_interface import get_requests_session
+from module.metrics import span
+from config import settings as config
 import time
 import logging
 
@@ -28,9 +30,16 @@ def extract_linkedin_profile(
             "personal_contact_number": "include",
         }
 
-        response = requests.post(
-            api_endpoint, params=params, headers={"Authorization": f"Bearer {api_key}"}
-        )
+        with span("linkedin", "fetch"):
+            response = get_requests_session().post(
+                api_endpoint,
+                params=params,
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=(
+                    config.LLM_CONNECT_TIMEOUT_SECONDS,
+                    config.LLM_TIMEOUT_SECONDS,
+                ),
+            )
 
         logger.info(f"LinkedIn extraction took {time.time() - start_time:.2f} seconds")
 
@@ -1,9 +1,13 @@
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.schema import SystemMessage, HumanMessage
-from module.llm_interface import create_model_llm
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from module.llm_interface import ainvoke_llm, invoke_llm
+from module.pdf_sections import ALL_FIELDS, load_pdf_pages, plan_extraction
+from config import settings as config
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List
+import asyncio
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -20,66 +24,247 @@ class ProfileData(BaseModel):
     languages: list = Field([], description="List of languages known")
     interests: list = Field([], description="List of personal interests")
 
+    def is_empty(self) -> bool:
+        return self == ProfileData()
+
+
+def repair_json(text: str) -> str:
+    # Cheap fixes for the usual LLM slips (markdown fences, prose around the
+    # object, trailing commas, output cut off by the token limit), so a
+    # malformed answer does not cost a second call
+    start = text.find("{")
+    if start == -1:
+        return "{}"
+    text = re.sub(r",\s*([}\]])", r"\1", text[start:])
+
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return text[: i + 1]
+
+    # Truncated: close the open string, drop a dangling key, close brackets
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+    if stack and stack[-1] == "}":
+        text = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", text)
+    text = re.sub(r"[,:]\s*$", "", text)
+    return text + "".join(reversed(stack))
+
+
+def _coerce_field(key: str, value: Any) -> Any:
+    if isinstance(ProfileData.model_fields[key].default, list):
+        if isinstance(value, list):
+            return value
+        if isinstance(value, (str, dict)) and value:
+            return [value]
+        return None
+
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    return None
+
+
+def parse_profile_data(profile_data: Dict[str, Any] | str) -> ProfileData:
+    # The LLM answers with free text that usually contains a JSON object,
+    # sometimes wrapped in markdown fences or surrounded by prose.
+    if isinstance(profile_data, ProfileData):
+        return profile_data
 
-def extract_profile_pdf(pdf_path: str) -> Dict[str, Any]:
     try:
-        loader = PyPDFLoader(pdf_path)
-        loaded = loader.load()
+        if isinstance(profile_data, str):
+            profile_data = json.loads(repair_json(profile_data))
 
-        document_text = "\n".join([doc.page_content for doc in loaded])
+        # Coerce near-misses (a string where a list is expected and vice
+        # versa) and drop the rest instead of discarding the profile
+        fields = {}
+        for key, value in profile_data.items():
+            key = key.lower()
+            if key in ProfileData.model_fields:
+                value = _coerce_field(key, value)
+                if value is not None:
+                    fields[key] = value
+        return ProfileData(**fields)
+    except Exception as e:
+        logger.warning(f"Could not parse profile data: {e}")
+        return ProfileData()
 
-        llm_model = create_model_llm(
-            temperature=0.1,
-            max_new_tokens=500,
-        )
 
-        system_message = SystemMessage(
-            content="""
-            You are an expert in talent acquisition and recruitment. Extract structured information from the provided resume PDF content. Focus on aspects for efficient resume retrieval.
-            Extract the following fields: name, current_position, location, summary, experiences, education, skills, certifications, languages, interests.
-            """
-        )
+def merge_profile_data(partials: Iterable[ProfileData]) -> ProfileData:
+    # Text fields keep the first non-empty value (the header section is
+    # extracted first); list fields are concatenated without duplicates
+    merged: Dict[str, Any] = {}
+    for partial in partials:
+        for key, value in partial.model_dump().items():
+            if isinstance(value, list):
+                items = merged.setdefault(key, [])
+                seen = {json.dumps(item, sort_keys=True) for item in items}
+                for item in value:
+                    if json.dumps(item, sort_keys=True) not in seen:
+                        items.append(item)
+                        seen.add(json.dumps(item, sort_keys=True))
+            elif value and not merged.get(key):
+                merged[key] = value
+
+    return ProfileData(**merged)
+
+
+def load_pdf_text(pdf_path: str) -> str:
+    return "\n".join(load_pdf_pages(pdf_path))
 
-        user_message = HumanMessage(
-            content=f"""
-            from the following resume content, extract the relevant information based on initial document.
-            {document_text}
-            """
-        )
 
-        oneshot_example = HumanMessage(
-            content="""
-        Generate sub-queries based on this initial resume content.
-        John Doe
-        Software Engineer at Tech Solutions
-        San Francisco, CA
-        Experienced Software Engineer with a demonstrated history of working in the information technology and services industry. Skilled in Python, Java, and cloud computing. Strong engineering professional with a Bachelor's degree in Computer Science from State University.
-        Experience:
-        - Software Engineer at Tech Solutions (2018 - Present)
-        - Developed and maintained web applications using Python and Java.
-        - Collaborated with cross-functional teams to define project requirements and deliverables.
-        - Junior Developer at Web Innovations (2016 - 2018)
-        - Assisted in the development of client websites and applications.
-        - Participated in code reviews and team meetings.
-        Education:
-        - Bachelor of Science in Computer Science, State University (2012 - 2016)
-        Skills:
-        - Programming Languages: Python, Java, JavaScript
-        - Frameworks: Django, React
-        - Tools: Git, Docker, AWS
-        Certifications:
-        - AWS Certified Solutions Architect
-        Languages:
-        - English (Native)
-        - Spanish (Professional Proficiency)
-        Interests:
-        - Hiking, Photography, Traveling
+def _build_extraction_messages(
+    document_text: str, fields: Iterable[str] = ALL_FIELDS
+) -> List[BaseMessage]:
+    system_message = SystemMessage(
+        content=f"""
+        You are an expert in talent acquisition and recruitment. Extract structured information from the provided resume PDF content. Focus on aspects for efficient resume retrieval.
+        Extract the following fields: {", ".join(fields)}.
+        Respond with a single JSON object using exactly these keys. Use strings for name, current_position, location and summary, and lists for the other fields.
         """
+    )
+
+    user_message = HumanMessage(
+        content=f"""
+        from the following resume content, extract the relevant information based on initial document.
+        {document_text}
+        """
+    )
+
+    oneshot_example = HumanMessage(
+        content="""
+    Generate sub-queries based on this initial resume content.
+    John Doe
+    Software Engineer at Tech Solutions
+    San Francisco, CA
+    Experienced Software Engineer with a demonstrated history of working in the information technology and services industry. Skilled in Python, Java, and cloud computing. Strong engineering professional with a Bachelor's degree in Computer Science from State University.
+    Experience:
+    - Software Engineer at Tech Solutions (2018 - Present)
+    - Developed and maintained web applications using Python and Java.
+    - Collaborated with cross-functional teams to define project requirements and deliverables.
+    - Junior Developer at Web Innovations (2016 - 2018)
+    - Assisted in the development of client websites and applications.
+    - Participated in code reviews and team meetings.
+    Education:
+    - Bachelor of Science in Computer Science, State University (2012 - 2016)
+    Skills:
+    - Programming Languages: Python, Java, JavaScript
+    - Frameworks: Django, React
+    - Tools: Git, Docker, AWS
+    Certifications:
+    - AWS Certified Solutions Architect
+    Languages:
+    - English (Native)
+    - Spanish (Professional Proficiency)
+    Interests:
+    - Hiking, Photography, Traveling
+    """
+    )
+
+    return [system_message, oneshot_example, user_message]
+
+
+def _parse_partial(response: str, fields: Iterable[str]) -> ProfileData:
+    # A call only sees part of the resume, so fields it was not asked for
+    # are guesses and are dropped
+    profile = parse_profile_data(response)
+    return ProfileData(**profile.model_dump(include=set(fields)))
+
+
+def extract_profile_sections(document_text: str) -> ProfileData:
+    partials = []
+    for fields, text in plan_extraction(document_text, config.EXTRACTION_CHUNK_CHARS):
+        try:
+            response = invoke_llm(
+                _build_extraction_messages(text, fields),
+                temperature=0.1,
+                max_new_tokens=config.EXTRACTION_MAX_NEW_TOKENS,
+                json_mode=True,
+            )
+            partials.append(_parse_partial(response, fields))
+        except Exception as e:
+            logger.warning(f"Extraction of {', '.join(fields)} failed: {e}")
+
+    return merge_profile_data(partials)
+
+
+async def aextract_profile_sections(document_text: str) -> ProfileData:
+    # Every section (or chunk of a long section) is a separate, smaller
+    # prompt; they run concurrently and the partial profiles are merged
+    plan = plan_extraction(document_text, config.EXTRACTION_CHUNK_CHARS)
+    responses = await asyncio.gather(
+        *(
+            ainvoke_llm(
+                _build_extraction_messages(text, fields),
+                temperature=0.1,
+                max_new_tokens=config.EXTRACTION_MAX_NEW_TOKENS,
+                json_mode=True,
+            )
+            for fields, text in plan
+        ),
+        return_exceptions=True,
+    )
+
+    partials = []
+    for (fields, _), response in zip(plan, responses):
+        if isinstance(response, Exception):
+            logger.warning(f"Extraction of {', '.join(fields)} failed: {response}")
+            continue
+        partials.append(_parse_partial(response, fields))
+
+    return merge_profile_data(partials)
+
+
+def extract_profile_pdf(pdf_path: str) -> ProfileData:
+    try:
+        document_text = load_pdf_text(pdf_path)
+
+        if config.SECTION_EXTRACTION_ENABLED:
+            return extract_profile_sections(document_text)
+
+        response = invoke_llm(
+            _build_extraction_messages(document_text),
+            temperature=0.1,
+            max_new_tokens=config.EXTRACTION_MAX_NEW_TOKENS,
+            json_mode=True,
         )
+        return parse_profile_data(response)
+    except Exception as e:
+        logger.error(f"Error extracting profile from PDF: {e}")
+        return ProfileData()
 
-        llm_invoke = [system_message, oneshot_example, user_message]
-        response = llm_model.invoke(llm_invoke)
-        return response.content
+
+async def aextract_profile_text(document_text: str) -> ProfileData:
+    try:
+        if config.SECTION_EXTRACTION_ENABLED:
+            return await aextract_profile_sections(document_text)
+
+        response = await ainvoke_llm(
+            _build_extraction_messages(document_text),
+            temperature=0.1,
+            max_new_tokens=config.EXTRACTION_MAX_NEW_TOKENS,
+            json_mode=True,
+        )
+        return parse_profile_data(response)
     except Exception as e:
         logger.error(f"Error extracting profile from PDF: {e}")
-        return {}
+        return ProfileData()
@@ -0,0 +1,169 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from module.extract_profile_pdf import load_pdf_text, aextract_profile_text
+from module.data_processing import (
+    split_profile_data,
+    split_document_text,
+    aembed_nodes,
+    create_vector_index,
+    verify_index_integrity,
+)
+from module.query_engine import astream_facts_from_profile
+from module.vector_search import get_session_retriever
+from module.timing import StageTimer
+from config import settings as config
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionError(Exception):
+    pass
+
+
+class PipelineStage:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+        depends_on: Iterable[str] = (),
+    ):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+
+
+StageCallback = Callable[[str, str], None]
+
+
+async def run_pipeline(
+    stages: List[PipelineStage],
+    timer: Optional[StageTimer] = None,
+    on_stage: Optional[StageCallback] = None,
+) -> Dict[str, Any]:
+    # Every stage starts as soon as the stages it depends on are finished, so
+    # independent branches of the pipeline overlap. Stages must be listed
+    # after their dependencies.
+    timer = timer or StageTimer()
+    results: Dict[str, Any] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_stage(stage: PipelineStage):
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+
+        # Progress callback: (stage, "running" / "done" / "failed")
+        if on_stage:
+            on_stage(stage.name, "running")
+        try:
+            with timer.stage(stage.name):
+                results[stage.name] = await stage.fn(results)
+        except Exception:
+            if on_stage:
+                on_stage(stage.name, "failed")
+            raise
+        if on_stage:
+            on_stage(stage.name, "done")
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(run_stage(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return results
+
+
+async def aingest_resume(
+    document_path: str,
+    on_facts_token: Optional[Callable[[str], None]] = None,
+    on_stage: Optional[StageCallback] = None,
+) -> Dict[str, Any]:
+    timer = StageTimer("ingest")
+
+    async def load_text(results):
+        document_text = await asyncio.to_thread(load_pdf_text, document_path)
+        if not document_text.strip():
+            raise IngestionError("No text found in PDF")
+        return document_text
+
+    async def extract_profile(results):
+        profile = await aextract_profile_text(results["load_text"])
+        if profile.is_empty():
+            raise IngestionError("No profile data extracted from PDF")
+        # Plain dict from here on: it is cached and written to JSON as is
+        return profile.model_dump()
+
+    async def split_text(results):
+        # Raw PDF text is chunked and embedded while the LLM extraction is
+        # still running
+        if not config.INDEX_PDF_TEXT:
+            return []
+        return split_document_text(results["load_text"])
+
+    async def embed_text(results):
+        return await aembed_nodes(results["split_text"])
+
+    async def split_profile(results):
+        nodes = split_profile_data(results["extract_profile"])
+        if not nodes:
+            raise IngestionError("No data chunks created from profile data")
+        return nodes
+
+    async def embed_profile(results):
+        return await aembed_nodes(results["split_profile"])
+
+    async def build_index(results):
+        index = create_vector_index(results["embed_text"] + results["embed_profile"])
+        if not index:
+            raise IngestionError("Failed to create vector index")
+        # Build the session retriever (and its inverted index) now rather than
+        # on the first question
+        get_session_retriever(index)
+        return index
+
+    async def verify(results):
+        if not verify_index_integrity(results["build_index"]):
+            raise IngestionError("Index integrity check failed")
+        return True
+
+    async def generate_facts(results):
+        initial_facts = ""
+        async for token in astream_facts_from_profile(results["extract_profile"]):
+            initial_facts += token
+            if on_facts_token:
+                on_facts_token(token)
+        return initial_facts
+
+    stages = [
+        PipelineStage("load_text", load_text),
+        PipelineStage("extract_profile", extract_profile, ["load_text"]),
+        PipelineStage("split_text", split_text, ["load_text"]),
+        PipelineStage("embed_text", embed_text, ["split_text"]),
+        PipelineStage("split_profile", split_profile, ["extract_profile"]),
+        PipelineStage("embed_profile", embed_profile, ["split_profile"]),
+        PipelineStage("facts", generate_facts, ["extract_profile"]),
+        PipelineStage("build_index", build_index, ["embed_text", "embed_profile"]),
+    ]
+    # Debug only: its duration shows up as the "verify" timing
+    if config.VERIFY_INDEX:
+        stages.append(PipelineStage("verify", verify, ["build_index"]))
+
+    with timer:
+        results = await run_pipeline(stages, timer, on_stage)
+    timer.mark("wall_clock")
+    logger.info(f"Ingestion timings: {timer.summary()}")
+
+    return {
+        "profile_data": results["extract_profile"],
+        "nodes": results["embed_text"] + results["embed_profile"],
+        "index": results["build_index"],
+        "initial_facts": results["facts"],
+        "timings": dict(timer.timings),
+    }
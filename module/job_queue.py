@@ -0,0 +1,325 @@
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from config import settings as config
+from functools import lru_cache
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+# Running jobs are written back at most this often, so other workers polling
+# the table see their stage progress
+PROGRESS_SAVE_SECONDS = 1.0
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        job_id: Optional[str] = None,
+    ):
+        self.job_id = job_id or str(uuid.uuid4())
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.status = "queued"
+        # stage name -> "running", "done" or "failed", in start order
+        self.stages: Dict[str, str] = {}
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def set_stage(self, stage: str, status: str) -> None:
+        self.stages[stage] = status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "stages": dict(self.stages),
+            "result": dict(self.result),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+JobCleanup = Callable[[Job], None]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db_path: str,
+        max_concurrency: int,
+        max_pending: int,
+        ttl_seconds: int,
+    ):
+        self.db_path = db_path
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._cleanups: Dict[str, JobCleanup] = {}
+        # job_id -> job, for jobs accepted by this process
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional["asyncio.PriorityQueue[Tuple[int, int, str]]"] = None
+        self._order = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0}
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    stages TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def register(
+        self, kind: str, handler: JobHandler, cleanup: Optional[JobCleanup] = None
+    ) -> None:
+        # `cleanup` runs in a thread once a job of this kind is finished or
+        # dropped, e.g. to delete its input files
+        self._handlers[kind] = handler
+        if cleanup is not None:
+            self._cleanups[kind] = cleanup
+
+    async def _cleanup(self, job: Job) -> None:
+        cleanup = self._cleanups.get(job.kind)
+        if cleanup is None:
+            return
+        try:
+            await asyncio.to_thread(cleanup, job)
+        except Exception as e:
+            logger.warning(f"Cleanup of job {job.job_id} failed: {e}")
+
+    def _pending(self) -> List[Job]:
+        return [job for job in self._jobs.values() if job.status == "queued"]
+
+    async def submit(
+        self, kind: str, payload: Dict[str, Any], priority: int = 0
+    ) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+
+        # A burst beyond the queue bound is turned away at once instead of
+        # waiting long enough for its client to time out
+        if self.max_pending > 0 and len(self._pending()) >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise QueueFullError(f"{self.max_pending} jobs already waiting")
+
+        self._start_workers()
+
+        job = Job(kind, payload, priority)
+        self._jobs[job.job_id] = job
+        await asyncio.to_thread(self._insert, job)
+
+        # Higher priority first, then submission order
+        self._queue.put_nowait((-priority, next(self._order), job.job_id))
+        self._stats["submitted"] += 1
+        logger.info(
+            f"Queued {kind} job {job.job_id} (priority {priority}, "
+            f"{len(self._pending())} waiting)"
+        )
+        return job
+
+    def _start_workers(self) -> None:
+        # Workers live on the event loop of the first submission
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        while len(self._workers) < self.max_concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(self._jobs[job_id])
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        await asyncio.to_thread(self._save, job)
+
+        task = asyncio.ensure_future(self._handlers[job.kind](job))
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=PROGRESS_SAVE_SECONDS)
+                if not task.done():
+                    await asyncio.to_thread(self._save, job)
+            job.result.update(task.result())
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            task.cancel()
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._stats[job.status] += 1
+            await asyncio.to_thread(self._save, job)
+            await self._cleanup(job)
+            # Finished jobs are served from the table from here on
+            self._jobs.pop(job.job_id, None)
+            logger.info(
+                f"Job {job.job_id} {job.status} in "
+                f"{job.finished_at - job.started_at:.2f}s"
+            )
+
+    def _insert(self, job: Job) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.job_id,
+                    job.kind,
+                    job.priority,
+                    job.status,
+                    json.dumps(job.payload),
+                    json.dumps(job.stages),
+                    json.dumps(job.result),
+                    job.error,
+                    job.created_at,
+                    job.started_at,
+                    job.finished_at,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+
+    def _save(self, job: Job) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stages = ?, result = ?, error = ?, "
+                "started_at = ?, finished_at = ? WHERE job_id = ?",
+                (
+                    job.status,
+                    json.dumps(job.stages),
+                    json.dumps(job.result),
+                    job.error,
+                    job.started_at,
+                    job.finished_at,
+                    job.job_id,
+                ),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            status = job.to_dict()
+            if job.status == "queued":
+                status["position"] = sum(
+                    (-other.priority, other.created_at)
+                    < (-job.priority, job.created_at)
+                    for other in self._pending()
+                )
+            return status
+
+        # Accepted by another worker process, or already finished
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, kind, priority, status, stages, result, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "priority": row[2],
+            "status": row[3],
+            "stages": json.loads(row[4]),
+            "result": json.loads(row[5]),
+            "error": row[6],
+            "created_at": row[7],
+            "started_at": row[8],
+            "finished_at": row[9],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["queued"] = len(self._pending())
+        stats["running"] = sum(job.status == "running" for job in self._jobs.values())
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Jobs live in this process only; do not leave them queued forever
+        for job in self._pending():
+            job.status = "failed"
+            job.error = "Server shut down before the job started"
+            job.finished_at = time.time()
+            await asyncio.to_thread(self._save, job)
+            await self._cleanup(job)
+        self._jobs.clear()
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    return JobQueue(
+        db_path=config.JOB_DB_PATH,
+        max_concurrency=config.JOB_MAX_CONCURRENCY,
+        max_pending=config.JOB_MAX_PENDING,
+        ttl_seconds=config.JOB_TTL_SECONDS,
+    )
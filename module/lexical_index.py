@@ -0,0 +1,73 @@
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import math
+import re
+
+
+STOPWORDS = set(
+    """
+    a an and are as at be by did do does for from has have he her his in is it
+    its of on or she that the their they this to was were what which who with
+    candidate candidates
+    """.split()
+)
+
+# Keeps tech terms such as "c++", "c#", "node.js" and "asp.net" whole
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.num_docs = len(texts)
+
+        documents = [tokenize(text) for text in texts]
+        lengths = np.asarray([len(tokens) for tokens in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if self.num_docs else 0.0
+        # Per-document length normalisation is query independent, compute once
+        self._length_norm = k1 * (1 - b + b * lengths / max(average_length, 1.0))
+
+        term_counts: Dict[str, Dict[int, int]] = {}
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                counts = term_counts.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        # term -> (document ids, term frequencies, idf)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, counts in term_counts.items():
+            doc_frequency = len(counts)
+            idf = math.log(
+                1 + (self.num_docs - doc_frequency + 0.5) / (doc_frequency + 0.5)
+            )
+            self._postings[term] = (
+                np.fromiter(counts.keys(), dtype=np.int64, count=doc_frequency),
+                np.fromiter(counts.values(), dtype=np.float32, count=doc_frequency),
+                idf,
+            )
+
+    def contains_any(self, query: str) -> bool:
+        return any(term in self._postings for term in tokenize(query))
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, frequencies, idf = posting
+            scores[doc_ids] += (
+                idf
+                * frequencies
+                * (self.k1 + 1)
+                / (frequencies + self._length_norm[doc_ids])
+            )
+        return scores
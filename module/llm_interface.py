@@ -1,55 +1,523 @@
-from llama_index.embeddings.huggingface_api import (
-    HuggingFaceInferenceAPIEmbedding,
-)
-from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
+from module.embedding_cache import CachedEmbedding, get_embedding_cache_store
+from module.context_budget import count_tokens
+from module.metrics import record_llm_call
 from config import settings as config
-from langchain_openai.chat_models import ChatOpenAI
+from langchain_core.messages import BaseMessage, get_buffer_string
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, List, Optional, Union
+from urllib3.util.retry import Retry
+import asyncio
+import httpx
 import logging
+import requests
+import threading
+import time
+import weakref
 
 
 logger = logging.getLogger(__name__)
 
 
-def create_model_embedding():
-    embedding_llm = HuggingFaceInferenceAPIEmbedding(
+class AsyncRateLimiter:
+    def __init__(self, requests_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        if self.requests_per_minute <= 0:
+            return
+
+        # Hand out evenly spaced start slots; callers sleep until theirs
+        interval = 60.0 / self.requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@lru_cache()
+def get_rate_limiter(provider: str) -> AsyncRateLimiter:
+    requests_per_minute = {
+        "openrouter": config.OPENROUTER_REQUESTS_PER_MINUTE,
+        "huggingface": config.HUGGINGFACE_REQUESTS_PER_MINUTE,
+    }[provider]
+    return AsyncRateLimiter(requests_per_minute)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._thread_semaphore = threading.BoundedSemaphore(max(max_concurrency, 1))
+        # asyncio semaphores belong to one event loop, keep one per loop
+        self._loop_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def limit(self):
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._loop_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._loop_semaphores[loop] = semaphore
+
+        async with semaphore:
+            yield
+
+    @contextmanager
+    def limit_sync(self):
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        with self._thread_semaphore:
+            yield
+
+
+@lru_cache()
+def get_concurrency_limiter(provider: str) -> ConcurrencyLimiter:
+    max_concurrency = {
+        "openrouter": config.OPENROUTER_MAX_CONCURRENCY,
+        "huggingface": config.HUGGINGFACE_MAX_CONCURRENCY,
+    }[provider]
+    return ConcurrencyLimiter(max_concurrency)
+
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        config.LLM_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS
+    )
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+@lru_cache()
+def get_http_client() -> httpx.Client:
+    # One pool per process: TLS handshakes are paid once per connection,
+    # not once per request
+    return httpx.Client(timeout=_http_timeout(), limits=_http_limits())
+
+
+class LoopLocalAsyncClient(httpx.AsyncClient):
+    # An AsyncClient's connections belong to the event loop that opened them,
+    # but the cached models holding this client are awaited from the server
+    # loop, from asyncio.run in the CLI and from benchmarks. Requests are
+    # built here and sent through one pooled client per running loop, like
+    # ConcurrencyLimiter keeps one semaphore per loop.
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client_kwargs = kwargs
+        self._loop_clients = weakref.WeakKeyDictionary()
+        self._loop_clients_lock = threading.Lock()
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._loop_clients_lock:
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(**self._client_kwargs)
+                self._loop_clients[loop] = client
+        return client
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._loop_client().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        with self._loop_clients_lock:
+            client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+@lru_cache()
+def get_async_http_client() -> httpx.AsyncClient:
+    return LoopLocalAsyncClient(timeout=_http_timeout(), limits=_http_limits())
+
+
+@lru_cache()
+def get_requests_session() -> requests.Session:
+    retry = Retry(
+        total=config.LLM_MAX_RETRIES,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        pool_maxsize=config.HTTP_MAX_CONNECTIONS,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@lru_cache()
+def get_local_embedding_model():
+    # Loaded once per process; every session reuses the warm model
+    try:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    except ImportError as e:
+        raise ImportError(
+            "EMBEDDING_BACKEND=local requires the llama-index-embeddings-huggingface "
+            "package: pip install llama-index-embeddings-huggingface"
+        ) from e
+
+    if config.LOCAL_EMBEDDING_THREADS > 0:
+        import torch
+
+        torch.set_num_threads(config.LOCAL_EMBEDDING_THREADS)
+
+    model_kwargs = {}
+    if config.LOCAL_EMBEDDING_RUNTIME != "torch":
+        # e.g. "onnx" with LOCAL_EMBEDDING_MODEL_FILE=onnx/model_qint8_avx2.onnx
+        # for quantized weights
+        model_kwargs["backend"] = config.LOCAL_EMBEDDING_RUNTIME
+        if config.LOCAL_EMBEDDING_MODEL_FILE:
+            model_kwargs["model_kwargs"] = {
+                "file_name": config.LOCAL_EMBEDDING_MODEL_FILE
+            }
+
+    class LocalEmbedding(HuggingFaceEmbedding):
+        # Inference is CPU bound; run it in a thread so async callers do not
+        # block the event loop
+        async def _aget_query_embedding(self, query):
+            return await asyncio.to_thread(self._get_query_embedding, query)
+
+        async def _aget_text_embedding(self, text):
+            return await asyncio.to_thread(self._get_text_embedding, text)
+
+        async def _aget_text_embeddings(self, texts):
+            return await asyncio.to_thread(self._get_text_embeddings, texts)
+
+    start_time = time.time()
+    embedding_llm = LocalEmbedding(
         model_name=config.HUGGINGFACE_MODEL_EMBEDDING,
-        token=config.HUGGINGFACE_TOKEN,
+        embed_batch_size=config.LOCAL_EMBEDDING_BATCH_SIZE,
+        device="cpu",
+        **model_kwargs,
     )
 
-    logger.info("Created HuggingFace embedding model")
+    logger.info(
+        f"Loaded local embedding model ({config.LOCAL_EMBEDDING_RUNTIME}) "
+        f"in {time.time() - start_time:.2f} seconds"
+    )
 
     return embedding_llm
 
 
+def create_model_embedding_openai():
+    # Any OpenAI-compatible /embeddings endpoint (self-hosted servers, the
+    # benchmark stand-in)
+    try:
+        from llama_index.embeddings.openai import OpenAIEmbedding
+    except ImportError as e:
+        raise ImportError(
+            "EMBEDDING_BACKEND=openai requires the llama-index-embeddings-openai "
+            "package: pip install llama-index-embeddings-openai"
+        ) from e
+
+    return OpenAIEmbedding(
+        model_name=config.HUGGINGFACE_MODEL_EMBEDDING,
+        api_base=config.EMBEDDING_BASE_URL or None,
+        api_key=config.EMBEDDING_API_KEY or config.OPENROUTER_API_KEY,
+        max_retries=config.LLM_MAX_RETRIES,
+        timeout=config.LLM_TIMEOUT_SECONDS,
+        http_client=get_http_client(),
+        async_http_client=get_async_http_client(),
+    )
+
+
+def create_model_embedding():
+    if config.EMBEDDING_BACKEND == "local":
+        embedding_llm = get_local_embedding_model()
+    elif config.EMBEDDING_BACKEND == "openai":
+        embedding_llm = create_model_embedding_openai()
+        logger.info("Created OpenAI-compatible embedding model")
+    else:
+        from llama_index.embeddings.huggingface_api import (
+            HuggingFaceInferenceAPIEmbedding,
+        )
+
+        embedding_llm = HuggingFaceInferenceAPIEmbedding(
+            model_name=config.HUGGINGFACE_MODEL_EMBEDDING,
+            token=config.HUGGINGFACE_TOKEN,
+            timeout=config.LLM_TIMEOUT_SECONDS,
+        )
+
+        logger.info("Created HuggingFace embedding model")
+
+    if config.EMBEDDING_CACHE_ENABLED:
+        # Only texts missing from the cache reach the embedding provider
+        embedding_llm = CachedEmbedding(
+            embedding_llm,
+            get_embedding_cache_store(),
+            cache_namespace=(
+                f"{config.EMBEDDING_BACKEND}:{config.HUGGINGFACE_MODEL_EMBEDDING}"
+            ),
+        )
+
+    return embedding_llm
+
+
+@lru_cache()
+def get_model_embedding():
+    # Shared by every index, retriever and query embedding in the process, so
+    # the client (or the local model) is built once
+    return create_model_embedding()
+
+
 def create_model_llm(
-    temperature: float = config.TEMPERATURE,
-    max_new_tokens: int = config.MAX_NEW_TOKENS,
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
 ):
+    # The OpenAI SDK alone takes seconds to import; only pay for it once a
+    # model is actually needed (or during warm-up)
+    from langchain_openai.chat_models import ChatOpenAI
+
     llm = ChatOpenAI(
         name="openrouter",
-        base_url="https://openrouter.ai/api/v1",
+        base_url=config.OPENROUTER_BASE_URL,
         model=config.OPENROUTER_MODEL,
         api_key=config.OPENROUTER_API_KEY,
-        temperature=temperature,
-        max_completion_tokens=max_new_tokens,
+        temperature=config.TEMPERATURE if temperature is None else temperature,
+        max_completion_tokens=max_new_tokens or config.MAX_NEW_TOKENS,
         top_p=config.TOP_P,
+        # The OpenAI client retries 408/429/5xx itself, with exponential
+        # backoff, jitter and Retry-After support
+        max_retries=config.LLM_MAX_RETRIES,
+        timeout=_http_timeout(),
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
     )
 
     logger.info("Created OpenRouter LLM model")
     return llm
 
 
+@lru_cache()
+def get_model_llm(
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
+):
+    # Long-lived client shared across calls, so the HTTP connection pool is
+    # reused instead of being rebuilt for every question.
+    return create_model_llm(temperature=temperature, max_new_tokens=max_new_tokens)
+
+
 def create_mode_llm_huggingface(
-    temperature: float = config.TEMPERATURE,
-    max_new_tokens: int = config.MAX_NEW_TOKENS,
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
 ):
+    from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
+
     llm = HuggingFaceInferenceAPI(
         model_name=config.HUGGINGFACE_MODEL_LLM,
-        temperature=temperature,
-        max_new_tokens=max_new_tokens,
+        temperature=config.TEMPERATURE if temperature is None else temperature,
+        max_new_tokens=max_new_tokens or config.MAX_NEW_TOKENS,
         top_p=config.TOP_P,
         token=config.HUGGINGFACE_TOKEN,
+        timeout=config.LLM_TIMEOUT_SECONDS,
     )
 
     logger.info("Created HuggingFace LLM model")
     return llm
+
+
+@lru_cache()
+def get_fallback_llm(
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
+):
+    return create_mode_llm_huggingface(
+        temperature=temperature, max_new_tokens=max_new_tokens
+    )
+
+
+LLMInput = Union[str, List[BaseMessage]]
+
+
+def _to_prompt(messages: LLMInput) -> str:
+    if isinstance(messages, str):
+        return messages
+    return get_buffer_string(messages)
+
+
+def _fallback_deadline() -> Optional[float]:
+    if not config.LLM_FALLBACK_ENABLED or config.LLM_FALLBACK_AFTER_SECONDS <= 0:
+        return None
+    return config.LLM_FALLBACK_AFTER_SECONDS
+
+
+def _record_completion(
+    provider: str,
+    messages: LLMInput,
+    completion: str,
+    usage: Optional[dict] = None,
+) -> None:
+    if not config.METRICS_ENABLED:
+        return
+    # Full responses carry the provider's usage; streamed and fallback calls
+    # are counted with the local tokenizer
+    if usage:
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+    else:
+        prompt_tokens = count_tokens(_to_prompt(messages))
+        completion_tokens = count_tokens(completion)
+    record_llm_call(provider, "success", prompt_tokens, completion_tokens)
+
+
+def _with_json_mode(model_llm, json_mode: bool):
+    # OpenAI-compatible JSON mode: the provider guarantees a syntactically
+    # valid JSON object (the prompt must mention JSON)
+    if not json_mode:
+        return model_llm
+    return model_llm.bind(response_format={"type": "json_object"})
+
+
+def _fallback_complete(
+    messages: LLMInput, temperature: Optional[float], max_new_tokens: Optional[int]
+) -> str:
+    with get_concurrency_limiter("huggingface").limit_sync():
+        fallback_llm = get_fallback_llm(
+            temperature=temperature, max_new_tokens=max_new_tokens
+        )
+        completion = fallback_llm.complete(_to_prompt(messages)).text
+    _record_completion("huggingface", messages, completion)
+    return completion
+
+
+async def _afallback_complete(
+    messages: LLMInput, temperature: Optional[float], max_new_tokens: Optional[int]
+) -> str:
+    await get_rate_limiter("huggingface").acquire()
+    async with get_concurrency_limiter("huggingface").limit():
+        fallback_llm = get_fallback_llm(
+            temperature=temperature, max_new_tokens=max_new_tokens
+        )
+        completion = (await fallback_llm.acomplete(_to_prompt(messages))).text
+    _record_completion("huggingface", messages, completion)
+    return completion
+
+
+def invoke_llm(
+    messages: LLMInput,
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
+    json_mode: bool = False,
+) -> str:
+    try:
+        with get_concurrency_limiter("openrouter").limit_sync():
+            model_llm = _with_json_mode(
+                get_model_llm(temperature=temperature, max_new_tokens=max_new_tokens),
+                json_mode,
+            )
+            response = model_llm.invoke(messages)
+        _record_completion(
+            "openrouter", messages, response.content, response.usage_metadata
+        )
+        return response.content
+    except Exception as e:
+        record_llm_call("openrouter", "error")
+        if not config.LLM_FALLBACK_ENABLED:
+            raise
+        logger.warning(f"OpenRouter request failed ({e}), using fallback model")
+
+    return _fallback_complete(messages, temperature, max_new_tokens)
+
+
+async def ainvoke_llm(
+    messages: LLMInput,
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
+    json_mode: bool = False,
+) -> str:
+    try:
+        await get_rate_limiter("openrouter").acquire()
+        async with get_concurrency_limiter("openrouter").limit():
+            model_llm = _with_json_mode(
+                get_model_llm(temperature=temperature, max_new_tokens=max_new_tokens),
+                json_mode,
+            )
+            response = await asyncio.wait_for(
+                model_llm.ainvoke(messages), timeout=_fallback_deadline()
+            )
+        _record_completion(
+            "openrouter", messages, response.content, response.usage_metadata
+        )
+        return response.content
+    except Exception as e:
+        record_llm_call("openrouter", "error")
+        if not config.LLM_FALLBACK_ENABLED:
+            raise
+        logger.warning(
+            f"OpenRouter request failed or timed out ({e!r}), using fallback model"
+        )
+
+    return await _afallback_complete(messages, temperature, max_new_tokens)
+
+
+async def astream_llm(
+    messages: LLMInput,
+    temperature: Optional[float] = None,
+    max_new_tokens: Optional[int] = None,
+) -> AsyncIterator[str]:
+    started = False
+    try:
+        await get_rate_limiter("openrouter").acquire()
+        async with get_concurrency_limiter("openrouter").limit():
+            model_llm = get_model_llm(
+                temperature=temperature, max_new_tokens=max_new_tokens
+            )
+            stream = model_llm.astream(messages)
+            completion = ""
+            try:
+                while True:
+                    # Only the wait for the first token is bounded; a slow
+                    # provider is abandoned before anything was streamed
+                    try:
+                        chunk = await asyncio.wait_for(
+                            stream.__anext__(),
+                            timeout=None if started else _fallback_deadline(),
+                        )
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.content:
+                        continue
+                    started = True
+                    completion += chunk.content
+                    yield chunk.content
+            finally:
+                await stream.aclose()
+        _record_completion("openrouter", messages, completion)
+        return
+    except Exception as e:
+        record_llm_call("openrouter", "error")
+        if started or not config.LLM_FALLBACK_ENABLED:
+            raise
+        logger.warning(
+            f"OpenRouter stream failed or timed out ({e!r}), using fallback model"
+        )
+
+    yield await _afallback_complete(messages, temperature, max_new_tokens)
@@ -0,0 +1,278 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from config import settings as config
+from functools import lru_cache
+import logging
+import random
+import threading
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help) for the Prometheus exposition
+METRICS = {
+    "resume_stage_duration_seconds": (
+        "histogram",
+        "Duration of ingestion and question answering stages",
+    ),
+    "resume_llm_requests_total": ("counter", "LLM calls by provider and outcome"),
+    "resume_llm_tokens_total": (
+        "counter",
+        "LLM tokens by provider and kind (prompt or completion)",
+    ),
+    "resume_llm_cost_usd_total": ("counter", "Estimated LLM cost in USD"),
+    "resume_cache_requests_total": ("counter", "Cache lookups by cache and result"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self) -> str:
+        # Prometheus text exposition format, version 0.0.4
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(h.counts), h.sum, h.count)
+                for key, h in self._histograms.items()
+            )
+
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str) -> None:
+            if name not in described:
+                metric_type, help_text = METRICS.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), counts, total, count in histograms:
+            describe(name)
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = _format_labels(labels, ("le", f"{bound:g}"))
+                lines.append(f"{name}_bucket{le} {bucket_count}")
+            inf = ("le", "+Inf")
+            lines.append(f"{name}_bucket{_format_labels(labels, inf)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "".join(f"{line}\n" for line in lines)
+
+
+class Trace:
+    def __init__(self, flow: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.flow = flow
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.payloads: Dict[str, Any] = {}
+
+    def add_span(self, stage: str, start: float, duration: float) -> None:
+        self.spans.append(
+            {
+                "stage": stage,
+                "start_ms": round((start - self._start) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+            }
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "flow": self.flow,
+            "started_at": self.started_at,
+            "spans": list(self.spans),
+            "payloads": dict(self.payloads),
+        }
+
+
+class TraceBuffer:
+    def __init__(self, max_traces: int):
+        self._traces: "deque[Trace]" = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace.to_dict()
+        return None
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+@lru_cache()
+def get_trace_buffer() -> TraceBuffer:
+    return TraceBuffer(max_traces=config.TRACE_BUFFER_SIZE)
+
+
+def start_trace(flow: str) -> Tuple[Optional[Trace], Optional[Token]]:
+    # A flow running inside another one (the facts of an ingestion) records
+    # into the outer trace instead of replacing it
+    active = _current_trace.get()
+    if active is not None:
+        return active, None
+
+    # Only a sample of requests carry a trace; the rest pay one random() call
+    if config.TRACE_SAMPLE_RATE <= 0 or random.random() >= config.TRACE_SAMPLE_RATE:
+        return None, None
+    trace = Trace(flow)
+    get_trace_buffer().add(trace)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: Optional[Token]) -> None:
+    # Restores whatever was current before the matching start_trace
+    if token is None:
+        return
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # An abandoned stream finalised from another context; the context
+        # that set the trace is gone with it
+        pass
+
+
+def trace_payload(name: str, value: Any) -> None:
+    # Large debug data (profile JSON, retrieved context) is kept for sampled
+    # requests only, instead of being logged on every call
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.payloads[name] = value
+    logger.debug(f"Trace {trace.trace_id} {name}: {value}")
+
+
+def record_stage(flow: str, stage: str, start: float, duration: float) -> None:
+    if config.METRICS_ENABLED:
+        get_metrics().observe(
+            "resume_stage_duration_seconds", duration, flow=flow, stage=stage
+        )
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(stage, start, duration)
+
+
+@contextmanager
+def span(flow: str, stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(flow, stage, start, time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    if config.METRICS_ENABLED and count:
+        get_metrics().inc(
+            "resume_cache_requests_total",
+            count,
+            cache=cache,
+            result="hit" if hit else "miss",
+        )
+
+
+def record_llm_call(
+    provider: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0
+) -> None:
+    if not config.METRICS_ENABLED:
+        return
+
+    metrics = get_metrics()
+    metrics.inc("resume_llm_requests_total", provider=provider, outcome=outcome)
+    if not prompt_tokens and not completion_tokens:
+        return
+
+    metrics.inc(
+        "resume_llm_tokens_total", prompt_tokens, provider=provider, kind="prompt"
+    )
+    metrics.inc(
+        "resume_llm_tokens_total",
+        completion_tokens,
+        provider=provider,
+        kind="completion",
+    )
+    cost = (
+        prompt_tokens * config.LLM_PROMPT_COST_PER_MTOKENS
+        + completion_tokens * config.LLM_COMPLETION_COST_PER_MTOKENS
+    ) / 1_000_000
+    if cost:
+        metrics.inc("resume_llm_cost_usd_total", cost, provider=provider)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        usage = trace.payloads.setdefault("llm_tokens", {"prompt": 0, "completion": 0})
+        usage["prompt"] += prompt_tokens
+        usage["completion"] += completion_tokens
@@ -0,0 +1,223 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from config import settings as config
+from functools import lru_cache
+import logging
+import multiprocessing
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# Text before the first recognised heading (name, title, contact details)
+HEADER_SECTION = "header"
+
+SECTION_HEADINGS = {
+    "summary": [
+        "summary",
+        "professional summary",
+        "profile",
+        "professional profile",
+        "about",
+        "about me",
+        "objective",
+        "career objective",
+    ],
+    "experience": [
+        "experience",
+        "experiences",
+        "work experience",
+        "professional experience",
+        "employment",
+        "employment history",
+        "work history",
+        "career history",
+    ],
+    "education": [
+        "education",
+        "academic background",
+        "education and training",
+        "qualifications",
+    ],
+    "skills": [
+        "skills",
+        "technical skills",
+        "core competencies",
+        "competencies",
+        "skills and tools",
+        "tech stack",
+    ],
+    "certifications": [
+        "certifications",
+        "certificates",
+        "licenses and certifications",
+        "licenses & certifications",
+        "courses",
+    ],
+    "languages": ["languages", "language skills"],
+    "interests": ["interests", "hobbies", "hobbies and interests"],
+}
+
+ALL_FIELDS = (
+    "name",
+    "current_position",
+    "location",
+    "summary",
+    "experiences",
+    "education",
+    "skills",
+    "certifications",
+    "languages",
+    "interests",
+)
+
+# ProfileData fields to ask for, and the sections that contain them
+SECTION_FIELDS = [
+    (
+        ("name", "current_position", "location", "summary"),
+        (HEADER_SECTION, "summary"),
+    ),
+    (("experiences", "current_position"), ("experience",)),
+    (("education",), ("education",)),
+    (("skills",), ("skills",)),
+    (
+        ("certifications", "languages", "interests"),
+        ("certifications", "languages", "interests"),
+    ),
+]
+
+_HEADING_LOOKUP = {
+    heading: section
+    for section, headings in SECTION_HEADINGS.items()
+    for heading in headings
+}
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    # Runs in a worker process: every worker opens its own reader
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _pdf_workers() -> int:
+    return config.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+
+
+@lru_cache()
+def get_pdf_process_pool() -> ProcessPoolExecutor:
+    # Workers are never forked from the server: forking a process that runs
+    # threads (uvicorn, asyncio.to_thread) can deadlock the child
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=_pdf_workers(), mp_context=multiprocessing.get_context(method)
+    )
+
+
+def shutdown_pdf_process_pool() -> None:
+    # Only a pool that was actually started has workers to stop
+    if get_pdf_process_pool.cache_info().currsize:
+        get_pdf_process_pool().shutdown(cancel_futures=True)
+        get_pdf_process_pool.cache_clear()
+
+
+def load_pdf_pages(pdf_path: str) -> List[str]:
+    # Sections span pages, so section detection needs the whole document:
+    # pages are parsed in parallel, then returned together
+    reader = PdfReader(pdf_path)
+    num_pages = len(reader.pages)
+
+    # Process start-up costs more than parsing a typical one or two page CV
+    if num_pages < config.PDF_PARALLEL_MIN_PAGES:
+        return [page.extract_text() or "" for page in reader.pages]
+
+    pages_per_task = max(1, -(-num_pages // _pdf_workers()))
+    futures = [
+        get_pdf_process_pool().submit(
+            _extract_page_range,
+            pdf_path,
+            start,
+            min(start + pages_per_task, num_pages),
+        )
+        for start in range(0, num_pages, pages_per_task)
+    ]
+
+    logger.info(f"Extracting {num_pages} PDF pages in {len(futures)} worker tasks")
+    return [page for future in futures for page in future.result()]
+
+
+def _match_heading(line: str) -> Optional[str]:
+    candidate = line.strip().strip(":").strip()
+    if not candidate or len(candidate) > 40 or len(candidate.split()) > 4:
+        return None
+
+    normalized = re.sub(r"[^a-z& ]", " ", candidate.lower())
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return _HEADING_LOOKUP.get(normalized)
+
+
+def detect_sections(document_text: str) -> Dict[str, str]:
+    # Resume headings are short lines such as "EXPERIENCE" or "Skills:";
+    # everything up to the next heading belongs to that section
+    sections: Dict[str, List[str]] = {HEADER_SECTION: []}
+    current = HEADER_SECTION
+
+    for line in document_text.splitlines():
+        section = _match_heading(line)
+        if section:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        sections[current].append(line)
+
+    return {
+        name: "\n".join(lines).strip()
+        for name, lines in sections.items()
+        if "\n".join(lines).strip()
+    }
+
+
+def chunk_section(text: str, max_chars: int) -> List[str]:
+    # Split on line boundaries so an experience entry is not cut mid-sentence
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for line in text.splitlines():
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def plan_extraction(
+    document_text: str, max_chars: int
+) -> List[Tuple[Tuple[str, ...], str]]:
+    # One (fields to extract, text) pair per LLM call
+    sections = detect_sections(document_text)
+    if len(sections) < 3:
+        # No usable structure: extract every field, chunked by size
+        return [
+            (ALL_FIELDS, chunk) for chunk in chunk_section(document_text, max_chars)
+        ]
+
+    plan = []
+    for fields, section_names in SECTION_FIELDS:
+        text = "\n\n".join(
+            sections[name] for name in section_names if name in sections
+        )
+        if text:
+            plan.extend((fields, chunk) for chunk in chunk_section(text, max_chars))
+
+    logger.info(
+        f"Detected resume sections {sorted(sections)}, "
+        f"planned {len(plan)} extraction calls"
+    )
+    return plan
@@ -1,21 +1,33 @@
 from llama_index.core import VectorStoreIndex, PromptTemplate
-from module.llm_interface import create_model_llm
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from module.answer_cache import get_answer_cache, get_context_cache, normalize_question
+from module.llm_interface import (
+    ainvoke_llm,
+    astream_llm,
+    get_model_embedding,
+    invoke_llm,
+)
+from module.context_budget import get_context_budgeter
+from module.singleflight import get_singleflight
+from module.metrics import trace_payload
+from module.timing import StageTimer
+from module.vector_search import (
+    get_session_retriever,
+    is_keyword_query,
+    retrieve_batch,
+)
 from config import settings as config
-from typing import Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import json
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+LLM_ERROR_MESSAGE = "Error creating LLM model"
 
-def generate_facts_candidate(index: VectorStoreIndex) -> str:
-    try:
-        model_llm = create_model_llm(
-            temperature=0.1,
-            max_new_tokens=1000,
-        )
-
-        prompt_template = """
+FACTS_PROMPT = PromptTemplate(
+    template="""
             You are an expert in talent recruitment. Analyze the following resume profile.
             context information is below:
 
@@ -26,66 +38,326 @@ def generate_facts_candidate(index: VectorStoreIndex) -> str:
             If you don't know the answer, just say that you don't know, do not try to make up an answer.
             provide a detailed answer about the candidate.
         """
+)
 
-        facts_template = PromptTemplate(template=prompt_template)
+ANSWER_PROMPT = PromptTemplate(
+    template="""
+        You are an expert in recruiting talent who helps determine the best candidates on resume profiles.
+        Use the following information to answer the question.
+        You must provide a detailed explanation of the profile.
+        context information is below:
+        {context_str}
 
-        query_engine = index.as_query_engine(
-            streaming=False,
-            similarity_top_k=config.SIMILARITY_TOP_K,
-            llm=model_llm,
-            text_qa_template=facts_template,
-        )
+        Query: {query_str}
+        Answer in full details, using only the information provided in the context.
+        If the answer is not available in the context, say "I don't know.
+        The information is not available on the resume page."
+        """
+)
 
-        query = (
-            "Provide a detailed analysis of the candidate based on the profile data."
-        )
 
-        result = query_engine.query(query)
-        return result.response
+FACTS_QUERY = "Provide a detailed analysis of the candidate based on the profile data."
+
+# The facts cover these aspects; each retrieves its own chunks, all scored in
+# one batch, so no part of the resume is crowded out by another
+FACTS_ASPECT_QUERIES = [
+    "Current position, seniority and years of experience",
+    "Work experience, companies, projects and responsibilities",
+    "Technical skills, tools and certifications",
+    "Education, degrees and institutions",
+    "Languages, location and interests",
+]
+
+
+def _format_prompt(
+    nodes: List[NodeWithScore], template: PromptTemplate, query: str, timer: StageTimer
+) -> str:
+    with timer.stage("prompt"):
+        # Only the relevant, non-redundant chunks that fit the token budget
+        context_str, _ = get_context_budgeter().assemble(nodes)
+        prompt = template.format(context_str=context_str, query_str=query)
+    trace_payload("context", context_str)
+
+    return prompt
+
+
+def _merge_results(results: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+    # A chunk retrieved for several queries is kept once, with its best score
+    best: Dict[str, NodeWithScore] = {}
+    for nodes in results:
+        for node in nodes:
+            kept = best.get(node.node.node_id)
+            if kept is None or (node.score or 0.0) > (kept.score or 0.0):
+                best[node.node.node_id] = node
+    return sorted(best.values(), key=lambda node: node.score or 0.0, reverse=True)
+
+
+def _build_prompt(
+    index: VectorStoreIndex,
+    template: PromptTemplate,
+    query: str,
+    timer: StageTimer,
+    query_embedding: Optional[List[float]] = None,
+) -> str:
+    # Retrieve once and hand the same nodes to the LLM, instead of letting a
+    # query engine run a second retrieval over the index.
+    with timer.stage("retrieve"):
+        nodes = get_context_cache().get(index, query)
+        if nodes is None:
+            base_retriever = get_session_retriever(index)
+            nodes = base_retriever.retrieve(
+                QueryBundle(query, embedding=query_embedding)
+            )
+            get_context_cache().put(index, query, nodes)
+
+    return _format_prompt(nodes, template, query, timer)
+
+
+async def _abuild_prompt(
+    index: VectorStoreIndex,
+    template: PromptTemplate,
+    query: str,
+    timer: StageTimer,
+    query_embedding: Optional[List[float]] = None,
+) -> str:
+    with timer.stage("retrieve"):
+        nodes = get_context_cache().get(index, query)
+        if nodes is None:
+            base_retriever = get_session_retriever(index)
+            nodes = await base_retriever.aretrieve(
+                QueryBundle(query, embedding=query_embedding)
+            )
+            get_context_cache().put(index, query, nodes)
+
+    return _format_prompt(nodes, template, query, timer)
+
+
+def _lookup_answer(
+    index: VectorStoreIndex,
+    question: str,
+    session_id: Optional[str],
+    timer: StageTimer,
+) -> Tuple[Optional[List[float]], Optional[str]]:
+    # The question embedding is computed once: it is the answer cache key and
+    # is reused for retrieval on a miss. Keyword queries are not embedded.
+    if not session_id or not config.ANSWER_CACHE_ENABLED:
+        return None, None
+
+    query_embedding = None
+    if not is_keyword_query(index, question):
+        with timer.stage("embed"):
+            query_embedding = get_model_embedding().get_query_embedding(question)
+    return query_embedding, get_answer_cache().lookup(
+        session_id, question, query_embedding
+    )
+
+
+async def _alookup_answer(
+    index: VectorStoreIndex,
+    question: str,
+    session_id: Optional[str],
+    timer: StageTimer,
+) -> Tuple[Optional[List[float]], Optional[str]]:
+    if not session_id or not config.ANSWER_CACHE_ENABLED:
+        return None, None
+
+    query_embedding = None
+    if not is_keyword_query(index, question):
+        with timer.stage("embed"):
+            query_embedding = await get_model_embedding().aget_query_embedding(
+                question
+            )
+    return query_embedding, get_answer_cache().lookup(
+        session_id, question, query_embedding
+    )
+
+
+def _store_answer(
+    session_id: Optional[str],
+    question: str,
+    query_embedding: Optional[List[float]],
+    answer: str,
+    timer: StageTimer,
+) -> None:
+    if not session_id or not config.ANSWER_CACHE_ENABLED:
+        return
+    if not answer or answer == LLM_ERROR_MESSAGE:
+        return
+    get_answer_cache().store(session_id, question, query_embedding, answer, timer.total)
+
+
+async def _astream_completion(
+    prompt: str, timer: StageTimer, temperature: float, max_new_tokens: int
+) -> AsyncIterator[str]:
+    with timer.stage("llm"):
+        first_token = True
+        async for token in astream_llm(
+            prompt, temperature=temperature, max_new_tokens=max_new_tokens
+        ):
+            if first_token:
+                timer.mark("first_token")
+                first_token = False
+            yield token
+
+
+def generate_facts_candidate(index: VectorStoreIndex) -> str:
+    try:
+        with StageTimer("facts") as timer:
+            with timer.stage("retrieve"):
+                nodes = _merge_results(retrieve_batch(index, FACTS_ASPECT_QUERIES))
+            prompt = _format_prompt(nodes, FACTS_PROMPT, FACTS_QUERY, timer)
+
+            with timer.stage("llm"):
+                result = invoke_llm(
+                    prompt,
+                    temperature=0.1,
+                    max_new_tokens=1000,
+                )
+
+            logger.info(f"Facts timings: {timer.summary()}")
+            return result
     except Exception as e:
         logger.error(f"Error creating LLM model: {e}")
-        return "Error creating LLM model"
+        return LLM_ERROR_MESSAGE
+
+
+async def astream_facts_from_profile(
+    profile_data: Dict[str, Any] | str,
+) -> AsyncIterator[str]:
+    # The extracted profile is small enough to be the whole context, so the
+    # facts do not have to wait for the embedding index to be built.
+    with StageTimer("facts") as timer:
+        with timer.stage("prompt"):
+            if isinstance(profile_data, dict):
+                profile_data = json.dumps(profile_data)
+            prompt = FACTS_PROMPT.format(
+                context_str=profile_data, query_str=FACTS_QUERY
+            )
+
+        async for token in _astream_completion(
+            prompt, timer, temperature=0.1, max_new_tokens=1000
+        ):
+            yield token
 
+        logger.info(f"Facts timings: {timer.summary()}")
 
-def answer_user_question(index: VectorStoreIndex, question: str) -> Any:
+
+def answer_user_question(
+    index: VectorStoreIndex, question: str, session_id: Optional[str] = None
+) -> Any:
     try:
-        model_llm = create_model_llm(
-            temperature=config.TEMPERATURE,
-            max_new_tokens=config.MAX_NEW_TOKENS,
-        )
+        with StageTimer("answer") as timer:
+            query_embedding, cached_answer = _lookup_answer(
+                index, question, session_id, timer
+            )
+            if cached_answer is not None:
+                return cached_answer
 
-        base_retriever = index.as_retriever(
-            similarity_top_k=config.SIMILARITY_TOP_K,
-        )
-        nodes = base_retriever.retrieve(question)
+            prompt = _build_prompt(
+                index, ANSWER_PROMPT, question, timer, query_embedding
+            )
 
-        context_str = "\n\n".join([node.node.get_text() for node in nodes])
-        logger.info(f"Context for question: {context_str}")
+            with timer.stage("llm"):
+                result = invoke_llm(
+                    prompt,
+                    temperature=config.TEMPERATURE,
+                    max_new_tokens=config.MAX_NEW_TOKENS,
+                )
 
-        prompt_template = f"""
-        You are an expert in recruiting talent who helps determine the best candidates on resume profiles.
-        Use the following information to answer the question.
-        You must provide a detailed explanation of the profile.
-        context information is below:
-        {context_str}
+            logger.info(f"Answer timings: {timer.summary()}")
+            _store_answer(session_id, question, query_embedding, result, timer)
+            return result
+    except Exception as e:
+        logger.error(f"Error creating LLM model: {e}")
+        return LLM_ERROR_MESSAGE
 
-        Query: {question}
-        Answer in full details, using only the information provided in the context. 
-        If the answer is not available in the context, say "I don't know. 
-        The information is not available on the resume page.
-        """
 
-        user_question_template = PromptTemplate(template=prompt_template)
+async def _aanswer_user_question(
+    index: VectorStoreIndex, question: str, session_id: Optional[str]
+) -> Any:
+    try:
+        with StageTimer("answer") as timer:
+            query_embedding, cached_answer = await _alookup_answer(
+                index, question, session_id, timer
+            )
+            if cached_answer is not None:
+                return cached_answer
 
-        query_engine = index.as_query_engine(
-            streaming=False,
-            similarity_top_k=config.SIMILARITY_TOP_K,
-            llm=model_llm,
-            text_qa_template=user_question_template,
-        )
+            prompt = await _abuild_prompt(
+                index, ANSWER_PROMPT, question, timer, query_embedding
+            )
+
+            with timer.stage("llm"):
+                result = await ainvoke_llm(
+                    prompt,
+                    temperature=config.TEMPERATURE,
+                    max_new_tokens=config.MAX_NEW_TOKENS,
+                )
 
-        result = query_engine.query(question)
-        return result.response
+            logger.info(f"Answer timings: {timer.summary()}")
+            _store_answer(session_id, question, query_embedding, result, timer)
+            return result
     except Exception as e:
         logger.error(f"Error creating LLM model: {e}")
-        return "Error creating LLM model"
+        return LLM_ERROR_MESSAGE
+
+
+async def aanswer_user_question(
+    index: VectorStoreIndex, question: str, session_id: Optional[str] = None
+) -> Any:
+    if not session_id:
+        return await _aanswer_user_question(index, question, session_id)
+
+    # The same question sent twice for one session (double submit, several
+    # tabs) pays for a single LLM call
+    return await get_singleflight("answer").do(
+        (session_id, normalize_question(question)),
+        lambda: _aanswer_user_question(index, question, session_id),
+    )
+
+
+async def _astream_user_question(
+    index: VectorStoreIndex, question: str, session_id: Optional[str]
+) -> AsyncIterator[str]:
+    with StageTimer("answer") as timer:
+        query_embedding, cached_answer = await _alookup_answer(
+            index, question, session_id, timer
+        )
+        if cached_answer is not None:
+            yield cached_answer
+            return
+
+        prompt = await _abuild_prompt(
+            index, ANSWER_PROMPT, question, timer, query_embedding
+        )
+
+        answer = ""
+        async for token in _astream_completion(
+            prompt,
+            timer,
+            temperature=config.TEMPERATURE,
+            max_new_tokens=config.MAX_NEW_TOKENS,
+        ):
+            answer += token
+            yield token
+
+        logger.info(f"Answer timings: {timer.summary()}")
+        _store_answer(session_id, question, query_embedding, answer, timer)
+
+
+async def astream_user_question(
+    index: VectorStoreIndex, question: str, session_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    if not session_id:
+        async for token in _astream_user_question(index, question, session_id):
+            yield token
+        return
+
+    async def stream_answer(publish):
+        async for token in _astream_user_question(index, question, session_id):
+            publish(token)
+
+    async for token in get_singleflight("answer").stream(
+        (session_id, normalize_question(question)), stream_answer
+    ):
+        yield token
@@ -0,0 +1,143 @@
+from typing import Any, Dict, List, Optional
+from llama_index.core.schema import TextNode
+from module.metrics import record_cache
+from config import settings as config
+from functools import lru_cache
+import hashlib
+import json
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored profile or node layout changes
+CACHE_FORMAT_VERSION = "2"
+
+
+def compute_file_hash(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def compute_resume_key(file_hash: str) -> str:
+    # Anything that changes the extracted profile, the chunking or the
+    # embeddings must be part of the key, otherwise stale entries are served.
+    # Retrieval settings such as SIMILARITY_TOP_K only apply at query time.
+    settings_fingerprint = "|".join(
+        [
+            file_hash,
+            CACHE_FORMAT_VERSION,
+            config.OPENROUTER_MODEL,
+            config.OPENROUTER_BASE_URL,
+            config.HUGGINGFACE_MODEL_EMBEDDING,
+            config.EMBEDDING_BACKEND,
+            config.EMBEDDING_BASE_URL,
+            str(config.CHUNK_SIZE),
+            str(config.INDEX_PDF_TEXT),
+            str(config.SECTION_EXTRACTION_ENABLED),
+            str(config.EXTRACTION_CHUNK_CHARS),
+            str(config.EXTRACTION_MAX_NEW_TOKENS),
+        ]
+    )
+    return hashlib.sha256(settings_fingerprint.encode("utf-8")).hexdigest()
+
+
+class ResumeCache:
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+
+            entry["nodes"] = [TextNode.from_dict(node) for node in entry["nodes"]]
+            logger.info(f"Resume cache hit for key: {key[:12]}")
+            record_cache("resume", True)
+            return entry
+        except FileNotFoundError:
+            logger.info(f"Resume cache miss for key: {key[:12]}")
+            record_cache("resume", False)
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable resume cache entry {key[:12]}: {e}")
+            self._remove(path)
+            return None
+
+    def put(
+        self,
+        key: str,
+        profile_data: Any,
+        nodes: List[TextNode],
+        initial_facts: str,
+    ) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            entry = {
+                "profile_data": profile_data,
+                "nodes": [node.to_dict() for node in nodes],
+                "initial_facts": initial_facts,
+            }
+
+            path = self._entry_path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+
+            logger.info(f"Stored resume cache entry for key: {key[:12]}")
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to store resume cache entry {key[:12]}: {e}")
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for file_name in os.listdir(self.cache_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            # Least recently used entries go first
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_bytes -= size
+                logger.info(f"Evicted resume cache entry: {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache()
+def get_resume_cache() -> ResumeCache:
+    return ResumeCache(
+        cache_dir=config.RESUME_CACHE_DIR,
+        max_bytes=config.RESUME_CACHE_MAX_BYTES,
+    )
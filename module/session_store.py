@@ -0,0 +1,251 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from array import array
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import TextNode
+from module.data_processing import create_vector_index, export_index_nodes
+from config import settings as config
+from functools import lru_cache
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# A Python list of floats costs a pointer plus a float object per element
+EMBEDDING_VALUE_BYTES = 32
+
+
+def _serialize_nodes(nodes: List[TextNode]) -> Tuple[str, bytes, int]:
+    node_dicts = []
+    embeddings = array("f")
+    dimension = 0
+
+    for node in nodes:
+        node_dict = node.to_dict()
+        embedding = node_dict.pop("embedding", None) or []
+        dimension = dimension or len(embedding)
+        if len(embedding) != dimension:
+            raise ValueError(f"Node {node.node_id} has no usable embedding")
+        embeddings.extend(embedding)
+        node_dicts.append(node_dict)
+
+    return json.dumps(node_dicts), embeddings.tobytes(), dimension
+
+
+def _deserialize_nodes(nodes_json: str, embeddings_blob: bytes, dimension: int):
+    embeddings = array("f")
+    embeddings.frombytes(embeddings_blob)
+
+    nodes = []
+    for position, node_dict in enumerate(json.loads(nodes_json)):
+        node = TextNode.from_dict(node_dict)
+        start = position * dimension
+        node.embedding = embeddings[start : start + dimension].tolist()
+        nodes.append(node)
+
+    return nodes
+
+
+def _estimate_nodes_bytes(nodes: List[TextNode]) -> int:
+    return sum(
+        len(node.get_content().encode("utf-8"))
+        + len(node.embedding or []) * EMBEDDING_VALUE_BYTES
+        for node in nodes
+    )
+
+
+class SessionStore:
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: int,
+        max_sessions: int,
+        max_bytes: int,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        # session_id -> (index, estimated bytes, last access time)
+        self._sessions: "OrderedDict[str, Tuple[VectorStoreIndex, int, float]]" = (
+            OrderedDict()
+        )
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    nodes TEXT NOT NULL,
+                    embeddings BLOB NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps the store safe to use
+        # from Gradio worker threads and from several uvicorn processes.
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(
+        self,
+        session_id: str,
+        index: VectorStoreIndex,
+        nodes: Optional[List[TextNode]] = None,
+    ) -> None:
+        if nodes is None:
+            nodes = export_index_nodes(index)
+
+        nodes_json, embeddings_blob, dimension = _serialize_nodes(nodes)
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, nodes_json, embeddings_blob, dimension, now, now),
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE last_access < ?",
+                (now - self.ttl_seconds,),
+            )
+
+        self._remember(session_id, index, _estimate_nodes_bytes(nodes), now)
+        logger.info(f"Stored session {session_id} with {len(nodes)} nodes")
+
+    def get(self, session_id: str) -> Optional[VectorStoreIndex]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry and now - entry[2] <= self.ttl_seconds:
+                index, size_bytes, _ = entry
+                self._sessions[session_id] = (index, size_bytes, now)
+                self._sessions.move_to_end(session_id)
+            else:
+                index = None
+
+        if index is not None:
+            self._touch(session_id, now)
+            return index
+
+        # Not in this worker's memory (or expired here): rehydrate from disk
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT nodes, embeddings, dimension, last_access FROM sessions "
+                "WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        nodes_json, embeddings_blob, dimension, last_access = row
+        if now - last_access > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+
+        nodes = _deserialize_nodes(nodes_json, embeddings_blob, dimension)
+        # Nodes already carry their embeddings, so this makes no embedding call
+        index = create_vector_index(nodes)
+        if index is None:
+            return None
+
+        self._touch(session_id, now)
+        self._remember(session_id, index, _estimate_nodes_bytes(nodes), now)
+        logger.info(f"Rehydrated session {session_id} from disk")
+        return index
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry:
+                self._memory_bytes -= entry[1]
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions_in_memory": len(self._sessions),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def _touch(self, session_id: str, now: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+                (now, session_id),
+            )
+
+    def _remember(
+        self,
+        session_id: str,
+        index: VectorStoreIndex,
+        size_bytes: int,
+        now: float,
+    ) -> None:
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            if previous:
+                self._memory_bytes -= previous[1]
+
+            self._sessions[session_id] = (index, size_bytes, now)
+            self._memory_bytes += size_bytes
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        expired = [
+            session_id
+            for session_id, (_, _, last_access) in self._sessions.items()
+            if now - last_access > self.ttl_seconds
+        ]
+        for session_id in expired:
+            _, size_bytes, _ = self._sessions.pop(session_id)
+            self._memory_bytes -= size_bytes
+
+        # Memory eviction only drops the in-process index; the session stays
+        # on disk and is rehydrated on its next request.
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or self._memory_bytes > self.max_bytes
+        ):
+            session_id, (_, size_bytes, _) = self._sessions.popitem(last=False)
+            self._memory_bytes -= size_bytes
+            logger.info(f"Evicted session {session_id} from memory")
+
+        if expired:
+            logger.info(f"Expired {len(expired)} sessions from memory")
+
+
+@lru_cache()
+def get_session_store() -> SessionStore:
+    return SessionStore(
+        db_path=config.SESSION_DB_PATH,
+        ttl_seconds=config.SESSION_TTL_SECONDS,
+        max_sessions=config.SESSION_MAX_ITEMS,
+        max_bytes=config.SESSION_MAX_BYTES,
+    )
@@ -0,0 +1,107 @@
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+)
+from functools import lru_cache
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+Publish = Callable[[Any], None]
+
+
+class _Flight:
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.events: List[Any] = []
+        self.listeners: List[Publish] = []
+
+    def publish(self, event: Any) -> None:
+        self.events.append(event)
+        for listener in list(self.listeners):
+            listener(event)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        return await self.do_with_events(key, lambda publish: fn())
+
+    async def do_with_events(
+        self,
+        key: Hashable,
+        fn: Callable[[Publish], Awaitable[Any]],
+        on_event: Optional[Publish] = None,
+    ) -> Any:
+        # Concurrent callers with the same key share one computation; events
+        # (e.g. streamed tokens) already published are replayed to late joiners
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(fn(flight.publish))
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+            self._flights[key] = flight
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            logger.info(f"Coalesced {self.name} call for key: {str(key)[:40]}")
+            if on_event:
+                for event in flight.events:
+                    on_event(event)
+
+        if on_event:
+            flight.listeners.append(on_event)
+        try:
+            # A caller that goes away must not cancel the work others wait on
+            return await asyncio.shield(flight.task)
+        finally:
+            if on_event:
+                flight.listeners.remove(on_event)
+
+    async def stream(
+        self, key: Hashable, fn: Callable[[Publish], Awaitable[Any]]
+    ) -> AsyncIterator[Any]:
+        events = asyncio.Queue()
+        finished = object()
+
+        task = asyncio.ensure_future(self.do_with_events(key, fn, events.put_nowait))
+        task.add_done_callback(lambda _: events.put_nowait(finished))
+        try:
+            while True:
+                event = await events.get()
+                if event is finished:
+                    break
+                yield event
+            task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        stats["in_flight"] = len(self._flights)
+
+        calls = stats["leaders"] + stats["coalesced"]
+        stats["coalesced_rate"] = stats["coalesced"] / calls if calls else 0.0
+        return stats
+
+
+@lru_cache()
+def get_singleflight(name: str) -> SingleFlight:
+    return SingleFlight(name)
+
+
+def singleflight_stats() -> Dict[str, Dict[str, float]]:
+    return {name: get_singleflight(name).stats() for name in ("ingest", "answer")}
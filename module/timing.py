@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from typing import Dict, Optional
+from module.metrics import end_trace, record_stage, start_trace
+import time
+
+
+class StageTimer:
+    def __init__(self, flow: Optional[str] = None):
+        self.timings: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self._start_time = time.perf_counter()
+
+        # With a flow name, every stage is also exported as a metric and the
+        # request may be sampled for a debug trace while the timer is entered
+        self.flow = flow
+        self.trace = None
+        self._trace_token = None
+
+    def __enter__(self) -> "StageTimer":
+        if self.flow:
+            self.trace, self._trace_token = start_trace(self.flow)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        end_trace(self._trace_token)
+        self._trace_token = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start_time
+            if self.flow:
+                record_stage(self.flow, name, start_time, self.timings[name])
+
+    def mark(self, name: str) -> None:
+        # Point-in-time measurement relative to the timer creation, e.g. the
+        # time to first token of a streamed response.
+        self.marks[name] = time.perf_counter() - self._start_time
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def summary(self) -> str:
+        parts = [
+            f"{name}={duration * 1000:.1f}ms"
+            for name, duration in {**self.timings, **self.marks}.items()
+        ]
+        parts.append(f"total={self.total * 1000:.1f}ms")
+        return " ".join(parts)
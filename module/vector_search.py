@@ -0,0 +1,319 @@
+from typing import List, Optional, Sequence
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+from module.context_budget import RankedNode
+from module.data_processing import export_index_nodes
+from module.llm_interface import get_model_embedding
+from module.lexical_index import BM25Index, tokenize
+from config import settings as config
+import asyncio
+import numpy as np
+import threading
+import weakref
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    # argpartition finds the k best in O(n); only those k get sorted
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    best = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=-1), axis=-1)
+    return np.take_along_axis(best, order, axis=-1)
+
+
+class DenseRetriever(BaseRetriever):
+    def __init__(
+        self,
+        nodes: Sequence[BaseNode],
+        embed_model: BaseEmbedding,
+        similarity_top_k: Optional[int] = None,
+    ):
+        super().__init__()
+        self._nodes = list(nodes)
+        self.embed_model = embed_model
+        self._similarity_top_k = similarity_top_k or config.SIMILARITY_TOP_K
+
+        # One contiguous normalized matrix: a top-k query is a single
+        # matrix-vector product
+        self._matrix = np.ascontiguousarray(
+            normalize_rows(
+                np.asarray([node.embedding for node in self._nodes], dtype=np.float32)
+            )
+        )
+
+    @classmethod
+    def from_index(
+        cls,
+        index: VectorStoreIndex,
+        similarity_top_k: Optional[int] = None,
+    ) -> "DenseRetriever":
+        # The index was embedded with the shared model; it embeds queries too
+        return cls(export_index_nodes(index), get_model_embedding(), similarity_top_k)
+
+    def _to_results(self, scores: np.ndarray, top_k: int) -> List[NodeWithScore]:
+        return [
+            NodeWithScore(node=self._nodes[i], score=float(scores[i]))
+            for i in top_k_indices(scores, top_k)
+        ]
+
+    def scores_by_embedding(self, query_embedding: List[float]) -> np.ndarray:
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        return self._matrix @ query
+
+    def scores_by_embeddings(self, query_embeddings: List[List[float]]) -> np.ndarray:
+        # (queries, nodes): every query scored in one matrix-matrix product
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        return queries @ self._matrix.T
+
+    def retrieve_by_embedding(
+        self, query_embedding: List[float], top_k: Optional[int] = None
+    ) -> List[NodeWithScore]:
+        if not self._nodes:
+            return []
+
+        return self._to_results(
+            self.scores_by_embedding(query_embedding), top_k or self._similarity_top_k
+        )
+
+    def retrieve_batch_by_embeddings(
+        self, query_embeddings: List[List[float]], top_k: Optional[int] = None
+    ) -> List[List[NodeWithScore]]:
+        if not self._nodes or not query_embeddings:
+            return [[] for _ in query_embeddings]
+
+        scores = self.scores_by_embeddings(query_embeddings)
+        best = top_k_indices(scores, top_k or self._similarity_top_k)
+        return [
+            [NodeWithScore(node=self._nodes[i], score=float(row[i])) for i in indices]
+            for row, indices in zip(scores, best)
+        ]
+
+    def retrieve_batch(
+        self, queries: List[str], top_k: Optional[int] = None
+    ) -> List[List[NodeWithScore]]:
+        query_embeddings = [self.embed_model.get_query_embedding(q) for q in queries]
+        return self.retrieve_batch_by_embeddings(query_embeddings, top_k)
+
+    async def aretrieve_batch(
+        self, queries: List[str], top_k: Optional[int] = None
+    ) -> List[List[NodeWithScore]]:
+        query_embeddings = await asyncio.gather(
+            *(self.embed_model.aget_query_embedding(q) for q in queries)
+        )
+        return self.retrieve_batch_by_embeddings(list(query_embeddings), top_k)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        query_embedding = (
+            query_bundle.embedding
+            or self.embed_model.get_query_embedding(query_bundle.query_str)
+        )
+        return self.retrieve_by_embedding(query_embedding)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        query_embedding = (
+            query_bundle.embedding
+            or await self.embed_model.aget_query_embedding(query_bundle.query_str)
+        )
+        return self.retrieve_by_embedding(query_embedding)
+
+
+QUESTION_WORDS = set(
+    """
+    how what when where which who why does do did is are can has have tell
+    describe list give
+    """.split()
+)
+
+
+class HybridRetriever(BaseRetriever):
+    def __init__(
+        self,
+        dense: DenseRetriever,
+        similarity_top_k: Optional[int] = None,
+        rrf_k: Optional[int] = None,
+        keyword_max_terms: Optional[int] = None,
+    ):
+        super().__init__()
+        self._dense = dense
+        self._nodes = dense._nodes
+        self._similarity_top_k = similarity_top_k or config.SIMILARITY_TOP_K
+        self._rrf_k = rrf_k or config.HYBRID_RRF_K
+        self._keyword_max_terms = keyword_max_terms or config.HYBRID_KEYWORD_MAX_TERMS
+        self._lexical = BM25Index([node.get_content() for node in self._nodes])
+
+    @classmethod
+    def from_index(
+        cls,
+        index: VectorStoreIndex,
+        similarity_top_k: Optional[int] = None,
+    ) -> "HybridRetriever":
+        return cls(DenseRetriever.from_index(index, similarity_top_k), similarity_top_k)
+
+    def is_keyword_query(self, query: str) -> bool:
+        # "Django", "AWS certification", "Acme Corp": short, not phrased as a
+        # question, and at least one term occurs in this resume
+        words = query.lower().split()
+        if not words or "?" in query or words[0] in QUESTION_WORDS:
+            return False
+        terms = tokenize(query)
+        if not 0 < len(terms) <= self._keyword_max_terms:
+            return False
+        return self._lexical.contains_any(query)
+
+    def _keyword_results(self, query: str) -> List[NodeWithScore]:
+        scores = self._lexical.scores(query)
+        best = [
+            i for i in top_k_indices(scores, self._similarity_top_k) if scores[i] > 0
+        ]
+        # Scaled to [0, 1] so the context score cutoff applies as for cosine
+        top_score = float(scores[best[0]]) if best else 1.0
+        return [
+            NodeWithScore(node=self._nodes[i], score=float(scores[i]) / top_score)
+            for i in best
+        ]
+
+    def _fused_results(
+        self, query: str, dense_scores: np.ndarray, top_k: Optional[int] = None
+    ) -> List[NodeWithScore]:
+        # Reciprocal rank fusion of the full dense and BM25 rankings; a
+        # session holds few enough chunks to rank all of them
+        lexical_scores = self._lexical.scores(query)
+
+        fused = np.zeros(len(self._nodes), dtype=np.float32)
+        dense_rank = np.argsort(-dense_scores)
+        fused[dense_rank] += 1.0 / (self._rrf_k + 1 + np.arange(len(dense_rank)))
+
+        lexical_rank = [i for i in np.argsort(-lexical_scores) if lexical_scores[i] > 0]
+        fused[lexical_rank] += 1.0 / (self._rrf_k + 1 + np.arange(len(lexical_rank)))
+
+        # Normalised by the best possible fused score (first in both lists).
+        # Every chunk is in the dense ranking, so even an unrelated one keeps
+        # about half of that; the raw cosine travels along for the cutoff.
+        fused /= 2.0 / (self._rrf_k + 1)
+        return [
+            RankedNode(
+                node=self._nodes[i],
+                score=float(fused[i]),
+                similarity=float(dense_scores[i]),
+            )
+            for i in top_k_indices(fused, top_k or self._similarity_top_k)
+        ]
+
+    def _fused_batch(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        top_k: Optional[int] = None,
+    ) -> List[List[NodeWithScore]]:
+        if not self._nodes or not queries:
+            return [[] for _ in queries]
+
+        dense_scores = self._dense.scores_by_embeddings(query_embeddings)
+        return [
+            self._fused_results(query, row, top_k)
+            for query, row in zip(queries, dense_scores)
+        ]
+
+    def retrieve_batch(
+        self, queries: List[str], top_k: Optional[int] = None
+    ) -> List[List[NodeWithScore]]:
+        embed_model = self._dense.embed_model
+        query_embeddings = [embed_model.get_query_embedding(q) for q in queries]
+        return self._fused_batch(queries, query_embeddings, top_k)
+
+    async def aretrieve_batch(
+        self, queries: List[str], top_k: Optional[int] = None
+    ) -> List[List[NodeWithScore]]:
+        embed_model = self._dense.embed_model
+        query_embeddings = await asyncio.gather(
+            *(embed_model.aget_query_embedding(q) for q in queries)
+        )
+        return self._fused_batch(queries, list(query_embeddings), top_k)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if not self._nodes:
+            return []
+
+        query = query_bundle.query_str
+        if query_bundle.embedding is None and self.is_keyword_query(query):
+            return self._keyword_results(query)
+
+        query_embedding = (
+            query_bundle.embedding
+            or self._dense.embed_model.get_query_embedding(query)
+        )
+        return self._fused_results(
+            query, self._dense.scores_by_embedding(query_embedding)
+        )
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if not self._nodes:
+            return []
+
+        query = query_bundle.query_str
+        if query_bundle.embedding is None and self.is_keyword_query(query):
+            return self._keyword_results(query)
+
+        query_embedding = (
+            query_bundle.embedding
+            or await self._dense.embed_model.aget_query_embedding(query)
+        )
+        return self._fused_results(
+            query, self._dense.scores_by_embedding(query_embedding)
+        )
+
+
+_session_retrievers: "weakref.WeakKeyDictionary[VectorStoreIndex, BaseRetriever]" = (
+    weakref.WeakKeyDictionary()
+)
+_session_retrievers_lock = threading.Lock()
+
+
+def get_session_retriever(index: VectorStoreIndex) -> BaseRetriever:
+    if config.RETRIEVAL_ENGINE not in ("dense", "hybrid"):
+        return index.as_retriever(similarity_top_k=config.SIMILARITY_TOP_K)
+
+    # Built once per index and dropped together with it
+    with _session_retrievers_lock:
+        retriever = _session_retrievers.get(index)
+        if retriever is None:
+            if config.RETRIEVAL_ENGINE == "hybrid":
+                retriever = HybridRetriever.from_index(index)
+            else:
+                retriever = DenseRetriever.from_index(index)
+            _session_retrievers[index] = retriever
+        return retriever
+
+
+def is_keyword_query(index: VectorStoreIndex, query: str) -> bool:
+    retriever = get_session_retriever(index)
+    return isinstance(retriever, HybridRetriever) and retriever.is_keyword_query(query)
+
+
+def retrieve_batch(
+    index: VectorStoreIndex, queries: List[str]
+) -> List[List[NodeWithScore]]:
+    # Several queries against one session, e.g. the facts aspects: one
+    # scoring pass for all of them on the NumPy engines
+    retriever = get_session_retriever(index)
+    if isinstance(retriever, (DenseRetriever, HybridRetriever)):
+        return retriever.retrieve_batch(queries)
+    return [retriever.retrieve(query) for query in queries]
+
+
+async def aretrieve_batch(
+    index: VectorStoreIndex, queries: List[str]
+) -> List[List[NodeWithScore]]:
+    retriever = get_session_retriever(index)
+    if isinstance(retriever, (DenseRetriever, HybridRetriever)):
+        return await retriever.aretrieve_batch(queries)
+    return [await retriever.aretrieve(query) for query in queries]
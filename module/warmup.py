@@ -0,0 +1,32 @@
+from typing import Dict
+from module.data_processing import get_splitter
+from module.llm_interface import get_fallback_llm, get_model_embedding, get_model_llm
+from module.timing import StageTimer
+from config import settings as config
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Stage name -> seconds of the last warm-up in this process
+warmup_timings: Dict[str, float] = {}
+
+
+def warm_up() -> Dict[str, float]:
+    # Pays the lazy imports, client construction and tokenizer / model loading
+    # up front, so the first upload or question does not
+    with StageTimer("warmup") as timer:
+        with timer.stage("llm"):
+            get_model_llm()
+        if config.LLM_FALLBACK_ENABLED:
+            with timer.stage("fallback_llm"):
+                get_fallback_llm()
+        with timer.stage("embedding"):
+            get_model_embedding()
+        with timer.stage("splitter"):
+            # Also loads the tokenizer shared with the context budgeter
+            get_splitter().split_text("warm up")
+
+        warmup_timings.update(timer.timings)
+        logger.info(f"Warm-up finished: {timer.summary()}")
+        return dict(timer.timings)
@@ -0,0 +1,6 @@
+import os
+
+# Settings requires these; tests never reach the real services
+os.environ.setdefault("HUGGINGFACE_MODEL_LLM", "test-llm")
+os.environ.setdefault("HUGGINGFACE_TOKEN", "test-token")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
@@ -0,0 +1,21 @@
+from config import get_settings
+from module import batch_ingestion
+from module.batch_ingestion import get_batch_progress
+import time
+
+
+def test_finished_batches_expire(monkeypatch):
+    monkeypatch.setattr(get_settings(), "BATCH_PROGRESS_TTL_SECONDS", 60)
+    monkeypatch.setattr(
+        batch_ingestion,
+        "batch_progress",
+        {
+            "running": {"status": "running"},
+            "recent": {"status": "finished", "finished_at": time.time() - 10},
+            "expired": {"status": "finished", "finished_at": time.time() - 120},
+        },
+    )
+
+    assert get_batch_progress("expired") is None
+    assert get_batch_progress("recent")["status"] == "finished"
+    assert sorted(batch_ingestion.batch_progress) == ["recent", "running"]
@@ -0,0 +1,40 @@
+from typing import List
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from module.candidate_bundle import CandidateBundleStore
+from module.data_processing import export_index_nodes
+
+
+class HashEmbedding(BaseEmbedding):
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query)), 1.0, 0.5]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return [float(len(text)), 1.0, 0.5]
+
+
+def test_bundle_round_trips_nodes_embedded_by_the_index(tmp_path):
+    nodes = [
+        TextNode(text="Senior Python engineer at Acme"),
+        TextNode(text="Built Django services on AWS"),
+    ]
+    index = VectorStoreIndex(nodes=nodes, embed_model=HashEmbedding())
+
+    store = CandidateBundleStore(bundle_dir=str(tmp_path), dtype="float16")
+    # The split nodes themselves are never embedded, only the index's copies
+    assert store.save("ab" * 32, {"name": "Ada"}, nodes, "facts") is None
+    assert store.save("ab" * 32, {"name": "Ada"}, export_index_nodes(index), "facts")
+
+    bundle = store.load("abababab")
+    assert bundle["candidate_id"] == "ab" * 32
+    assert bundle["profile_data"] == {"name": "Ada"}
+    assert bundle["initial_facts"] == "facts"
+    assert sorted(node.text for node in bundle["nodes"]) == sorted(
+        node.text for node in nodes
+    )
+    for node in bundle["nodes"]:
+        assert node.embedding == [float(len(node.text)), 1.0, 0.5]
@@ -0,0 +1,89 @@
+from llama_index.core.schema import NodeWithScore, TextNode
+from module.context_budget import (
+    CONTEXT_SEPARATOR,
+    ContextBudgeter,
+    RankedNode,
+    count_tokens,
+)
+
+
+def node(text, score):
+    return NodeWithScore(node=TextNode(text=text), score=score)
+
+
+SKILLS = "Python Django FastAPI PostgreSQL Docker Kubernetes AWS Terraform"
+EDUCATION = "Master of Science in Computer Science at TU Berlin from 2014 to 2016"
+EXPERIENCE = "Senior backend engineer at Acme building payment services in Go"
+
+
+def test_chunks_are_ordered_best_first():
+    budgeter = ContextBudgeter(token_budget=0, score_cutoff=0.0, dedup_threshold=0.8)
+    context, usage = budgeter.assemble(
+        [node(SKILLS, 0.5), node(EDUCATION, 0.9), node(EXPERIENCE, 0.7)]
+    )
+    assert context == CONTEXT_SEPARATOR.join([EDUCATION, EXPERIENCE, SKILLS])
+    assert usage["nodes_after"] == 3
+    assert usage["tokens_saved"] == 0
+
+
+def test_near_duplicates_keep_the_better_scored_copy():
+    budgeter = ContextBudgeter(token_budget=0, score_cutoff=0.0, dedup_threshold=0.8)
+    context, usage = budgeter.assemble(
+        [
+            node(f"Skills: {SKILLS}", 0.6),
+            node(f"Technical skills: {SKILLS}", 0.8),
+            node(EDUCATION, 0.7),
+        ]
+    )
+    assert context == CONTEXT_SEPARATOR.join([f"Technical skills: {SKILLS}", EDUCATION])
+    assert usage["nodes_after"] == 2
+
+
+def test_score_cutoff_uses_similarity_of_fused_results():
+    budgeter = ContextBudgeter(token_budget=0, score_cutoff=0.5, dedup_threshold=0.8)
+    # Fused scores are high for both; only the raw similarity decides
+    nodes = [
+        RankedNode(node=TextNode(text=SKILLS), score=1.0, similarity=0.2),
+        RankedNode(node=TextNode(text=EDUCATION), score=0.9, similarity=0.6),
+    ]
+    context, _ = budgeter.assemble(nodes)
+    assert context == EDUCATION
+
+
+def test_everything_below_cutoff_keeps_the_best_chunk():
+    budgeter = ContextBudgeter(token_budget=0, score_cutoff=0.9, dedup_threshold=0.8)
+    context, _ = budgeter.assemble([node(SKILLS, 0.2), node(EDUCATION, 0.3)])
+    assert context == EDUCATION
+
+
+def test_packing_skips_chunks_over_budget_and_fills_with_smaller_ones():
+    long_text = " ".join(f"project{i}" for i in range(60))
+    short_text = "Fluent in German"
+    budget = count_tokens(EDUCATION) + count_tokens(short_text) + 1
+
+    budgeter = ContextBudgeter(
+        token_budget=budget, score_cutoff=0.0, dedup_threshold=0.8
+    )
+    context, usage = budgeter.assemble(
+        [node(EDUCATION, 0.9), node(long_text, 0.8), node(short_text, 0.7)]
+    )
+    assert context == CONTEXT_SEPARATOR.join([EDUCATION, short_text])
+    assert usage["tokens_after"] <= budget
+    assert usage["tokens_saved"] > 0
+
+
+def test_best_chunk_over_budget_is_truncated():
+    long_text = " ".join(f"project{i}" for i in range(200))
+    budgeter = ContextBudgeter(token_budget=20, score_cutoff=0.0, dedup_threshold=0.8)
+    context, _ = budgeter.assemble([node(long_text, 0.9)])
+    # Cut proportionally by characters, so close to the budget, not exact
+    assert long_text.startswith(context)
+    assert 0 < count_tokens(context) < count_tokens(long_text) / 5
+
+
+def test_stats_accumulate_tokens_saved():
+    budgeter = ContextBudgeter(token_budget=0, score_cutoff=0.0, dedup_threshold=0.8)
+    budgeter.assemble([node(SKILLS, 0.9), node(SKILLS, 0.8)])
+    stats = budgeter.stats()
+    assert stats["requests"] == 1
+    assert stats["tokens_saved"] == stats["tokens_before"] - stats["tokens_after"] > 0
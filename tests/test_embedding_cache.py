@@ -0,0 +1,74 @@
+from typing import List
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from module.embedding_cache import CachedEmbedding, EmbeddingCacheStore
+import asyncio
+import sqlite3
+import time
+
+
+def disk_keys(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT key FROM embeddings")}
+
+
+def test_disk_tier_keeps_the_most_recently_used_rows(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    store = EmbeddingCacheStore(db_path, max_memory_items=0, max_rows=2)
+
+    store.put_many(["a", "b"], [[1.0], [2.0]])
+    time.sleep(0.01)
+    # A disk read refreshes "a", so "b" is the least recently used
+    assert store.get_many(["a"]) == [[1.0]]
+    time.sleep(0.01)
+    store.put_many(["c"], [[3.0]])
+
+    assert disk_keys(db_path) == {"a", "c"}
+    assert store.get_many(["b", "c"]) == [None, [3.0]]
+
+
+def test_table_without_access_times_is_migrated(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        conn.execute("INSERT INTO embeddings VALUES ('old', x'0000803f')")
+
+    store = EmbeddingCacheStore(db_path, max_memory_items=10, max_rows=1)
+    assert store.get_many(["old"]) == [[1.0]]
+
+    store.put_many(["new"], [[2.0]])
+    assert disk_keys(db_path) == {"new"}
+
+
+def test_async_lookups_only_embed_misses(tmp_path):
+    calls = []
+
+    class CountingEmbedding(BaseEmbedding):
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return [float(len(query))]
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            calls.append(query)
+            return [float(len(query))]
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return [float(len(text))]
+
+        async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            calls.extend(texts)
+            return [[float(len(text))] for text in texts]
+
+    store = EmbeddingCacheStore(str(tmp_path / "embeddings.db"), 10, 100)
+    embedding = CachedEmbedding(CountingEmbedding(), store, "test-model")
+
+    async def main():
+        first = await embedding.aget_text_embedding_batch(["ab", "abc", "ab "])
+        second = await embedding.aget_text_embedding_batch(["abc", "abcd"])
+        query = await embedding.aget_query_embedding("ab")
+        return first, second, query
+
+    first, second, query = asyncio.run(main())
+    assert first == [[2.0], [3.0], [2.0]]
+    assert second == [[3.0], [4.0]]
+    # Queries are cached apart from texts
+    assert query == [2.0]
+    assert calls == ["ab", "abc", "abcd", "ab"]
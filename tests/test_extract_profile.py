@@ -0,0 +1,89 @@
+from config import get_settings
+from module import extract_profile_pdf
+from module.extract_profile_pdf import (
+    ProfileData,
+    _parse_partial,
+    parse_profile_data,
+    repair_json,
+)
+from module.llm_interface import _with_json_mode
+import json
+import pytest
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"name": "Ana"}', {"name": "Ana"}),
+        ('```json\n{"name": "Ana"}\n```', {"name": "Ana"}),
+        ('Here is the profile: {"name": "Ana"} Hope it helps!', {"name": "Ana"}),
+        (
+            '{"skills": ["Go", "SQL",], "name": "Ana",}',
+            {"skills": ["Go", "SQL"], "name": "Ana"},
+        ),
+        (
+            '{"name": "A {b}", "summary": "say \\"hi\\""}',
+            {"name": "A {b}", "summary": 'say "hi"'},
+        ),
+        # Cut off by the token limit: inside a string, after a key, after a comma
+        (
+            '{"name": "Ana", "skills": ["Go", "SQ',
+            {"name": "Ana", "skills": ["Go", "SQ"]},
+        ),
+        ('{"name": "Ana", "location":', {"name": "Ana"}),
+        (
+            '{"name": "Ana", "experiences": [{"role": "Dev"},',
+            {"name": "Ana", "experiences": [{"role": "Dev"}]},
+        ),
+        ("no json at all", {}),
+    ],
+)
+def test_repair_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_parse_profile_data_coerces_near_misses():
+    profile = parse_profile_data(
+        '{"Name": "Ana", "skills": "Python", "location": ["Berlin", "Remote"], '
+        '"summary": 42, "interests": null, "unknown": "x"}'
+    )
+    assert profile == ProfileData(
+        name="Ana", skills=["Python"], location="Berlin, Remote", summary="42"
+    )
+
+
+def test_parse_profile_data_returns_empty_profile_on_garbage():
+    assert parse_profile_data('["not", "an", "object"]').is_empty()
+
+
+def test_partial_keeps_only_requested_fields():
+    profile = _parse_partial('{"name": "Ana", "skills": ["Go"]}', ["skills"])
+    assert profile == ProfileData(skills=["Go"])
+
+
+def test_json_mode_binds_response_format():
+    class FakeModel:
+        def bind(self, **kwargs):
+            return kwargs
+
+    model = FakeModel()
+    assert _with_json_mode(model, False) is model
+    assert _with_json_mode(model, True) == {
+        "response_format": {"type": "json_object"}
+    }
+
+
+def test_single_call_extraction_uses_json_mode(monkeypatch):
+    calls = []
+
+    def fake_invoke_llm(messages, **kwargs):
+        calls.append(kwargs)
+        return '{"name": "Ana", "skills": ["Go"]}'
+
+    monkeypatch.setattr(get_settings(), "SECTION_EXTRACTION_ENABLED", False)
+    monkeypatch.setattr(extract_profile_pdf, "load_pdf_text", lambda path: "Ana\nGo")
+    monkeypatch.setattr(extract_profile_pdf, "invoke_llm", fake_invoke_llm)
+
+    profile = extract_profile_pdf.extract_profile_pdf("resume.pdf")
+    assert profile == ProfileData(name="Ana", skills=["Go"])
+    assert calls[0]["json_mode"] is True
@@ -0,0 +1,47 @@
+from typing import List
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from module.context_budget import ContextBudgeter
+from module.vector_search import DenseRetriever, HybridRetriever
+
+
+class FixedEmbedding(BaseEmbedding):
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [1.0, 0.0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return [1.0, 0.0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return [1.0, 0.0]
+
+
+def test_low_cosine_chunk_is_dropped_under_hybrid_retrieval():
+    # Cosines to the query [1, 0]: 0.59, 0.51, 0.17, 0.14
+    chunks = [
+        ("Senior Python engineer at Acme", [0.59, 0.807]),
+        ("Built Django services on AWS", [0.51, 0.86]),
+        ("Enjoys hiking and photography", [0.17, 0.985]),
+        ("Speaks English and Spanish", [0.14, 0.99]),
+    ]
+    nodes = [TextNode(text=text, embedding=embedding) for text, embedding in chunks]
+    retriever = HybridRetriever(
+        DenseRetriever(nodes, FixedEmbedding(), similarity_top_k=4),
+        similarity_top_k=4,
+        rrf_k=60,
+        keyword_max_terms=3,
+    )
+
+    results = retriever.retrieve("Which cloud platforms has the candidate used?")
+    assert len(results) == 4
+    # The fused scores alone would clear the cutoff for every chunk
+    assert min(result.score for result in results) > 0.2
+
+    budgeter = ContextBudgeter(
+        token_budget=0, score_cutoff=0.2, dedup_threshold=1.0
+    )
+    context, usage = budgeter.assemble(results)
+
+    assert usage["nodes_after"] == 2
+    assert "Acme" in context and "Django" in context
+    assert "hiking" not in context and "Spanish" not in context
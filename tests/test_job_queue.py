@@ -0,0 +1,75 @@
+from module.job_queue import JobQueue, QueueFullError
+import asyncio
+import pytest
+
+
+def make_queue(tmp_path, max_concurrency=1, max_pending=0):
+    return JobQueue(str(tmp_path / "jobs.db"), max_concurrency, max_pending, 3600)
+
+
+def test_jobs_run_highest_priority_first(tmp_path):
+    queue = make_queue(tmp_path)
+    order = []
+
+    async def main():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(job):
+            if job.payload["name"] == "blocker":
+                started.set()
+                await release.wait()
+            order.append(job.payload["name"])
+            return {}
+
+        queue.register("test", handler)
+        await queue.submit("test", {"name": "blocker"})
+        await started.wait()
+
+        # Queued behind the running job; ties keep submission order
+        jobs = [
+            await queue.submit("test", {"name": name}, priority)
+            for name, priority in [("low", 0), ("high", 10), ("mid", 5), ("mid2", 5)]
+        ]
+        assert queue.get(jobs[1].job_id)["position"] == 0
+        assert queue.get(jobs[0].job_id)["position"] == 3
+
+        release.set()
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(main())
+    assert order == ["blocker", "high", "mid", "mid2", "low"]
+
+
+def test_submit_is_refused_when_max_pending_jobs_wait(tmp_path):
+    queue = make_queue(tmp_path, max_pending=2)
+    cleaned = []
+
+    async def main():
+        started = asyncio.Event()
+
+        async def handler(job):
+            started.set()
+            await asyncio.Event().wait()
+
+        queue.register("test", handler, lambda job: cleaned.append(job.payload))
+        await queue.submit("test", {"name": "running"})
+        await started.wait()
+
+        # The running job does not count against the bound
+        await queue.submit("test", {"name": "first"})
+        await queue.submit("test", {"name": "second"})
+        with pytest.raises(QueueFullError):
+            await queue.submit("test", {"name": "third"})
+        assert queue.stats()["rejected"] == 1
+
+        await queue.stop()
+
+    asyncio.run(main())
+    # Cancelled and dropped jobs are cleaned up as well
+    assert sorted(payload["name"] for payload in cleaned) == [
+        "first",
+        "running",
+        "second",
+    ]
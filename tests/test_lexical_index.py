@@ -0,0 +1,42 @@
+from module.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_keeps_tech_terms_and_drops_stopwords():
+    assert tokenize("The candidate knows C++, C# and Node.js on ASP.NET") == [
+        "knows",
+        "c++",
+        "c#",
+        "node.js",
+        "asp.net",
+    ]
+
+
+def test_scores_favour_rare_terms_and_short_documents():
+    index = BM25Index(
+        [
+            "python developer",
+            "python developer with kubernetes",
+            "python developer with a long list of other python projects and tools",
+            "hiking and photography",
+        ]
+    )
+
+    scores = index.scores("kubernetes python")
+    # The only document with the rare term wins; no match scores zero
+    assert scores.argmax() == 1
+    assert scores[3] == 0.0
+    # Same term frequency, the shorter document scores higher
+    assert index.scores("developer")[0] > index.scores("developer")[2]
+
+
+def test_contains_any():
+    index = BM25Index(["python developer"])
+    assert index.contains_any("Python and Rust")
+    assert not index.contains_any("rust")
+    assert not index.contains_any("the and of")
+
+
+def test_empty_index():
+    index = BM25Index([])
+    assert index.scores("python").shape == (0,)
+    assert not index.contains_any("python")
@@ -0,0 +1,41 @@
+from config import get_settings
+from module.metrics import _current_trace, trace_payload
+from module.timing import StageTimer
+import asyncio
+
+
+def test_nested_timer_records_into_the_outer_trace(monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRACE_SAMPLE_RATE", 1.0)
+
+    with StageTimer("ingest") as outer:
+        with outer.stage("facts"):
+            # As astream_facts_from_profile runs inside the ingest facts stage
+            with StageTimer("facts") as inner:
+                with inner.stage("llm"):
+                    pass
+        trace_payload("profile_json", {"name": "Ada"})
+
+    assert outer.trace is not None
+    assert inner.trace is outer.trace
+    assert [span["stage"] for span in outer.trace.spans] == ["llm", "facts"]
+    assert outer.trace.payloads == {"profile_json": {"name": "Ada"}}
+    assert _current_trace.get() is None
+
+
+def test_trace_ends_with_its_timer_in_a_task(monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRACE_SAMPLE_RATE", 1.0)
+
+    async def answer(question):
+        with StageTimer("answer") as timer:
+            await asyncio.sleep(0)
+            trace_payload("question", question)
+        return timer.trace
+
+    async def main():
+        return await asyncio.gather(answer("one"), answer("two"))
+
+    first, second = asyncio.run(main())
+    assert first is not second
+    assert first.payloads == {"question": "one"}
+    assert second.payloads == {"question": "two"}
+    assert _current_trace.get() is None
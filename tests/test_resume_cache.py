@@ -0,0 +1,16 @@
+from config import get_settings
+from module.resume_cache import compute_resume_key
+
+
+def test_key_follows_ingestion_settings_only(monkeypatch):
+    settings = get_settings()
+    key = compute_resume_key("abc")
+
+    monkeypatch.setattr(settings, "SIMILARITY_TOP_K", settings.SIMILARITY_TOP_K + 1)
+    assert compute_resume_key("abc") == key
+
+    for name in ("OPENROUTER_BASE_URL", "EMBEDDING_BASE_URL"):
+        monkeypatch.setattr(settings, name, "http://localhost:9999/v1")
+        changed = compute_resume_key("abc")
+        assert changed != key
+        key = changed
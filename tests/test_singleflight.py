@@ -0,0 +1,100 @@
+from module.singleflight import SingleFlight
+import asyncio
+import pytest
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+        # Once finished, the key starts a new computation
+        results.append(await flight.do("key", compute))
+        return results
+
+    assert asyncio.run(main()) == ["answer"] * 6
+    assert len(calls) == 2
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["boom", "boom"]
+
+
+def test_stream_replays_events_to_late_joiners():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def produce(publish):
+        runs.append(1)
+        for token in ["a", "b", "c"]:
+            publish(token)
+            await asyncio.sleep(0.01)
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return [token async for token in flight.stream("key", produce)]
+
+    async def main():
+        # The second reader joins after "a" was already published
+        return await asyncio.gather(collect(0), collect(0.005))
+
+    assert asyncio.run(main()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert len(runs) == 1
+
+
+def test_leaving_reader_does_not_cancel_the_stream():
+    flight = SingleFlight("test")
+
+    async def produce(publish):
+        for token in ["a", "b", "c"]:
+            publish(token)
+            await asyncio.sleep(0.01)
+
+    async def first_token():
+        async for token in flight.stream("key", produce):
+            return token
+
+    async def all_tokens():
+        return [token async for token in flight.stream("key", produce)]
+
+    async def main():
+        return await asyncio.gather(first_token(), all_tokens())
+
+    assert asyncio.run(main()) == ["a", ["a", "b", "c"]]
+
+
+def test_stream_raises_the_producer_error():
+    flight = SingleFlight("test")
+
+    async def produce(publish):
+        publish("a")
+        raise RuntimeError("boom")
+
+    async def main():
+        tokens = []
+        with pytest.raises(RuntimeError):
+            async for token in flight.stream("key", produce):
+                tokens.append(token)
+        return tokens
+
+    assert asyncio.run(main()) == ["a"]
@@ -0,0 +1,142 @@
+from typing import List
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from module.vector_search import DenseRetriever, HybridRetriever
+import asyncio
+import pytest
+
+VOCABULARY = ["python", "django", "aws", "kubernetes", "spanish", "hiking"]
+
+
+class BagOfWordsEmbedding(BaseEmbedding):
+    def _embed(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(words.count(word)) + 0.01 for word in VOCABULARY]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def make_nodes() -> List[TextNode]:
+    embed_model = BagOfWordsEmbedding()
+    texts = [
+        "python and django services",
+        "aws and kubernetes clusters",
+        "speaks spanish",
+        "enjoys hiking",
+        "python on aws with python",
+    ]
+    return [TextNode(text=text, embedding=embed_model._embed(text)) for text in texts]
+
+
+QUERIES = ["which python work", "kubernetes on aws", "hiking"]
+
+
+def node_ids(results):
+    return [[result.node.node_id for result in nodes] for nodes in results]
+
+
+def test_dense_batch_matches_single_queries():
+    dense = DenseRetriever(make_nodes(), BagOfWordsEmbedding(), similarity_top_k=2)
+
+    batch = dense.retrieve_batch(QUERIES)
+    single = [dense.retrieve(query) for query in QUERIES]
+
+    assert node_ids(batch) == node_ids(single)
+    for batch_nodes, single_nodes in zip(batch, single):
+        assert [r.score for r in batch_nodes] == pytest.approx(
+            [r.score for r in single_nodes], abs=1e-6
+        )
+    assert node_ids(asyncio.run(dense.aretrieve_batch(QUERIES))) == node_ids(single)
+    assert dense.retrieve_batch([]) == []
+
+
+def test_hybrid_batch_matches_single_fused_queries():
+    dense = DenseRetriever(make_nodes(), BagOfWordsEmbedding(), similarity_top_k=3)
+    # Phrased as questions so the single path fuses rather than taking the
+    # keyword fast path, which batches never use
+    queries = [f"which {query}?" for query in QUERIES]
+    hybrid = HybridRetriever(dense, similarity_top_k=3, rrf_k=60, keyword_max_terms=3)
+
+    batch = hybrid.retrieve_batch(queries)
+    single = [hybrid.retrieve(query) for query in queries]
+
+    assert node_ids(batch) == node_ids(single)
+    assert node_ids(asyncio.run(hybrid.aretrieve_batch(queries))) == node_ids(single)
+
+
+class CountingEmbedding(BagOfWordsEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        self.calls += 1
+        return self._embed(query)
+
+
+def make_hybrid(embed_model=None) -> HybridRetriever:
+    nodes = make_nodes() + [
+        TextNode(
+            text="worked at acme corp",
+            embedding=BagOfWordsEmbedding()._embed("worked at acme corp"),
+        )
+    ]
+    dense = DenseRetriever(nodes, embed_model or BagOfWordsEmbedding(), 3)
+    return HybridRetriever(dense, similarity_top_k=3, rrf_k=60, keyword_max_terms=3)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Django", True),
+        ("AWS kubernetes", True),
+        ("Acme Corp", True),
+        # Questions, too many terms, or nothing in the resume: fused retrieval
+        ("django?", False),
+        ("what about django", False),
+        ("python django aws kubernetes", False),
+        ("rust", False),
+        ("", False),
+    ],
+)
+def test_keyword_query_detection(query, expected):
+    assert make_hybrid().is_keyword_query(query) is expected
+
+
+def test_keyword_fast_path_skips_the_query_embedding():
+    embed_model = CountingEmbedding()
+    hybrid = make_hybrid(embed_model)
+
+    results = hybrid.retrieve("python")
+    assert embed_model.calls == 0
+    # Only chunks with the term, best first and scaled to 0-1
+    assert [r.node.get_content() for r in results] == [
+        "python on aws with python",
+        "python and django services",
+    ]
+    assert results[0].score == 1.0
+    assert 0 < results[1].score < 1.0
+
+    hybrid.retrieve("which python work?")
+    assert embed_model.calls == 1
+
+
+def test_fusion_ranks_exact_terms_the_embedding_misses():
+    hybrid = make_hybrid()
+    # "acme" is outside the embedding vocabulary; BM25 still finds it
+    results = hybrid.retrieve("where did they work at acme?")
+    assert results[0].node.get_content() == "worked at acme corp"
+
+    # First in both rankings scores 1.0; the raw cosine travels along for
+    # the context cutoff
+    results = hybrid.retrieve("which kubernetes clusters?")
+    assert results[0].node.get_content() == "aws and kubernetes clusters"
+    assert results[0].score == pytest.approx(1.0)
+    assert all(0 < r.score <= 1.0 for r in results)
+    assert all(-1.0 <= r.similarity <= 1.0 for r in results)
+    assert results[0].similarity > results[-1].similarity